@@ -5,6 +5,7 @@ CRUD completo de categorías
 from flask import Blueprint, jsonify, request
 from ..models import Category
 from ..db import db
+from ..services.catalog import invalidate_catalog
 
 bp = Blueprint("categories", __name__)
 
@@ -29,6 +30,7 @@ def create_category():
     
     db.session.add(category)
     db.session.commit()
+    invalidate_catalog()
     
     return jsonify(category.to_dict()), 201
 
@@ -44,6 +46,7 @@ def update_category(id):
     category.order = data.get("order", category.order)
     
     db.session.commit()
+    invalidate_catalog()
     
     return jsonify(category.to_dict())
 
@@ -54,6 +57,7 @@ def delete_category(id):
     category = Category.query.get_or_404(id)
     category.active = False
     db.session.commit()
+    invalidate_catalog()
     
     return jsonify({"message": "Categoría eliminada"})
 
@@ -2,14 +2,48 @@
 API: Clientes
 CRUD completo
 """
+import base64
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 from ..db import db
-from ..models import Customer, OrderItem, Payment
+from ..models import Customer, OrderItem, Payment, CustomerBalance
+from ..services.kpi_rollup import refresh_weeks_for_dates, refresh_weeks_for_orders
+from ..services.customer_ledger import get_customer_balance as get_ledger_balance, compute_customer_balances
+from ..utils.text_match import normalize_text, normalize_phone
 
 bp = Blueprint("customers", __name__)
 
 
+# Paginación del listado de deudas
+DEBTS_DEFAULT_LIMIT = 50
+DEBTS_MAX_LIMIT = 200
+
+# Búsqueda para autocompletar (typeahead)
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+
+def encode_name_cursor(name, customer_id):
+    """Cursor opaco con (nombre, id) del último cliente de la página"""
+    raw = f"{name or ''}|{customer_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_name_cursor(cursor):
+    """Decodifica el cursor. Lanza ValueError si es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        name, customer_id = raw.rsplit("|", 1)
+        return name, int(customer_id)
+    except Exception:
+        raise ValueError("cursor inválido")
+
+
+def escape_like(value):
+    """Escapa los comodines de LIKE (%, _ y la barra invertida usada como escape)"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 @bp.route("", methods=["GET"])
 def get_customers():
     """Lista todos los clientes"""
@@ -29,6 +63,146 @@ def get_customers():
     return jsonify([c.to_dict() for c in customers])
 
 
+@bp.route("/search", methods=["GET"])
+def search_customers():
+    """
+    Búsqueda de clientes para autocompletar
+    Coincide por prefijo del nombre normalizado (sin acentos ni mayúsculas) o,
+    si la búsqueda tiene dígitos, por prefijo de los dígitos del teléfono
+    (ignorando +, espacios y guiones)
+    
+    Query params: q, limit (por defecto 10, máximo 50), cursor
+    Retorna {"customers": [...], "next_cursor": ..., "limit": ...}
+    """
+    q = request.args.get("q", "")
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    
+    try:
+        limit = min(int(limit), SEARCH_MAX_LIMIT) if limit else SEARCH_DEFAULT_LIMIT
+        if limit <= 0:
+            raise ValueError("limit debe ser mayor a 0")
+        cursor_values = decode_name_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros inválidos: {str(e)}"}), 400
+    
+    prefix = normalize_text(q)
+    if not prefix:
+        return jsonify({"customers": [], "next_cursor": None, "limit": limit})
+    
+    conditions = [Customer.name_normalized.like(f"{escape_like(prefix)}%", escape="\\")]
+    digits = normalize_phone(q)
+    if digits:
+        conditions.append(Customer.phone_digits.like(f"{digits}%"))
+    
+    query = Customer.query.filter(db.or_(*conditions))
+    if cursor_values:
+        cursor_name, cursor_id = cursor_values
+        query = query.filter(db.or_(
+            Customer.name_normalized > cursor_name,
+            db.and_(Customer.name_normalized == cursor_name, Customer.id > cursor_id)
+        ))
+    
+    # Pedir uno extra para saber si hay más páginas
+    customers = query.order_by(Customer.name_normalized, Customer.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(customers) > limit:
+        customers = customers[:limit]
+        next_cursor = encode_name_cursor(customers[-1].name_normalized, customers[-1].id)
+    
+    return jsonify({
+        "customers": [c.to_dict() for c in customers],
+        "next_cursor": next_cursor,
+        "limit": limit
+    })
+
+
+@bp.route("/debts", methods=["GET"])
+def get_customers_debts():
+    """
+    Deuda de todos los clientes (o de un subconjunto) en una sola respuesta
+    Misma fórmula que /<id>/debt, calculada con dos consultas agrupadas
+    (items de pedidos por pedido y cliente, y pagos por cliente)
+    
+    Filtros opcionales: search (nombre o teléfono), customer_ids (ej: 1,2,3)
+    Paginación opcional por cursor (orden por nombre): limit, cursor
+    - Sin limit ni cursor: retorna la lista completa
+    - Con limit o cursor: retorna {"customers": [...], "next_cursor": ..., "limit": ...}
+    """
+    search = request.args.get("search", "").strip()
+    customer_ids = request.args.get("customer_ids")
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    paginated = bool(cursor or limit)
+    
+    query = Customer.query
+    
+    try:
+        if search:
+            query = query.filter(
+                db.or_(
+                    Customer.name.ilike(f"%{search}%"),
+                    Customer.phone.ilike(f"%{search}%")
+                )
+            )
+        if customer_ids:
+            query = query.filter(Customer.id.in_([int(x) for x in customer_ids.split(",") if x.strip()]))
+        
+        if paginated:
+            limit = min(int(limit), DEBTS_MAX_LIMIT) if limit else DEBTS_DEFAULT_LIMIT
+            if limit <= 0:
+                raise ValueError("limit debe ser mayor a 0")
+        
+        if cursor:
+            cursor_name, cursor_id = decode_name_cursor(cursor)
+            query = query.filter(db.or_(
+                Customer.name > cursor_name,
+                db.and_(Customer.name == cursor_name, Customer.id > cursor_id)
+            ))
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros inválidos: {str(e)}"}), 400
+    
+    query = query.order_by(Customer.name, Customer.id)
+    
+    next_cursor = None
+    if paginated:
+        # Pedir uno extra para saber si hay más páginas
+        customers = query.limit(limit + 1).all()
+        if len(customers) > limit:
+            customers = customers[:limit]
+            next_cursor = encode_name_cursor(customers[-1].name, customers[-1].id)
+    else:
+        customers = query.all()
+    
+    # Sin filtros se calcula sobre todos los clientes (sin un IN gigante)
+    filtered = paginated or search or customer_ids
+    balances = compute_customer_balances([c.id for c in customers] if filtered else None) if customers else {}
+    
+    result = []
+    for customer in customers:
+        balance = balances.get(customer.id, {})
+        total_debt = balance.get('orders_total', 0)
+        total_paid = balance.get('payments_total', 0)
+        result.append({
+            "customer_id": customer.id,
+            "customer_name": customer.name,
+            "phone": customer.phone,
+            "total_debt": round(total_debt),
+            "total_paid": round(total_paid),
+            "pending_debt": round(total_debt - total_paid),
+            "orders_count": balance.get('orders_count', 0)
+        })
+    
+    if paginated:
+        return jsonify({
+            "customers": result,
+            "next_cursor": next_cursor,
+            "limit": limit
+        })
+    
+    return jsonify(result)
+
+
 @bp.route("/<int:id>", methods=["GET"])
 def get_customer(id):
     """Obtiene un cliente por ID"""
@@ -57,6 +231,8 @@ def create_customer():
     )
     
     db.session.add(customer)
+    db.session.flush()
+    refresh_weeks_for_dates([customer.created_at])
     db.session.commit()
     
     return jsonify(customer.to_dict()), 201
@@ -90,7 +266,11 @@ def delete_customer(id):
     if pending_items > 0:
         return jsonify({"error": "No se puede eliminar, tiene pedidos pendientes"}), 400
     
+    created_at = customer.created_at
+    CustomerBalance.query.filter_by(customer_id=id).delete(synchronize_session=False)
     db.session.delete(customer)
+    db.session.flush()
+    refresh_weeks_for_dates([created_at])
     db.session.commit()
     
     return jsonify({"message": "Cliente eliminado"})
@@ -99,147 +279,102 @@ def delete_customer(id):
 @bp.route("/<int:id>/debt", methods=["GET"])
 def get_customer_debt(id):
     """
-    Calcula la deuda total del cliente
+    Deuda total del cliente
     Considera: pedidos finalizados con conversiones, ofertas y envío
+    
+    Por defecto retorna solo los totales, leídos del saldo guardado (una fila).
+    
+    Query params:
+    - details: true = recalcula y agrega el detalle por pedido con sus items ("orders")
     """
+    if request.args.get("details") != "true":
+        customer = Customer.query.get_or_404(id)
+        balance = get_ledger_balance(id)
+        return jsonify({
+            "customer": customer.to_dict(),
+            "total_debt": round(balance['total_debt']),
+            "total_paid": round(balance['total_paid']),
+            "pending_debt": round(balance['pending_debt']),
+            "orders_count": balance['orders_count']
+        })
+    
     try:
         from ..models import Order
         from ..utils.shipping import calculate_shipping
+        from ..services.order_totals import calculate_customer_subtotals, get_order_item_lines
         
         customer = Customer.query.get_or_404(id)
         
-        # Obtener pedidos finalizados que tienen items de este cliente
-        # Usar join para filtrar eficientemente desde la base de datos
-        from sqlalchemy.orm import joinedload
-        from sqlalchemy import text
-        
-        # Intentar ejecutar la migración si la columna no existe
-        try:
-            # Verificar si la columna existe
-            db_url = str(db.engine.url)
-            if 'postgresql' in db_url.lower():
-                check_query = text("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name='order_items' AND column_name='cost'
-                """)
-                result = db.session.execute(check_query).fetchone()
-                if not result:
-                    # La columna no existe, agregarla
-                    db.session.execute(text("ALTER TABLE order_items ADD COLUMN cost FLOAT"))
-                    db.session.commit()
-                    print("✅ Migración ejecutada en get_customer_debt: columna 'cost' agregada")
-        except Exception as e:
-            db.session.rollback()
-            print(f"⚠️  Error verificando/agregando columna cost: {e}")
-        
+        # Corregir pedidos con estado 'finalized' a 'completed' automáticamente
         finalized_orders = Order.query.join(
             OrderItem, Order.id == OrderItem.order_id
-        ).options(
-            joinedload(Order.items).joinedload(OrderItem.product)
         ).filter(
             OrderItem.customer_id == id,
-            Order.status.in_(['completed', 'emitted', 'finalized'])
+            Order.status == 'finalized'
         ).distinct().all()
         
-        # Corregir pedidos con estado 'finalized' a 'completed' automáticamente
-        needs_commit = False
+        fixed_orders = []
         for order in finalized_orders:
-            if order.status == 'finalized':
-                order.status = 'completed'
-                if not order.completed_at:
-                    order.completed_at = datetime.utcnow()
-                needs_commit = True
+            order.status = 'completed'
+            if not order.completed_at:
+                order.completed_at = datetime.utcnow()
+            fixed_orders.append(order)
         
         # Guardar correcciones si hubo alguna
-        if needs_commit:
+        if fixed_orders:
             try:
+                refresh_weeks_for_orders(fixed_orders)
                 db.session.commit()
             except Exception as e:
                 db.session.rollback()
                 print(f"Error al corregir estados de pedidos: {e}")
         
+        # Subtotales por pedido y detalle de items del cliente, calculados en SQL
+        debt_filters = (
+            OrderItem.customer_id == id,
+            Order.status.in_(['completed', 'emitted', 'finalized'])
+        )
+        customer_orders = calculate_customer_subtotals(*debt_filters)
+        
+        items_by_order = {}
+        for line in get_order_item_lines(*debt_filters):
+            items_by_order.setdefault(line['order_id'], []).append({
+                "item_id": line['item_id'],
+                "product_name": line['product_name'],
+                "qty": line['qty'],
+                "unit": line['unit'],
+                "charged_qty": line['charged_qty'],
+                "charged_unit": line['charged_unit'],
+                "unit_price": line['unit_price'],
+                "total": line['total']
+            })
+        
         total_debt = 0
         orders_detail = []
         
-        for order in finalized_orders:
+        for row in customer_orders:
+            order_subtotal = row['subtotal']
+            
+            # Calcular envío para este pedido
             try:
-                # Obtener items del cliente en este pedido
-                customer_items = [item for item in order.items if item.customer_id == id]
-                
-                if not customer_items:
-                    continue
-                
-                # Calcular subtotal del pedido para este cliente
-                order_subtotal = 0
-                items_detail = []
-                
-                for item in customer_items:
-                    try:
-                        # Validar que qty y charged_qty sean números válidos
-                        qty = float(item.qty) if item.qty is not None else 0
-                        charged_qty = float(item.charged_qty) if item.charged_qty is not None else None
-                        
-                        # Usar charged_qty siempre que exista (independientemente del estado del pedido)
-                        # Esto asegura que las conversiones se usen correctamente en contabilidad
-                        if charged_qty is not None:
-                            qty_to_charge = charged_qty
-                        else:
-                            qty_to_charge = qty
-                        
-                        # Usar unit_price (ya incluye ofertas si se aplicaron), sino precio del producto
-                        unit_price = item.unit_price
-                        if not unit_price or unit_price == 0:
-                            if item.product:
-                                unit_price = item.product.sale_price or 0
-                            else:
-                                unit_price = 0
-                        
-                        # Validar que unit_price sea un número válido
-                        unit_price = float(unit_price) if unit_price is not None else 0
-                        
-                        item_total = round(qty_to_charge * unit_price)
-                        order_subtotal += item_total
-                        
-                        items_detail.append({
-                            "item_id": item.id,
-                            "product_name": item.product.name if item.product and item.product.name else "Producto desconocido",
-                            "qty": qty,
-                            "unit": item.unit or "kg",
-                            "charged_qty": charged_qty,
-                            "charged_unit": item.charged_unit,
-                            "unit_price": unit_price,
-                            "total": item_total
-                        })
-                    except Exception as e:
-                        print(f"Error procesando item {item.id}: {e}")
-                        # Continuar con el siguiente item
-                        continue
-                
-                # Calcular envío para este pedido
-                try:
-                    shipping_amount = calculate_shipping(order.shipping_type, order_subtotal)
-                except Exception as e:
-                    print(f"Error calculando shipping para pedido {order.id}: {e}")
-                    shipping_amount = 0
-                
-                order_total = order_subtotal + shipping_amount
-                total_debt += order_total
-                
-                orders_detail.append({
-                    "order_id": order.id,
-                    "order_date": order.created_at.isoformat() if order.created_at else None,
-                    "order_status": order.status or "unknown",
-                    "shipping_type": order.shipping_type,
-                    "subtotal": order_subtotal,
-                    "shipping_amount": shipping_amount,
-                    "total": order_total,
-                    "items": items_detail
-                })
+                shipping_amount = calculate_shipping(row['shipping_type'], order_subtotal)
             except Exception as e:
-                print(f"Error procesando pedido {order.id}: {e}")
-                # Continuar con el siguiente pedido
-                continue
+                print(f"Error calculando shipping para pedido {row['order_id']}: {e}")
+                shipping_amount = 0
+            
+            order_total = order_subtotal + shipping_amount
+            total_debt += order_total
+            
+            orders_detail.append({
+                "order_id": row['order_id'],
+                "order_date": row['created_at'].isoformat() if row['created_at'] else None,
+                "order_status": row['status'] or "unknown",
+                "shipping_type": row['shipping_type'],
+                "subtotal": order_subtotal,
+                "shipping_amount": shipping_amount,
+                "total": order_total,
+                "items": items_by_order.get(row['order_id'], [])
+            })
         
         # Obtener pagos totales del cliente
         try:
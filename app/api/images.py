@@ -3,7 +3,8 @@ API: Imágenes
 Sirve imágenes desde Google Cloud Storage
 """
 import os
-from flask import Blueprint, Response
+from flask import Blueprint, Response, request
+from ..services.image_variants import select_variant, variant_path
 from ..utils.cloud_storage import get_file_content
 
 bp = Blueprint("images", __name__)
@@ -17,9 +18,19 @@ def serve_image(image_path):
     Args:
         image_path: Path de la imagen (ej: products/17/filename.png)
         
+    Query params (opcionales):
+        size: thumb | medium | full (variante reducida generada al subir la foto)
+        format: webp | jpeg (sin format: WebP si el navegador lo acepta)
+        
     Returns:
         Response: Imagen con content-type apropiado
+        (el original si la foto no tiene variantes)
     """
+    try:
+        selected = select_variant(request.args, request.accept_mimetypes)
+    except ValueError as e:
+        return Response(f"Parámetros inválidos: {str(e)}", status=400, mimetype="text/plain")
+    
     try:
         # El path viene como: products/17/filename.png
         # Construir el path completo para Cloud Storage
@@ -30,7 +41,14 @@ def serve_image(image_path):
             # Fallback: usar el path directamente
             gcs_path = image_path
         
-        content, content_type = get_file_content(gcs_path)
+        content = None
+        if selected:
+            variant, image_format, negotiated = selected
+            content, content_type = get_file_content(variant_path(gcs_path, variant, image_format))
+        
+        # Sin variante pedida (o foto subida antes de generar variantes): el original
+        if content is None:
+            content, content_type = get_file_content(gcs_path)
         
         if content is None:
             return Response("Imagen no encontrada", status=404, mimetype="text/plain")
@@ -38,6 +56,9 @@ def serve_image(image_path):
         # Agregar headers de caché para mejorar rendimiento
         response = Response(content, mimetype=content_type)
         response.headers['Cache-Control'] = 'public, max-age=31536000'  # 1 año
+        if selected and selected[2]:
+            # El formato depende del header Accept
+            response.headers['Vary'] = 'Accept'
         return response
     
     except Exception as e:
@@ -4,10 +4,11 @@ Métricas básicas del negocio
 """
 from datetime import datetime, timedelta, date
 from flask import Blueprint, jsonify, request
-from ..db import db
-from ..models import Order, OrderItem, Customer, WeeklyCost, Product, Expense, Seller
+from ..models import Order, WeeklyCost, Expense, KpiWeeklyRollup
+from ..services.kpi_rollup import sum_rollups
+from ..services.return_rates import calculate_return_rates, average_return_rate
+from ..services.order_totals import calculate_order_totals, calculate_order_totals_for_ids
 from ..utils.shipping import calculate_shipping
-from sqlalchemy import func
 
 
 def get_week_start(dt=None):
@@ -64,56 +65,6 @@ bp = Blueprint("kpis", __name__, url_prefix="/api/kpis")
 KPI_START_DATE = datetime(2024, 3, 1, 0, 0, 0)  # 1 de marzo de 2024
 
 
-def calculate_order_total(order):
-    """Calcula el total de un pedido usando la misma lógica que get_customer_debt"""
-    order_subtotal = 0
-    order_cost = 0
-    has_cost_data = False
-    items_with_cost = 0
-    
-    for item in order.items:
-        # Usar charged_qty siempre que exista
-        if item.charged_qty is not None:
-            qty_to_charge = item.charged_qty
-        else:
-            qty_to_charge = item.qty
-        
-        # Usar unit_price del item, o el sale_price del producto si no existe
-        unit_price = item.unit_price
-        if not unit_price and item.product:
-            unit_price = item.product.sale_price or 0
-        
-        item_revenue = round(qty_to_charge * (unit_price or 0))
-        order_subtotal += item_revenue
-        
-        # Calcular costo si está registrado
-        try:
-            item_cost_value = getattr(item, 'cost', None)
-            if item_cost_value is not None:
-                item_cost = qty_to_charge * item_cost_value
-                order_cost += item_cost
-                items_with_cost += 1
-        except Exception:
-            pass
-    
-    if items_with_cost > 0:
-        has_cost_data = True
-    
-    # Calcular envío
-    shipping_amount = calculate_shipping(order.shipping_type or 'normal', order_subtotal)
-    order_total = order_subtotal + shipping_amount
-    
-    return {
-        'order_total': order_total,
-        'order_subtotal': order_subtotal,
-        'shipping_amount': shipping_amount,
-        'order_cost': order_cost,
-        'has_cost_data': has_cost_data,
-        'utility_amount': (order_total - order_cost) if has_cost_data and order_cost >= 0 else None,
-        'utility_percent': ((order_total - order_cost) / order_total * 100) if has_cost_data and order_cost >= 0 and order_total > 0 else None
-    }
-
-
 @bp.route("", methods=["GET"])
 def get_kpis():
     """
@@ -132,54 +83,34 @@ def get_kpis():
         last_week_start = datetime.combine(last_week_start_date, datetime.min.time())
         last_week_end = datetime.combine(last_week_end_date, datetime.max.time())
         
-        # Obtener todos los pedidos completados o emitidos con items cargados (desde el 1 de marzo)
-        from sqlalchemy.orm import joinedload
-        all_orders = Order.query.options(
-            joinedload(Order.items)
-        ).filter(
-            Order.status.in_(['completed', 'emitted']),
-            Order.created_at >= KPI_START_DATE
-        ).all()
+        # Totales desde el resumen semanal (una fila por semana)
+        all_rollups = KpiWeeklyRollup.query.order_by(KpiWeeklyRollup.week_start).all()
+        last_week_rollups = [r for r in all_rollups if r.week_start == last_week_start_date]
         
-        # Separar pedidos de última semana e históricos
-        last_week_orders = []
-        historical_orders = []
-        
-        for order in all_orders:
-            if order.created_at:
-                order_date = order.created_at
-                if isinstance(order_date, date) and not isinstance(order_date, datetime):
-                    order_date = datetime.combine(order_date, datetime.min.time())
-                
-                if last_week_start <= order_date <= last_week_end:
-                    last_week_orders.append(order)
-                else:
-                    historical_orders.append(order)
+        last_week_totals = sum_rollups(last_week_rollups)
+        historical_totals = sum_rollups(all_rollups)
         
         # Calcular KPIs para última semana
-        last_week_stats = calculate_kpis_for_orders(last_week_orders)
+        last_week_stats = summarize_kpi_totals(last_week_totals)
         
         # Calcular KPIs históricos (todos los pedidos desde el 1 de marzo)
-        historical_stats = calculate_kpis_for_orders(all_orders)
+        historical_stats = summarize_kpi_totals(historical_totals)
         
         # Nuevos clientes en la última semana completada
-        new_customers_this_week = Customer.query.filter(
-            Customer.created_at >= last_week_start,
-            Customer.created_at <= last_week_end
-        ).count()
+        new_customers_this_week = last_week_totals['new_customers']
         
         # Total de clientes históricos (desde el 1 de marzo)
-        total_customers_historical = Customer.query.filter(
-            Customer.created_at >= KPI_START_DATE
-        ).count()
+        total_customers_historical = historical_totals['new_customers']
+        
+        # Tasas de retorno de todas las semanas en una sola pasada
+        return_rates = calculate_return_rates()
         
         # Calcular clientes que retornaron (última semana)
         customer_return_rate_last_week = 0.0
         seller_return_rate_last_week = 0.0
         try:
-            last_week_key = last_week_start_date.isoformat()
-            customer_rate = calculate_customer_return_rate_for_week(last_week_key, all_orders)
-            seller_rate = calculate_seller_return_rate_for_week(last_week_key, all_orders)
+            customer_rate = return_rates['customer_return_rate'].get(last_week_start_date)
+            seller_rate = return_rates['seller_return_rate'].get(last_week_start_date)
             # Si es None (primera o segunda semana), usar 0 para mostrar pero no afecta el promedio histórico
             customer_return_rate_last_week = customer_rate if customer_rate is not None else 0.0
             seller_return_rate_last_week = seller_rate if seller_rate is not None else 0.0
@@ -188,76 +119,25 @@ def get_kpis():
             import traceback
             traceback.print_exc()
         
-        # Calcular monto facturado por vendedores (última semana)
-        last_week_orders_with_seller = [o for o in last_week_orders if o.seller_id]
-        last_week_revenue_by_seller = calculate_kpis_for_orders(last_week_orders_with_seller)['total_revenue']
-        
-        # Calcular monto facturado por vendedores (histórico)
-        all_orders_with_seller = [o for o in all_orders if o.seller_id]
-        historical_revenue_by_seller = calculate_kpis_for_orders(all_orders_with_seller)['total_revenue']
+        # Monto facturado por vendedores (última semana e histórico)
+        last_week_revenue_by_seller = last_week_totals['seller_revenue']
+        historical_revenue_by_seller = historical_totals['seller_revenue']
         
         # Para históricos, calcular promedio de todas las semanas (desde la semana 3 en adelante)
         historical_customer_return_rate = 0.0
         historical_seller_return_rate = 0.0
         try:
-            # Agrupar pedidos por semana
-            orders_by_week = {}
-            for order in all_orders:
-                if not order.created_at:
-                    continue
-                # Filtrar pedidos anteriores al 1 de marzo
-                if order.created_at < KPI_START_DATE:
-                    continue
-                order_week_start = get_week_start(order.created_at)
-                if not order_week_start:
-                    continue
-                # Asegurar que la semana no sea anterior al 1 de marzo
-                week_start_dt = datetime.combine(order_week_start, datetime.min.time())
-                if week_start_dt < KPI_START_DATE:
-                    continue
-                week_key_order = order_week_start.isoformat() if hasattr(order_week_start, 'isoformat') else str(order_week_start)
-                if not week_key_order:
-                    continue
-                if week_key_order not in orders_by_week:
-                    orders_by_week[week_key_order] = []
-                orders_by_week[week_key_order].append(order)
-            
-            sorted_weeks = sorted(orders_by_week.keys())
-            # Calcular para cada semana desde la 3 en adelante
-            return_rates_customer = []
-            return_rates_seller = []
-            for i, week_key in enumerate(sorted_weeks):
-                if i >= 2:  # Desde la semana 3 (índice 2)
-                    try:
-                        # Verificar que la semana no sea anterior al 1 de marzo
-                        week_start_dt = datetime.fromisoformat(week_key)
-                        week_start_dt = datetime.combine(week_start_dt.date(), datetime.min.time())
-                        if week_start_dt < KPI_START_DATE:
-                            continue
-                        
-                        customer_rate = calculate_customer_return_rate_for_week(week_key, all_orders)
-                        seller_rate = calculate_seller_return_rate_for_week(week_key, all_orders)
-                        
-                        # Solo incluir semanas con valores válidos (no None)
-                        # None significa que es una de las primeras dos semanas y no debe contarse
-                        if customer_rate is not None:
-                            return_rates_customer.append(customer_rate)
-                        if seller_rate is not None:
-                            return_rates_seller.append(seller_rate)
-                    except Exception as e:
-                        print(f"⚠️  Error calculando retorno para semana {week_key}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        continue
+            historical_customer_return_rate, return_rates_customer = average_return_rate(
+                return_rates['weeks'], return_rates['customer_return_rate']
+            )
+            historical_seller_return_rate, return_rates_seller = average_return_rate(
+                return_rates['weeks'], return_rates['seller_return_rate']
+            )
             
             if return_rates_customer:
-                historical_customer_return_rate = sum(return_rates_customer) / len(return_rates_customer)
                 print(f"📊 Promedio histórico clientes que retornaron: {historical_customer_return_rate:.2f}% (de {len(return_rates_customer)} semanas)")
-                print(f"   - Valores por semana: {return_rates_customer}")
             if return_rates_seller:
-                historical_seller_return_rate = sum(return_rates_seller) / len(return_rates_seller)
                 print(f"📊 Promedio histórico vendedores que retornaron: {historical_seller_return_rate:.2f}% (de {len(return_rates_seller)} semanas)")
-                print(f"   - Valores por semana: {return_rates_seller}")
         except Exception as e:
             print(f"⚠️  Error calculando promedios históricos de retorno: {e}")
             import traceback
@@ -299,50 +179,70 @@ def get_kpis():
         return jsonify({"error": f"Error calculando KPIs: {str(e)}"}), 500
 
 
-def calculate_kpis_for_orders(orders):
-    """Calcula KPIs para una lista de pedidos"""
-    total_orders_count = 0
-    total_revenue = 0
-    orders_with_utility = []
-    completed_orders_by_seller = {}  # {seller_id: count}
+def accumulate_kpis_for_orders(orders_totals):
+    """
+    Acumula totales crudos (sin promediar) a partir de los totales de cada pedido
+    (ver services.order_totals.calculate_order_totals).
+    Se guardan tal cual en el resumen semanal para poder sumar semanas.
+    """
+    totals = {
+        'orders_count': 0,
+        'revenue': 0,
+        'cost_total': 0,
+        'utility_total': 0,
+        'utility_percent_sum': 0,
+        'utility_orders_count': 0,
+        'seller_revenue': 0,
+        'completed_orders_by_seller': {}  # {seller_id: count}
+    }
     
-    for order in orders:
-        order_data = calculate_order_total(order)
+    for order_data in orders_totals:
         order_total = order_data['order_total']
         
         # Solo contar pedidos con monto > 0
         if order_total > 0:
-            total_orders_count += 1
-            total_revenue += order_total
+            totals['orders_count'] += 1
+            totals['revenue'] += order_total
+            
+            if order_data['seller_id']:
+                totals['seller_revenue'] += order_total
             
             # Si tiene datos de costo, calcular utilidad
             if order_data['has_cost_data'] and order_data['order_cost'] >= 0:
                 if order_data['utility_amount'] is not None:
-                    orders_with_utility.append({
-                        'utility_amount': order_data['utility_amount'],
-                        'utility_percent': order_data['utility_percent'] or 0
-                    })
+                    totals['cost_total'] += order_data['order_cost']
+                    totals['utility_total'] += order_data['utility_amount']
+                    totals['utility_percent_sum'] += order_data['utility_percent'] or 0
+                    totals['utility_orders_count'] += 1
             
             # Contar pedidos completados por vendedor (si existe seller_id)
-            if order.status == 'completed':
+            if order_data['status'] == 'completed':
                 try:
-                    seller_id = getattr(order, 'seller_id', None)
+                    seller_id = order_data['seller_id']
                     if seller_id:
-                        if seller_id not in completed_orders_by_seller:
-                            completed_orders_by_seller[seller_id] = 0
-                        completed_orders_by_seller[seller_id] += 1
+                        if seller_id not in totals['completed_orders_by_seller']:
+                            totals['completed_orders_by_seller'][seller_id] = 0
+                        totals['completed_orders_by_seller'][seller_id] += 1
                 except Exception:
                     pass
     
+    return totals
+
+
+def summarize_kpi_totals(totals):
+    """Convierte totales crudos (de pedidos o del resumen semanal) en KPIs promediados"""
+    total_orders_count = totals['orders_count']
+    total_revenue = totals['revenue']
+    
     # Promedio de tamaño de pedido
     avg_order_value = total_revenue / total_orders_count if total_orders_count > 0 else 0
     
     # Utilidad promedio por pedido
     avg_utility_percent = 0
     avg_utility_amount = 0
-    if orders_with_utility:
-        avg_utility_percent = sum(o['utility_percent'] for o in orders_with_utility) / len(orders_with_utility)
-        avg_utility_amount = sum(o['utility_amount'] for o in orders_with_utility) / len(orders_with_utility)
+    if totals['utility_orders_count'] > 0:
+        avg_utility_percent = totals['utility_percent_sum'] / totals['utility_orders_count']
+        avg_utility_amount = totals['utility_total'] / totals['utility_orders_count']
     
     return {
         'avg_order_value': round(avg_order_value),
@@ -350,7 +250,7 @@ def calculate_kpis_for_orders(orders):
         'avg_utility_percent': round(avg_utility_percent, 2),
         'avg_utility_amount': round(avg_utility_amount),
         'total_revenue': round(total_revenue),
-        'completed_orders_by_seller': completed_orders_by_seller
+        'completed_orders_by_seller': totals['completed_orders_by_seller']
     }
 
 
@@ -465,27 +365,28 @@ def get_utility_by_week():
     - Resultado final de la semana (utilidad - costos)
     """
     try:
-        # Obtener todos los pedidos completados o emitidos (desde el 1 de marzo)
-        all_orders = Order.query.filter(
+        # Totales de todos los pedidos completados o emitidos (desde el 1 de marzo)
+        orders_totals = calculate_order_totals(
             Order.status.in_(['completed', 'emitted']),
             Order.created_at >= KPI_START_DATE
-        ).all()
+        )
         
         # Agrupar pedidos por semana
         weeks_data = {}
         
-        for order in all_orders:
-            if not order.created_at:
+        for order_id, order_data in orders_totals.items():
+            created_at = order_data['created_at']
+            if not created_at:
                 continue
             
             # Obtener el lunes de la semana del pedido
             try:
-                week_start = get_week_start(order.created_at)
+                week_start = get_week_start(created_at)
                 week_key = week_start.isoformat() if week_start else None
                 if not week_key:
                     continue
             except Exception as e:
-                print(f"⚠️  Error calculando semana para pedido {order.id}: {e}")
+                print(f"⚠️  Error calculando semana para pedido {order_id}: {e}")
                 continue
             
             if week_key not in weeks_data:
@@ -497,57 +398,21 @@ def get_utility_by_week():
                     'orders_cost': 0
                 }
             
-            # Calcular utilidad del pedido
-            order_subtotal = 0
-            order_cost = 0
-            has_cost_data = False  # Cambiar a False inicialmente
-            items_with_cost = 0
-            
-            for item in order.items:
-                # Usar charged_qty siempre que exista
-                if item.charged_qty is not None:
-                    qty_to_charge = item.charged_qty
-                else:
-                    qty_to_charge = item.qty
-                
-                # Precio de venta
-                unit_price = item.unit_price
-                if not unit_price and item.product:
-                    unit_price = item.product.sale_price or 0
-                
-                item_revenue = round(qty_to_charge * (unit_price or 0))
-                order_subtotal += item_revenue
-                
-                # Costo
-                try:
-                    item_cost_value = getattr(item, 'cost', None)
-                    if item_cost_value is not None:
-                        item_cost = qty_to_charge * item_cost_value
-                        order_cost += item_cost
-                        items_with_cost += 1
-                except Exception:
-                    pass  # No marcar has_cost_data = False aquí
-            
-            # Solo marcar has_cost_data como True si al menos un item tiene costo
-            if items_with_cost > 0:
-                has_cost_data = True
-            
-            # Calcular envío
-            shipping_amount = calculate_shipping(order.shipping_type or 'normal', order_subtotal)
-            order_total = order_subtotal + shipping_amount
+            order_total = order_data['order_total']
+            order_cost = order_data['order_cost']
             
             # Solo incluir pedidos con monto > 0
             if order_total > 0:
                 weeks_data[week_key]['orders'].append({
-                    'order_id': order.id,
-                    'order_date': order.created_at.isoformat() if order.created_at else None,
+                    'order_id': order_id,
+                    'order_date': created_at.isoformat(),
                     'total': order_total
                 })
                 weeks_data[week_key]['orders_revenue'] += order_total
                 
                 # Si tiene datos de costo (aunque sea parcial), calcular utilidad
                 # Cambio: permitir costo 0 para no perder pedidos editados
-                if has_cost_data and order_cost >= 0:
+                if order_data['has_cost_data'] and order_cost >= 0:
                     utility_amount = order_total - order_cost
                     weeks_data[week_key]['orders_utility'] += utility_amount
                     weeks_data[week_key]['orders_cost'] += order_cost
@@ -684,109 +549,52 @@ def get_kpi_by_week(metric):
     - completed_orders_by_seller: Pedidos completados por vendedores
     """
     try:
-        # Obtener todos los pedidos completados o emitidos con items cargados (desde el 1 de marzo)
-        from sqlalchemy.orm import joinedload
-        all_orders = Order.query.options(
-            joinedload(Order.items)
-        ).filter(
-            Order.status.in_(['completed', 'emitted']),
-            Order.created_at >= KPI_START_DATE
-        ).all()
+        # Semanas con pedidos emitidos/completados, desde el resumen semanal
+        week_rollups = KpiWeeklyRollup.query.filter(
+            KpiWeeklyRollup.orders_seen > 0
+        ).order_by(KpiWeeklyRollup.week_start).all()
         
-        # Agrupar por semana
-        weeks_data = {}
-        
-        for order in all_orders:
-            if not order.created_at:
-                continue
-            
-            # Obtener el lunes de la semana del pedido
-            try:
-                week_start = get_week_start(order.created_at)
-                week_key = week_start.isoformat() if week_start else None
-                if not week_key:
-                    continue
-            except Exception as e:
-                print(f"⚠️  Error calculando semana para pedido {order.id}: {e}")
-                continue
-            
-            if week_key not in weeks_data:
-                weeks_data[week_key] = {
-                    'week_start': week_key,
-                    'orders': []
-                }
-            
-            weeks_data[week_key]['orders'].append(order)
+        # Las tasas de retorno se calculan para todas las semanas de una vez
+        return_rates = None
+        if metric in ('customer_return_rate', 'seller_return_rate'):
+            return_rates = calculate_return_rates()
         
         # Calcular métrica para cada semana
         result = []
-        for week_key, week_data in weeks_data.items():
-            week_orders = week_data['orders']
+        for rollup in week_rollups:
+            week_key = rollup.week_start.isoformat()
+            week_totals = sum_rollups([rollup])
+            stats = summarize_kpi_totals(week_totals)
             
             # Calcular según la métrica solicitada
             if metric == 'avg_order_value':
-                stats = calculate_kpis_for_orders(week_orders)
                 value = stats['avg_order_value']
             elif metric == 'new_customers':
-                # Contar clientes nuevos en esta semana (desde el 1 de marzo)
-                week_start_dt = datetime.fromisoformat(week_key)
-                week_end_dt = week_start_dt + timedelta(days=6)
-                week_end_dt = datetime.combine(week_end_dt.date(), datetime.max.time())
-                week_start_dt = datetime.combine(week_start_dt.date(), datetime.min.time())
-                
                 # Asegurar que la semana no sea anterior al 1 de marzo
+                week_start_dt = datetime.combine(rollup.week_start, datetime.min.time())
                 if week_start_dt < KPI_START_DATE:
                     value = 0
                 else:
-                    value = Customer.query.filter(
-                        Customer.created_at >= max(week_start_dt, KPI_START_DATE),
-                        Customer.created_at <= week_end_dt
-                    ).count()
+                    value = week_totals['new_customers']
             elif metric == 'total_orders':
-                stats = calculate_kpis_for_orders(week_orders)
                 value = stats['total_orders']
             elif metric == 'total_revenue':
-                stats = calculate_kpis_for_orders(week_orders)
                 value = stats['total_revenue']
             elif metric == 'avg_utility_percent':
-                stats = calculate_kpis_for_orders(week_orders)
                 value = stats['avg_utility_percent']
             elif metric == 'avg_utility_amount':
-                stats = calculate_kpis_for_orders(week_orders)
                 value = stats['avg_utility_amount']
             elif metric == 'completed_orders_by_seller':
-                stats = calculate_kpis_for_orders(week_orders)
                 value = sum(stats['completed_orders_by_seller'].values())
-            elif metric == 'customer_return_rate':
-                # Calcular porcentaje de clientes que retornaron
-                # Usar todos los pedidos ya cargados con items
-                try:
-                    value = calculate_customer_return_rate_for_week(week_key, all_orders)
-                    # Si es None (primera o segunda semana), usar 0 para el gráfico
-                    if value is None:
-                        value = 0.0
-                except Exception as e:
-                    print(f"⚠️  Error calculando customer_return_rate para semana {week_key}: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    value = 0.0
-            elif metric == 'seller_return_rate':
-                # Calcular porcentaje de vendedores que retornaron
-                try:
-                    value = calculate_seller_return_rate_for_week(week_key, all_orders)
-                    # Si es None (primera o segunda semana), usar 0 para el gráfico
-                    if value is None:
-                        value = 0.0
-                except Exception as e:
-                    print(f"⚠️  Error calculando seller_return_rate para semana {week_key}: {e}")
-                    import traceback
-                    traceback.print_exc()
+            elif metric in ('customer_return_rate', 'seller_return_rate'):
+                # Porcentaje de clientes/vendedores que retornaron
+                value = return_rates[metric].get(rollup.week_start)
+                # Si es None (primera o segunda semana), usar 0 para el gráfico
+                if value is None:
                     value = 0.0
             elif metric == 'revenue_by_seller':
                 # Para este KPI, retornar el total facturado por vendedores en esta semana
-                week_orders_with_seller = [o for o in week_orders if o.seller_id]
-                stats = calculate_kpis_for_orders(week_orders_with_seller)
-                value = stats['total_revenue']
+                value = round(week_totals['seller_revenue'])
             else:
                 return jsonify({"error": f"Métrica '{metric}' no reconocida"}), 400
             
@@ -844,12 +652,13 @@ def get_best_products():
             )
         
         orders = orders_query.all()
+        orders_totals = calculate_order_totals_for_ids(order.id for order in orders)
         
         # Agrupar productos por monto facturado
         products_revenue = {}  # {product_id: {'name': ..., 'revenue': ..., 'qty': ..., 'orders': set()}}
         
         for order in orders:
-            order_data = calculate_order_total(order)
+            order_data = orders_totals[order.id]
             if order_data['order_total'] <= 0:
                 continue
             
@@ -918,243 +727,6 @@ def get_best_products():
         return jsonify({"error": f"Error obteniendo mejores productos: {str(e)}"}), 500
 
 
-def calculate_customer_return_rate_for_week(week_key, all_orders):
-    """
-    Calcula el porcentaje de clientes que retornaron para una semana específica.
-    
-    FÓRMULA:
-    - Clientes de referencia: Clientes únicos que pidieron hace 1 o 2 semanas (semana N-1 o N-2)
-    - Clientes que retornaron: Clientes de referencia que volvieron a pedir en esta semana (N) o la anterior (N-1)
-    - Porcentaje = (Clientes que retornaron / Clientes de referencia) * 100
-    
-    Las primeras dos semanas se ignoran (retornan 0).
-    """
-    try:
-        if not week_key or not all_orders:
-            return 0.0
-            
-        # Convertir week_key a datetime
-        try:
-            week_start_dt = datetime.fromisoformat(week_key)
-            week_start_date = week_start_dt.date()
-        except (ValueError, AttributeError):
-            return 0.0
-        
-        # Agrupar todos los pedidos por semana
-        orders_by_week = {}
-        for order in all_orders:
-            if not order.created_at:
-                continue
-            try:
-                order_week_start = get_week_start(order.created_at)
-                if not order_week_start:
-                    continue
-                week_key_order = order_week_start.isoformat() if hasattr(order_week_start, 'isoformat') else str(order_week_start)
-                if not week_key_order:
-                    continue
-                if week_key_order not in orders_by_week:
-                    orders_by_week[week_key_order] = []
-                orders_by_week[week_key_order].append(order)
-            except Exception as e:
-                print(f"⚠️  Error procesando pedido {order.id} para customer_return_rate: {e}")
-                continue
-        
-        # Obtener todas las semanas ordenadas
-        sorted_weeks = sorted(orders_by_week.keys())
-        if week_key not in sorted_weeks:
-            return None  # Retornar None en lugar de 0 para que no se incluya en el promedio
-        
-        current_week_index = sorted_weeks.index(week_key)
-        
-        # Las primeras dos semanas se ignoran (índices 0 y 1) - retornar None
-        if current_week_index < 2:
-            return None  # Retornar None para que no se incluya en el promedio
-        
-        # Semana actual
-        current_week_start = week_start_date
-        
-        # Semanas de referencia: clientes que pidieron hace 1 o 2 semanas (N-1 o N-2)
-        week_minus_1_start = current_week_start - timedelta(days=7)
-        week_minus_2_start = current_week_start - timedelta(days=14)
-        week_minus_1_key = week_minus_1_start.isoformat()
-        week_minus_2_key = week_minus_2_start.isoformat()
-        
-        # Semanas de retorno: esta semana (N) o la anterior (N-1)
-        previous_week_start = current_week_start - timedelta(days=7)
-        previous_week_key = previous_week_start.isoformat()
-        
-        # Obtener clientes únicos que pidieron en las semanas de referencia (N-1 o N-2)
-        customers_in_reference = set()
-        for ref_week_key in [week_minus_1_key, week_minus_2_key]:
-            if ref_week_key in orders_by_week:
-                for order in orders_by_week[ref_week_key]:
-                    try:
-                        if hasattr(order, 'items') and order.items:
-                            for item in order.items:
-                                if hasattr(item, 'customer_id') and item.customer_id:
-                                    customers_in_reference.add(item.customer_id)
-                    except Exception as e:
-                        print(f"⚠️  Error procesando items del pedido {order.id}: {e}")
-                        continue
-        
-        if not customers_in_reference:
-            print(f"📊 Semana {week_key}: No hay clientes de referencia (buscó en {week_minus_1_key} y {week_minus_2_key})")
-            return 0.0
-        
-        # Obtener clientes que pidieron en la semana actual (N) o anterior (N-1)
-        customers_returned = set()
-        for ret_week_key in [week_key, previous_week_key]:
-            if ret_week_key in orders_by_week:
-                for order in orders_by_week[ret_week_key]:
-                    try:
-                        if hasattr(order, 'items') and order.items:
-                            for item in order.items:
-                                if hasattr(item, 'customer_id') and item.customer_id and item.customer_id in customers_in_reference:
-                                    customers_returned.add(item.customer_id)
-                    except Exception as e:
-                        print(f"⚠️  Error procesando items del pedido {order.id}: {e}")
-                        continue
-        
-        # Calcular porcentaje
-        if len(customers_in_reference) == 0:
-            return 0.0
-        
-        percentage = (len(customers_returned) / len(customers_in_reference)) * 100
-        
-        # Debug: imprimir información útil
-        print(f"📊 Semana {week_key}:")
-        print(f"   - Clientes de referencia (pidieron en {week_minus_1_key} o {week_minus_2_key}): {len(customers_in_reference)}")
-        print(f"   - Clientes que retornaron (pidieron en {week_key} o {previous_week_key}): {len(customers_returned)}")
-        print(f"   - Porcentaje: {percentage:.2f}%")
-        
-        return percentage
-        
-    except Exception as e:
-        print(f"⚠️  Error calculando customer_return_rate para semana {week_key}: {e}")
-        import traceback
-        traceback.print_exc()
-        return 0.0
-
-
-def calculate_seller_return_rate_for_week(week_key, all_orders):
-    """
-    Calcula el porcentaje de vendedores que retornaron para una semana específica.
-    Un vendedor retorna si:
-    - Tuvo pedidos hace 1 o 2 semanas
-    - Y volvió a tener al menos un pedido en esta semana o la anterior
-    Las primeras dos semanas se ignoran (retornan 0).
-    """
-    try:
-        if not week_key or not all_orders:
-            return 0.0
-            
-        # Convertir week_key a datetime
-        try:
-            week_start_dt = datetime.fromisoformat(week_key)
-            week_start_date = week_start_dt.date()
-        except (ValueError, AttributeError):
-            return 0.0
-        
-        # Agrupar todos los pedidos por semana
-        orders_by_week = {}
-        for order in all_orders:
-            if not order.created_at:
-                continue
-            try:
-                order_week_start = get_week_start(order.created_at)
-                if not order_week_start:
-                    continue
-                week_key_order = order_week_start.isoformat() if hasattr(order_week_start, 'isoformat') else str(order_week_start)
-                if not week_key_order:
-                    continue
-                if week_key_order not in orders_by_week:
-                    orders_by_week[week_key_order] = []
-                orders_by_week[week_key_order].append(order)
-            except Exception as e:
-                print(f"⚠️  Error procesando pedido {order.id} para seller_return_rate: {e}")
-                continue
-        
-        # Obtener todas las semanas ordenadas
-        sorted_weeks = sorted(orders_by_week.keys())
-        if week_key not in sorted_weeks:
-            return None  # Retornar None en lugar de 0 para que no se incluya en el promedio
-        
-        current_week_index = sorted_weeks.index(week_key)
-        
-        # Las primeras dos semanas se ignoran (índices 0 y 1) - retornar None
-        if current_week_index < 2:
-            return None  # Retornar None para que no se incluya en el promedio
-        
-        # Semana actual y anterior
-        current_week_start = week_start_date
-        previous_week_start = current_week_start - timedelta(days=7)
-        
-        # Semanas de referencia (1 y 2 semanas atrás)
-        week_minus_1_start = current_week_start - timedelta(days=7)
-        week_minus_2_start = current_week_start - timedelta(days=14)
-        
-        # Semana actual
-        current_week_start = week_start_date
-        
-        # Semanas de referencia: vendedores que tuvieron pedidos hace 1 o 2 semanas (N-1 o N-2)
-        week_minus_1_start = current_week_start - timedelta(days=7)
-        week_minus_2_start = current_week_start - timedelta(days=14)
-        week_minus_1_key = week_minus_1_start.isoformat()
-        week_minus_2_key = week_minus_2_start.isoformat()
-        
-        # Semanas de retorno: esta semana (N) o la anterior (N-1)
-        previous_week_start = current_week_start - timedelta(days=7)
-        previous_week_key = previous_week_start.isoformat()
-        
-        # Obtener vendedores únicos que tuvieron pedidos en las semanas de referencia (N-1 o N-2)
-        sellers_in_reference = set()
-        for ref_week_key in [week_minus_1_key, week_minus_2_key]:
-            if ref_week_key in orders_by_week:
-                for order in orders_by_week[ref_week_key]:
-                    try:
-                        if hasattr(order, 'seller_id') and order.seller_id:
-                            sellers_in_reference.add(order.seller_id)
-                    except Exception as e:
-                        print(f"⚠️  Error procesando seller_id del pedido {order.id}: {e}")
-                        continue
-        
-        if not sellers_in_reference:
-            print(f"📊 Semana {week_key}: No hay vendedores de referencia (buscó en {week_minus_1_key} y {week_minus_2_key})")
-            return 0.0
-        
-        # Obtener vendedores que tuvieron pedidos en la semana actual (N) o anterior (N-1)
-        sellers_returned = set()
-        for ret_week_key in [week_key, previous_week_key]:
-            if ret_week_key in orders_by_week:
-                for order in orders_by_week[ret_week_key]:
-                    try:
-                        if hasattr(order, 'seller_id') and order.seller_id and order.seller_id in sellers_in_reference:
-                            sellers_returned.add(order.seller_id)
-                    except Exception as e:
-                        print(f"⚠️  Error procesando seller_id del pedido {order.id}: {e}")
-                        continue
-        
-        # Calcular porcentaje
-        if len(sellers_in_reference) == 0:
-            return 0.0
-        
-        percentage = (len(sellers_returned) / len(sellers_in_reference)) * 100
-        
-        # Debug: imprimir información útil
-        print(f"📊 Semana {week_key} (vendedores):")
-        print(f"   - Vendedores de referencia (tuvieron pedidos en {week_minus_1_key} o {week_minus_2_key}): {len(sellers_in_reference)}")
-        print(f"   - Vendedores que retornaron (tuvieron pedidos en {week_key} o {previous_week_key}): {len(sellers_returned)}")
-        print(f"   - Porcentaje: {percentage:.2f}%")
-        
-        return percentage
-        
-    except Exception as e:
-        print(f"⚠️  Error calculando seller_return_rate para semana {week_key}: {e}")
-        import traceback
-        traceback.print_exc()
-        return 0.0
-
-
 @bp.route("/revenue-by-seller", methods=["GET"])
 def get_revenue_by_seller():
     """
@@ -1186,7 +758,8 @@ def get_revenue_by_seller():
                 Order.created_at <= last_week_end
             )
         
-        orders = orders_query.all()
+        orders = orders_query.filter(Order.seller_id.isnot(None)).all()
+        orders_totals = calculate_order_totals_for_ids(order.id for order in orders)
         
         # Agrupar por vendedor
         sellers_revenue = {}  # {seller_id: {'name': ..., 'revenue': ...}}
@@ -1196,7 +769,7 @@ def get_revenue_by_seller():
             if not order.seller_id:
                 continue
             
-            order_data = calculate_order_total(order)
+            order_data = orders_totals[order.id]
             if order_data['order_total'] <= 0:
                 continue
             
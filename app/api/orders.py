@@ -2,42 +2,136 @@
 API: Pedidos
 Parseo, creación, gestión de pedidos y items
 """
+import base64
 from flask import Blueprint, request, jsonify
 from datetime import datetime
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import joinedload
 from ..db import db
-from ..models import Order, OrderItem, Customer, Product, Expense
+from ..models import Order, OrderItem, Customer, Product, Expense, OrderCustomerTotal
 from ..services.order_parser_simple import parse_order_text
+from ..services.kpi_rollup import refresh_weeks_for_orders, refresh_weeks_for_dates
+from ..services.order_totals import refresh_order_totals
+from ..services.catalog import invalidate_catalog
+from ..services.customer_ledger import refresh_customer_balances_for_orders
+from ..services.offer_prices import get_offer_prices, resolve_offer_price
+from ..services.product_index import get_product_index
 from ..services.whatsapp import send_new_order_notification
+from ..utils.text_match import normalize_text
 
 bp = Blueprint("orders", __name__)
 
 
+# Paginación del listado de pedidos
+ORDERS_DEFAULT_LIMIT = 50
+ORDERS_MAX_LIMIT = 200
+
+
+def encode_orders_cursor(order):
+    """Cursor opaco con (created_at, id) del último pedido de la página"""
+    raw = f"{order.created_at.isoformat() if order.created_at else ''}|{order.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_orders_cursor(cursor):
+    """Decodifica el cursor. Lanza ValueError si es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at_str, order_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at_str), int(order_id)
+    except Exception:
+        raise ValueError("cursor inválido")
+
+
 @bp.route("", methods=["GET"])
 def get_orders():
-    """Lista todos los pedidos"""
+    """
+    Lista pedidos (más recientes primero)
+    
+    Filtros opcionales: status, seller_id, date_from, date_to (YYYY-MM-DD)
+    Paginación opcional por cursor: limit, cursor
+    - Sin limit ni cursor: retorna la lista completa (formato original)
+    - Con limit o cursor: retorna {"orders": [...], "next_cursor": ..., "limit": ...}
+    """
     try:
         status = request.args.get("status")
+        seller_id = request.args.get("seller_id")
+        date_from = request.args.get("date_from")
+        date_to = request.args.get("date_to")
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit")
+        paginated = bool(cursor or limit)
         
-        query = Order.query
-        
-        if status:
-            query = query.filter_by(status=status)
-        
-        orders = query.order_by(Order.created_at.desc()).all()
+        query = Order.query.options(joinedload(Order.seller))
         
-        # Incluir items y conteo
+        try:
+            if status:
+                query = query.filter(Order.status == status)
+            if seller_id:
+                query = query.filter(Order.seller_id == int(seller_id))
+            if date_from:
+                start = datetime.combine(datetime.fromisoformat(date_from).date(), datetime.min.time())
+                query = query.filter(Order.created_at >= start)
+            if date_to:
+                end = datetime.combine(datetime.fromisoformat(date_to).date(), datetime.max.time())
+                query = query.filter(Order.created_at <= end)
+            
+            if paginated:
+                limit = min(int(limit), ORDERS_MAX_LIMIT) if limit else ORDERS_DEFAULT_LIMIT
+                if limit <= 0:
+                    raise ValueError("limit debe ser mayor a 0")
+            
+            if cursor:
+                cursor_created_at, cursor_id = decode_orders_cursor(cursor)
+                query = query.filter(or_(
+                    Order.created_at < cursor_created_at,
+                    and_(Order.created_at == cursor_created_at, Order.id < cursor_id)
+                ))
+        except ValueError as e:
+            return jsonify({"error": f"Parámetros inválidos: {str(e)}"}), 400
+        
+        query = query.order_by(Order.created_at.desc(), Order.id.desc())
+        
+        next_cursor = None
+        if paginated:
+            # Pedir uno extra para saber si hay más páginas
+            orders = query.limit(limit + 1).all()
+            if len(orders) > limit:
+                orders = orders[:limit]
+                next_cursor = encode_orders_cursor(orders[-1])
+        else:
+            orders = query.all()
+        
+        # Cantidad de clientes de los pedidos de esta página (una consulta agrupada)
+        customers_count = {}
+        order_ids = [order.id for order in orders]
+        if order_ids:
+            customers_count = dict(db.session.query(
+                OrderCustomerTotal.order_id,
+                func.count(OrderCustomerTotal.id)
+            ).filter(
+                OrderCustomerTotal.order_id.in_(order_ids)
+            ).group_by(OrderCustomerTotal.order_id).all())
+        
+        # Incluir conteos guardados (sin cargar los items)
         result = []
         for order in orders:
             try:
                 order_dict = order.to_dict()
-                order_dict["items_count"] = len(order.items)
-                order_dict["customers_count"] = len(set(item.customer_id for item in order.items))
+                order_dict["customers_count"] = customers_count.get(order.id, 0)
                 result.append(order_dict)
             except Exception as e:
                 # Si hay error con un pedido específico, continuar con los demás
                 print(f"⚠️  Error procesando pedido {order.id}: {e}")
                 continue
         
+        if paginated:
+            return jsonify({
+                "orders": result,
+                "next_cursor": next_cursor,
+                "limit": limit
+            })
+        
         return jsonify(result)
     except Exception as e:
         import traceback
@@ -49,8 +143,6 @@ def get_orders():
 def get_order(id):
     """Obtiene un pedido con todos sus items"""
     try:
-        from ..utils.shipping import calculate_shipping
-        
         order = Order.query.get_or_404(id)
         
         order_dict = order.to_dict()
@@ -67,33 +159,11 @@ def get_order(id):
         order_dict["items"] = items_list
         order_dict["expenses"] = [exp.to_dict() for exp in order.expenses]
         
-        # Calcular subtotal usando charged_qty si existe (para conversiones)
-        # Usar la misma lógica que get_customer_debt
-        subtotal = 0
-        for item in order.items:
-            # Usar charged_qty siempre que exista (independientemente del estado del pedido)
-            if item.charged_qty is not None:
-                qty_to_charge = item.charged_qty
-            else:
-                qty_to_charge = item.qty
-            
-            # Usar unit_price del item, o el sale_price del producto si no existe
-            unit_price = item.unit_price
-            if not unit_price and item.product:
-                unit_price = item.product.sale_price or 0
-            
-            item_total = round(qty_to_charge * (unit_price or 0))
-            subtotal += item_total
-        
-        # Calcular envío
-        shipping_amount = calculate_shipping(order.shipping_type, subtotal)
-        
-        # Calcular total: subtotal + shipping + expenses
+        # Subtotal y envío guardados en el pedido (ver services/order_totals.py)
+        # Total: subtotal + envío + gastos
         expenses_total = sum(exp.amount for exp in order.expenses)
-        total = subtotal + shipping_amount + expenses_total
+        total = order.subtotal + order.shipping_amount + expenses_total
         
-        order_dict["subtotal"] = round(subtotal)
-        order_dict["shipping_amount"] = shipping_amount
         order_dict["expenses_total"] = expenses_total
         order_dict["total"] = round(total)
         
@@ -107,7 +177,6 @@ def get_order(id):
 @bp.route("/parse", methods=["POST"])
 def parse_order():
     """Parsea texto de pedido y retorna estructura con fuzzy matching de productos"""
-    from ..utils.text_match import similarity_score
     
     data = request.json
     text = data.get("text", "")
@@ -120,43 +189,27 @@ def parse_order():
         parsed = parse_order_text(text)
         items = parsed.get("items", [])
         
-        # Para cada item, buscar productos similares
-        all_products = Product.query.filter_by(active=True).all()
+        # Para cada item, buscar productos similares en el índice de productos activos
+        product_index = get_product_index()
         
         for item in items:
             product_name = item.get("product_name", "")
-            suggestions = []
-            exact_match = None
             
-            # Buscar match exacto o similar
-            for product in all_products:
-                score = similarity_score(product_name, product.name)
-                
-                if score == 100:
-                    # Match exacto
-                    exact_match = product
-                    item["product_id"] = product.id
-                    item["product"] = product.to_dict()
-                    item["match_status"] = "exact"
-                    break
-                elif score >= 75:
-                    # Sugerencia
-                    suggestions.append({
-                        "id": product.id,
-                        "name": product.name,
-                        "score": score,
-                        "category_id": product.category_id,
-                        "sale_price": product.sale_price,
-                        "unit": product.unit
-                    })
+            # Buscar match exacto
+            exact_match = product_index.find_exact(product_name)
+            if exact_match:
+                product = Product.query.get(exact_match["id"])
+                item["product_id"] = product.id
+                item["product"] = product.to_dict()
+                item["match_status"] = "exact"
+                continue
             
-            if not exact_match:
-                # Ordenar sugerencias por score
-                suggestions.sort(key=lambda x: x["score"], reverse=True)
-                item["suggestions"] = suggestions[:5]  # Top 5
-                item["match_status"] = "similar" if suggestions else "not_found"
-                item["product_id"] = None
-                item["product"] = None
+            # Sugerencias ordenadas por score
+            suggestions = product_index.search(product_name, min_score=75)
+            item["suggestions"] = suggestions[:5]  # Top 5
+            item["match_status"] = "similar" if suggestions else "not_found"
+            item["product_id"] = None
+            item["product"] = None
         
         return jsonify(parsed)
     except Exception as e:
@@ -171,6 +224,8 @@ def create_order():
     # Crear o buscar cliente
     customer = None
     customer_data = data.get("customer", {})
+    created_customers = []
+    created_products = False
     
     if customer_data:
         # Buscar por teléfono
@@ -181,11 +236,12 @@ def create_order():
         if not customer and customer_data.get("name"):
             customer = Customer(
                 name=customer_data["name"],
-                phone=customer_data.get("phone", ""),
+                phone=customer_data.get("phone") or None,
                 address=customer_data.get("address", "")
             )
             db.session.add(customer)
             db.session.flush()  # Para obtener el ID
+            created_customers.append(customer)
     
     # Crear o buscar vendedor (opcional)
     seller = None
@@ -210,6 +266,41 @@ def create_order():
     
     # Agregar items
     if "items" in data and len(data["items"]) > 0:
+        # Ofertas vigentes a la fecha del pedido y productos de los items, en una consulta cada uno
+        offer_prices = get_offer_prices(order.created_at or datetime.utcnow())
+        item_product_ids = {item_data.get("product_id") for item_data in data["items"] if item_data.get("product_id")}
+        products_by_id = {}
+        if item_product_ids:
+            products_by_id = {p.id: p for p in Product.query.filter(Product.id.in_(item_product_ids)).all()}
+        
+        # Clientes de los items por nombre normalizado (sin acentos ni mayúsculas):
+        # una consulta para los existentes y un solo INSERT para los que faltan
+        customers_by_name = {}
+        if not customer:
+            item_names = {}
+            for item_data in data["items"]:
+                customer_name = (item_data.get("customer_name") or "").strip()
+                if customer_name:
+                    item_names.setdefault(normalize_text(customer_name), customer_name)
+            
+            if item_names:
+                for existing in Customer.query.filter(
+                    Customer.name_normalized.in_(item_names)
+                ).order_by(Customer.id).all():
+                    customers_by_name.setdefault(existing.name_normalized, existing)
+                
+                # Sin teléfono (NULL): phone es único y "" chocaría entre clientes nuevos
+                new_customers = [
+                    Customer(name=customer_name, phone=None, address="")
+                    for normalized, customer_name in item_names.items()
+                    if normalized not in customers_by_name
+                ]
+                if new_customers:
+                    db.session.add_all(new_customers)
+                    db.session.flush()
+                    created_customers.extend(new_customers)
+                    customers_by_name.update((c.name_normalized, c) for c in new_customers)
+        
         for item_data in data["items"]:
             product_id = item_data.get("product_id")
             
@@ -225,42 +316,27 @@ def create_order():
                 db.session.add(new_product)
                 db.session.flush()
                 product_id = new_product.id
+                products_by_id[product_id] = new_product
+                created_products = True
             
-            # Buscar o crear cliente por nombre
-            customer_name = item_data.get("customer_name", "").strip()
+            # Cliente del item por nombre (ya cargado o creado arriba)
+            customer_name = (item_data.get("customer_name") or "").strip()
             item_customer = customer
             
             if customer_name and not customer:
-                # Buscar cliente por nombre
-                item_customer = Customer.query.filter_by(name=customer_name).first()
-                if not item_customer:
-                    # Crear cliente nuevo
-                    item_customer = Customer(
-                        name=customer_name,
-                        phone="",
-                        address=""
-                    )
-                    db.session.add(item_customer)
-                    db.session.flush()
+                item_customer = customers_by_name.get(normalize_text(customer_name))
             
             # Aplicar oferta semanal si existe y no se especificó unit_price
             unit_price = item_data.get("sale_unit_price") or item_data.get("unit_price")
             if not unit_price:
-                from ..models import WeeklyOffer
                 # Buscar oferta activa para este producto en la fecha del pedido
-                order_date = order.created_at or datetime.utcnow()
-                active_offer = WeeklyOffer.query.filter(
-                    WeeklyOffer.product_id == product_id,
-                    WeeklyOffer.start_date <= order_date,
-                    WeeklyOffer.end_date >= order_date,
-                    WeeklyOffer.active == True
-                ).first()
+                offer_price = offer_prices.get(product_id)
                 
-                if active_offer:
-                    unit_price = active_offer.special_price
+                if offer_price is not None:
+                    unit_price = offer_price
                 else:
-                    # Si no hay oferta, usar precio de venta del producto
-                    product = Product.query.get(product_id)
+                    # Si no hay oferta, usar precio de venta del producto (ya cargado)
+                    product = products_by_id.get(product_id)
                     unit_price = product.sale_price if product else 0
             
             item = OrderItem(
@@ -275,7 +351,13 @@ def create_order():
             )
             db.session.add(item)
     
+    refresh_order_totals([order])
+    if created_customers:
+        refresh_weeks_for_dates([c.created_at for c in created_customers])
+    
     db.session.commit()
+    if created_products:
+        invalidate_catalog()
     
     # Notificar si es de web (sin hacer fallar si no funciona)
     if order.source == "web":
@@ -302,6 +384,8 @@ def emit_order(id):
     order.status = "emitted"
     order.emitted_at = datetime.utcnow()
     
+    refresh_weeks_for_orders([order])
+    refresh_customer_balances_for_orders([order])
     db.session.commit()
     
     return jsonify(order.to_dict())
@@ -315,6 +399,8 @@ def complete_order(id):
     order.status = "completed"
     order.completed_at = datetime.utcnow()
     
+    refresh_weeks_for_orders([order])
+    refresh_customer_balances_for_orders([order])
     db.session.commit()
     
     return jsonify(order.to_dict())
@@ -345,6 +431,8 @@ def update_order(id):
         if "notes" in data:
             order.notes = data["notes"]
         
+        refresh_order_totals([order])
+        refresh_weeks_for_orders([order])
         db.session.commit()
         
         return jsonify(order.to_dict())
@@ -393,18 +481,11 @@ def add_order_item(id):
         # Aplicar oferta semanal si no se especificó unit_price
         unit_price = data.get("unit_price")
         if not unit_price:
-            from ..models import WeeklyOffer
             # Buscar oferta activa para este producto
-            order_date = order.created_at or datetime.utcnow()
-            active_offer = WeeklyOffer.query.filter(
-                WeeklyOffer.product_id == data["product_id"],
-                WeeklyOffer.start_date <= order_date,
-                WeeklyOffer.end_date >= order_date,
-                WeeklyOffer.active == True
-            ).first()
+            offer_price = resolve_offer_price(data["product_id"], order.created_at or datetime.utcnow())
             
-            if active_offer:
-                unit_price = active_offer.special_price
+            if offer_price is not None:
+                unit_price = offer_price
             else:
                 # Si no hay oferta, usar precio de venta del producto
                 unit_price = product.sale_price if product else 0
@@ -421,6 +502,8 @@ def add_order_item(id):
         )
         
         db.session.add(item)
+        refresh_order_totals([order])
+        refresh_weeks_for_orders([order])
         db.session.commit()
         
         return jsonify(item.to_dict()), 201
@@ -488,18 +571,11 @@ def add_order_item_with_auto_create():
         # Aplicar oferta semanal si no se especificó unit_price
         unit_price = data.get("unit_price")
         if not unit_price:
-            from ..models import WeeklyOffer
             # Buscar oferta activa para este producto
-            order_date = order.created_at or datetime.utcnow()
-            active_offer = WeeklyOffer.query.filter(
-                WeeklyOffer.product_id == product_id,
-                WeeklyOffer.start_date <= order_date,
-                WeeklyOffer.end_date >= order_date,
-                WeeklyOffer.active == True
-            ).first()
+            offer_price = resolve_offer_price(product_id, order.created_at or datetime.utcnow())
             
-            if active_offer:
-                unit_price = active_offer.special_price
+            if offer_price is not None:
+                unit_price = offer_price
             else:
                 # Si no hay oferta, usar precio de venta del producto
                 unit_price = product.sale_price if product else 0
@@ -516,6 +592,8 @@ def add_order_item_with_auto_create():
         )
         
         db.session.add(item)
+        refresh_order_totals([order])
+        refresh_weeks_for_orders([order])
         db.session.commit()
         
         return jsonify({
@@ -602,17 +680,10 @@ def update_order_item(item_id):
             item.unit_price = data["unit_price"]
         elif "unit_price" not in data and item.product:
             # Si no se especificó unit_price, verificar si hay oferta activa
-            from ..models import WeeklyOffer
-            order_date = item.order.created_at or datetime.utcnow()
-            active_offer = WeeklyOffer.query.filter(
-                WeeklyOffer.product_id == item.product_id,
-                WeeklyOffer.start_date <= order_date,
-                WeeklyOffer.end_date >= order_date,
-                WeeklyOffer.active == True
-            ).first()
+            offer_price = resolve_offer_price(item.product_id, item.order.created_at or datetime.utcnow())
             
-            if active_offer:
-                item.unit_price = active_offer.special_price
+            if offer_price is not None:
+                item.unit_price = offer_price
             elif not item.unit_price:
                 # Si no hay oferta y no hay unit_price, usar precio del producto
                 item.unit_price = item.product.sale_price if item.product else None
@@ -652,6 +723,8 @@ def update_order_item(item_id):
         except Exception:
             pass
         
+        refresh_order_totals([item.order])
+        refresh_weeks_for_orders([item.order])
         db.session.commit()
         
         return jsonify(item.to_dict())
@@ -677,7 +750,10 @@ def delete_order_item(item_id):
                 "error": "No se pueden eliminar items de un pedido en borrador. Emite el pedido primero."
             }), 400
         
+        order = item.order
         db.session.delete(item)
+        refresh_order_totals([order])
+        refresh_weeks_for_orders([order])
         db.session.commit()
         
         return jsonify({"message": "Item eliminado"})
@@ -770,6 +846,7 @@ def fix_finalized_orders():
                 fixed_count += 1
                 fixed_order_ids.append(order.id)
         
+        refresh_weeks_for_orders(Order.query.filter(Order.id.in_(fixed_order_ids)).all() if fixed_order_ids else [])
         db.session.commit()
         
         return jsonify({
@@ -6,6 +6,7 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from ..db import db
 from ..models import Payment, PaymentAllocation, OrderItem, Customer
+from ..services.customer_ledger import refresh_customer_balances
 
 bp = Blueprint("payments", __name__)
 
@@ -56,6 +57,7 @@ def create_payment():
     )
     
     db.session.add(payment)
+    refresh_customer_balances([payment.customer_id])
     db.session.commit()
     
     # Refrescar el pago para obtener datos actualizados
@@ -82,6 +84,7 @@ def update_payment(id):
         date_str = data["date"].replace('Z', '+00:00')
         payment.date = datetime.fromisoformat(date_str)
     
+    refresh_customer_balances([payment.customer_id])
     db.session.commit()
     
     return jsonify(payment.to_dict())
@@ -93,6 +96,7 @@ def delete_payment(id):
     payment = Payment.query.get_or_404(id)
     
     db.session.delete(payment)
+    refresh_customer_balances([payment.customer_id])
     db.session.commit()
     
     return jsonify({"message": "Pago eliminado"})
@@ -2,9 +2,15 @@
 API: Productos
 CRUD completo + manejo de imágenes
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response
+from sqlalchemy import or_
 from ..db import db
-from ..models import Product, PriceHistory
+from ..models import Product, PriceHistory, Order, OrderItem
+from ..services.catalog import get_catalog, get_catalog_etag, invalidate_catalog
+from ..services.image_variants import build_variants, variant_path, variant_content_type, all_variant_paths
+from ..services.kpi_rollup import refresh_weeks_for_orders
+from ..services.order_totals import refresh_order_totals
+from ..services.product_index import get_product_index, invalidate_product_index
 from ..utils.cloud_storage import upload_file, delete_file
 
 bp = Blueprint("products", __name__)
@@ -28,34 +34,46 @@ def get_products():
     return jsonify([p.to_dict() for p in products])
 
 
+@bp.route("/catalog", methods=["GET"])
+def get_catalog_compact():
+    """
+    Catálogo compacto de productos activos para el frontend
+    Retorna {"categories": [...], "products": [...]}: cada categoría una vez,
+    productos con category_id y offer_price (oferta vigente o null)
+    
+    Responde con ETag; si If-None-Match coincide retorna 304 sin consultar la base
+    """
+    etag = get_catalog_etag()
+    if etag and request.if_none_match.contains_weak(etag):
+        return _catalog_not_modified(etag)
+    
+    body, etag = get_catalog()
+    if request.if_none_match.contains_weak(etag):
+        return _catalog_not_modified(etag)
+    
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _catalog_not_modified(etag):
+    response = Response(status=304)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
 @bp.route("/suggest", methods=["GET"])
 def suggest_products():
     """Sugiere productos basándose en búsqueda fuzzy"""
-    from ..utils.text_match import similarity_score
-    
     query = request.args.get("q", "").strip()
     
     if not query or len(query) < 2:
         return jsonify([])
     
-    # Buscar en todos los productos activos
-    products = Product.query.filter_by(active=True).all()
-    suggestions = []
-    
-    for product in products:
-        score = similarity_score(query, product.name)
-        if score >= 60:  # Umbral más bajo para sugerencias
-            suggestions.append({
-                "id": product.id,
-                "name": product.name,
-                "score": score,
-                "category_id": product.category_id,
-                "sale_price": product.sale_price,
-                "unit": product.unit
-            })
-    
-    # Ordenar por score descendente
-    suggestions.sort(key=lambda x: x["score"], reverse=True)
+    # Buscar en el índice de productos activos (umbral más bajo para sugerencias)
+    suggestions = get_product_index().search(query, min_score=60)
     
     return jsonify(suggestions[:10])  # Top 10
 
@@ -84,6 +102,8 @@ def create_product():
     
     db.session.add(product)
     db.session.commit()
+    invalidate_product_index()
+    invalidate_catalog()
     
     return jsonify(product.to_dict()), 201
 
@@ -107,6 +127,8 @@ def update_product(id):
         )
         db.session.add(history)
     
+    old_sale_price = product.sale_price
+    
     # Actualizar campos
     product.name = data.get("name", product.name)
     product.category_id = data.get("category_id", product.category_id)
@@ -117,7 +139,20 @@ def update_product(id):
     product.notes = data.get("notes", product.notes)
     product.active = data.get("active", product.active)
     
+    # Los items sin precio propio se cobran al precio del producto: actualizar sus pedidos
+    if product.sale_price != old_sale_price:
+        affected_orders = Order.query.join(
+            OrderItem, OrderItem.order_id == Order.id
+        ).filter(
+            OrderItem.product_id == product.id,
+            or_(OrderItem.unit_price.is_(None), OrderItem.unit_price == 0)
+        ).distinct().all()
+        refresh_order_totals(affected_orders)
+        refresh_weeks_for_orders(affected_orders)
+    
     db.session.commit()
+    invalidate_product_index()
+    invalidate_catalog()
     
     return jsonify(product.to_dict())
 
@@ -128,6 +163,8 @@ def delete_product(id):
     product = Product.query.get_or_404(id)
     product.active = False
     db.session.commit()
+    invalidate_product_index()
+    invalidate_catalog()
     
     return jsonify({"message": "Producto desactivado"})
 
@@ -146,11 +183,16 @@ def upload_photo(id):
         return jsonify({"error": "Archivo vacío"}), 400
     
     try:
-        from ..utils.cloud_storage import upload_file, delete_file
+        from ..utils.cloud_storage import upload_file, upload_contents, delete_file, delete_files
         import os
         import uuid
         from werkzeug.utils import secure_filename
         
+        # Variantes reducidas (thumb/medium/full en WebP y JPEG) para el catálogo.
+        # Se generan antes de tocar la foto anterior (si fallan se sube solo el original)
+        variants = build_variants(file.read())
+        file.stream.seek(0)
+        
         # Eliminar foto anterior si existe
         if product.photo_url:
             try:
@@ -158,14 +200,16 @@ def upload_photo(id):
                     # Nueva URL relativa: extraer el path
                     image_path = product.photo_url.replace('/api/images/', '')
                     delete_file(image_path)
+                    delete_files(all_variant_paths(image_path))
                 elif 'storage.googleapis.com' in product.photo_url or product.photo_url.startswith('gs://'):
                     # URL antigua de Cloud Storage
                     delete_file(product.photo_url)
                 elif product.photo_url.startswith('/uploads/'):
-                    # Eliminar archivo local
+                    # Eliminar archivo local y sus variantes
                     local_path = os.path.join(os.path.dirname(__file__), '..', '..', product.photo_url.lstrip('/'))
-                    if os.path.exists(local_path):
-                        os.remove(local_path)
+                    for path in [local_path] + all_variant_paths(local_path):
+                        if os.path.exists(path):
+                            os.remove(path)
             except Exception as e:
                 print(f"Error deleting old photo: {e}")
         
@@ -174,8 +218,15 @@ def upload_photo(id):
         if bucket_name:
             photo_url = upload_file(file, folder=f"products/{product.id}")
             if photo_url:
+                # Variantes junto al original (se eligen con ?size= en /api/images)
+                image_path = photo_url.replace('/api/images/', '')
+                upload_contents({
+                    variant_path(image_path, variant, image_format): (content, variant_content_type(image_format))
+                    for (variant, image_format), content in variants.items()
+                })
                 product.photo_url = photo_url
                 db.session.commit()
+                invalidate_catalog()
                 print(f"✅ Imagen subida a Cloud Storage: {photo_url}")
                 return jsonify({"photo_url": photo_url})
             else:
@@ -193,10 +244,14 @@ def upload_photo(id):
         filepath = os.path.join(upload_folder, unique_filename)
         
         file.save(filepath)
+        for (variant, image_format), content in variants.items():
+            with open(variant_path(filepath, variant, image_format), 'wb') as variant_file:
+                variant_file.write(content)
         
         photo_url = f"/uploads/products/{unique_filename}"
         product.photo_url = photo_url
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({
             "photo_url": photo_url,
@@ -217,24 +272,27 @@ def delete_photo(id):
         return jsonify({"error": "No hay foto para eliminar"}), 400
     
     try:
-        from ..utils.cloud_storage import delete_file
+        from ..utils.cloud_storage import delete_file, delete_files
         import os
         
         if product.photo_url.startswith('/api/images/'):
             # Nueva URL relativa: extraer el path
             image_path = product.photo_url.replace('/api/images/', '')
             delete_file(image_path)
+            delete_files(all_variant_paths(image_path))
         elif 'storage.googleapis.com' in product.photo_url or product.photo_url.startswith('gs://'):
             # URL antigua de Cloud Storage
             delete_file(product.photo_url)
         elif product.photo_url.startswith('/uploads/'):
-            # Eliminar archivo local
+            # Eliminar archivo local y sus variantes
             local_path = os.path.join(os.path.dirname(__file__), '..', '..', product.photo_url.lstrip('/'))
-            if os.path.exists(local_path):
-                os.remove(local_path)
+            for path in [local_path] + all_variant_paths(local_path):
+                if os.path.exists(path):
+                    os.remove(path)
         
         product.photo_url = None
         db.session.commit()
+        invalidate_catalog()
         
         return jsonify({"message": "Foto eliminada"})
     except Exception as e:
@@ -2,40 +2,61 @@
 API: Purchases / Compras
 Gestión de compras de productos
 """
-from datetime import datetime
+import base64
+from datetime import datetime, timedelta
 from flask import Blueprint, request, jsonify
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
 from ..db import db
-from ..models import Purchase, Product, PriceHistory, Order, OrderItem
+from ..models import Purchase, Product, PriceHistory, Order, OrderItem, Customer
+from ..services.kpi_rollup import refresh_weeks_for_orders, refresh_weeks_for_dates
+from ..services.order_totals import refresh_order_totals
+from ..services.purchase_costs import apply_purchase_costs, complete_purchased_orders
+from ..services.shopping_list import build_shopping_list
 
 bp = Blueprint("purchases", __name__, url_prefix="/api/purchases")
 
 
-@bp.route("", methods=["POST"])
-def create_purchase():
+# Paginación del listado de compras
+PURCHASES_DEFAULT_LIMIT = 50
+PURCHASES_MAX_LIMIT = 200
+
+
+class PurchaseError(Exception):
+    """Datos de compra inválidos (con el status HTTP a retornar)"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def _register_purchase(data):
     """
-    Registrar una compra de producto
-    - Registra la conversión cuando corresponda
-    - Registra el precio del producto (en unidad correspondiente o monto total pagado)
-    - Actualiza el costo en OrderItems relacionados
+    Registra una compra sin hacer commit: crea el Purchase, actualiza precio y conversión
+    del producto, propaga costos a los OrderItems y agrega el PriceHistory.
+    Lanza PurchaseError (antes de escribir nada) si los datos no son válidos.
+    Retorna (purchase, ids de pedidos con items modificados).
     """
+    if not isinstance(data, dict):
+        raise PurchaseError("Datos de compra inválidos")
+    
+    product_id = data.get("product_id")
+    if not product_id:
+        raise PurchaseError("product_id es requerido")
+    
+    product = Product.query.get(product_id)
+    if not product:
+        raise PurchaseError("Producto no encontrado", 404)
+    
     try:
-        data = request.json
-        
-        product_id = data.get("product_id")
-        if not product_id:
-            return jsonify({"error": "product_id es requerido"}), 400
-        
-        product = Product.query.get(product_id)
-        if not product:
-            return jsonify({"error": "Producto no encontrado"}), 404
-        
         # Datos básicos de la compra
         qty = float(data.get("qty", 0))
         unit = data.get("unit", "kg")
         price_total = float(data.get("price_total", 0))
         
         if not qty or not price_total:
-            return jsonify({"error": "qty y price_total son requeridos"}), 400
+            raise PurchaseError("qty y price_total son requeridos")
         
         # Precio por unidad (opcional, se puede calcular)
         price_per_unit = data.get("price_per_unit")
@@ -54,249 +75,132 @@ def create_purchase():
         price_per_charged_unit = data.get("price_per_charged_unit")
         if price_per_charged_unit:
             price_per_charged_unit = float(price_per_charged_unit)
-        
-        # Crear registro de compra
-        purchase = Purchase(
-            product_id=product_id,
-            qty=qty,
-            unit=unit,
-            price_total=price_total,
-            price_per_unit=price_per_unit,
-            price_per_charged_unit=price_per_charged_unit,
-            conversion_qty=conversion_qty,
-            conversion_unit=conversion_unit,
-            notes=data.get("notes")
-        )
-        db.session.add(purchase)
-        
-        # Calcular precio en unidad de cobro (unidad del producto)
-        # Si se proporcionó price_per_charged_unit, validar que sea consistente
-        if price_per_charged_unit:
-            # Si hay conversión, validar que price_per_charged_unit * conversion_qty ≈ price_total
-            if conversion_qty and conversion_unit:
-                expected_total = price_per_charged_unit * conversion_qty
-                # Permitir pequeña diferencia por redondeo (5%)
-                if abs(expected_total - price_total) / price_total > 0.05:
-                    # Si hay gran diferencia, recalcular price_total basado en price_per_charged_unit
-                    print(f"⚠️  Advertencia: price_per_charged_unit ({price_per_charged_unit}) * conversion_qty ({conversion_qty}) = {expected_total}, pero price_total = {price_total}")
-                    print(f"   Usando price_per_charged_unit para calcular costo, ajustando price_total a {expected_total}")
-                    price_total = expected_total
-                    # Recalcular price_per_unit también
-                    price_per_unit = price_total / qty
-            cost_per_charged_unit = price_per_charged_unit
-        elif conversion_qty and conversion_unit:
-            # Hay conversión: precio_total / cantidad en unidad de cobro
-            # Esto calcula el costo por unidad de cobro correctamente
-            cost_per_charged_unit = price_total / conversion_qty
-        else:
-            # Sin conversión: usar precio por unidad
-            # Si el precio por unidad no se proporcionó, calcularlo
-            if not price_per_unit or price_per_unit == 0:
-                price_per_unit = price_total / qty
-            cost_per_charged_unit = price_per_unit
-        
-        # Actualizar precio de compra del producto
-        product.purchase_price = cost_per_charged_unit
-        
-        # Actualizar OrderItems existentes: aplicar conversión y registrar costo
-        # IMPORTANTE: Solo actualizar items que NO tienen costo aún o que pertenecen a pedidos no completados
-        # Esto preserva el costo original de pedidos ya completados
-        order_items = OrderItem.query.filter_by(product_id=product_id).all()
-        
-        # Si hay conversión, actualizar avg_units_per_kg y aplicar conversión
+    except (TypeError, ValueError):
+        raise PurchaseError("qty, price_total, conversion_qty y los precios deben ser numéricos")
+    
+    # Crear registro de compra
+    purchase = Purchase(
+        product_id=product_id,
+        qty=qty,
+        unit=unit,
+        price_total=price_total,
+        price_per_unit=price_per_unit,
+        price_per_charged_unit=price_per_charged_unit,
+        conversion_qty=conversion_qty,
+        conversion_unit=conversion_unit,
+        notes=data.get("notes")
+    )
+    db.session.add(purchase)
+    
+    # Calcular precio en unidad de cobro (unidad del producto)
+    # Si se proporcionó price_per_charged_unit, validar que sea consistente
+    if price_per_charged_unit:
+        # Si hay conversión, validar que price_per_charged_unit * conversion_qty ≈ price_total
         if conversion_qty and conversion_unit:
-            # Calcular conversión para el producto
-            if unit == "unit" and conversion_unit == "kg":
-                # X unidades = Y kg → avg_units_per_kg = X / Y
-                product.avg_units_per_kg = qty / conversion_qty
-            elif unit == "kg" and conversion_unit == "unit":
-                # X kg = Y unidades → avg_units_per_kg = Y / X
-                product.avg_units_per_kg = conversion_qty / qty
-            
-            charged_unit = conversion_unit
-            items_updated = 0
-            items_skipped = 0
-            
-            for item in order_items:
-                # Determinar la unidad de cobro correcta: siempre debe ser la unidad del producto
-                # cuando hay conversión, no la unidad del item
-                correct_charged_unit = product.unit  # La unidad del producto es la unidad de cobro
-                
-                # IMPORTANTE: Solo aplicar conversión si charged_qty NO está asignado aún
-                # O si la conversión existente es incorrecta (charged_unit == unit cuando debería ser diferente)
-                needs_conversion = item.unit != correct_charged_unit
-                has_incorrect_conversion = (item.charged_unit and item.charged_unit == item.unit and needs_conversion)
-                
-                if item.charged_qty is None or has_incorrect_conversion:
-                    # Aplicar conversión si es necesario
-                    if item.unit == correct_charged_unit:
-                        # No hay conversión necesaria (item ya está en la unidad correcta)
-                        item.charged_qty = item.qty
-                        item.charged_unit = correct_charged_unit
-                    elif item.unit == "unit" and correct_charged_unit == "kg":
-                        # Item en unidades, se cobra en kg (unidad del producto)
-                        if product.avg_units_per_kg and product.avg_units_per_kg > 0:
-                            item.charged_qty = item.qty / product.avg_units_per_kg
-                            item.charged_unit = correct_charged_unit  # Siempre usar la unidad del producto
-                        else:
-                            # Si no hay avg_units_per_kg, usar la conversión proporcionada
-                            if conversion_qty and conversion_qty > 0:
-                                item.charged_qty = item.qty / (qty / conversion_qty) if qty > 0 else item.qty
-                                item.charged_unit = correct_charged_unit
-                    elif item.unit == "kg" and correct_charged_unit == "unit":
-                        # Item en kg, se cobra en unidades (unidad del producto)
-                        if product.avg_units_per_kg and product.avg_units_per_kg > 0:
-                            item.charged_qty = item.qty * product.avg_units_per_kg
-                            item.charged_unit = correct_charged_unit  # Siempre usar la unidad del producto
-                        else:
-                            # Si no hay avg_units_per_kg, usar la conversión proporcionada
-                            if conversion_qty and conversion_qty > 0:
-                                item.charged_qty = item.qty * (conversion_qty / qty) if qty > 0 else item.qty
-                                item.charged_unit = correct_charged_unit
-                # Si charged_qty ya existe y la conversión es correcta, NO lo actualizamos para preservar la conversión histórica
-                
-                # Actualizar el costo SOLO si:
-                # 1. El item no tiene costo aún (cost is None), O
-                # 2. El pedido no está completado (para permitir actualizaciones antes de completar)
-                try:
-                    current_cost = getattr(item, 'cost', None)
-                    order_status = item.order.status if item.order else None
-                    
-                    # Solo actualizar si no tiene costo o si el pedido no está completado
-                    if current_cost is None or order_status != 'completed':
-                        item.cost = cost_per_charged_unit
-                        items_updated += 1
-                    else:
-                        items_skipped += 1
-                        print(f"  ⏭️  Item {item.id} (pedido #{item.order_id}) ya tiene costo y pedido está completado, no se actualiza")
-                except Exception:
-                    # Si la columna no existe, intentar asignarla
-                    try:
-                        setattr(item, 'cost', cost_per_charged_unit)
-                        items_updated += 1
-                    except Exception as e:
-                        print(f"⚠️  No se pudo asignar costo al item {item.id}: {e}")
-            
-            print(f"✅ Actualizado {items_updated} items con conversión y costo para producto #{product_id} (omitidos {items_skipped} items con costo ya asignado)")
-        else:
-            # Sin conversión: actualizar costos SOLO de items sin costo o de pedidos no completados
-            items_updated = 0
-            items_skipped = 0
-            
-            for item in order_items:
-                # Actualizar costo solo si no tiene costo o si el pedido no está completado
-                try:
-                    current_cost = getattr(item, 'cost', None)
-                    order_status = item.order.status if item.order else None
-                    
-                    # Solo actualizar si no tiene costo o si el pedido no está completado
-                    if current_cost is None or order_status != 'completed':
-                        item.cost = cost_per_charged_unit
-                        # Si no hay conversión, charged_qty debe ser igual a qty
-                        if item.charged_qty is None:
-                            item.charged_qty = item.qty
-                            item.charged_unit = item.unit
-                        items_updated += 1
-                    else:
-                        items_skipped += 1
-                        print(f"  ⏭️  Item {item.id} (pedido #{item.order_id}) ya tiene costo y pedido está completado, no se actualiza")
-                except Exception:
-                    try:
-                        setattr(item, 'cost', cost_per_charged_unit)
-                        if item.charged_qty is None:
-                            item.charged_qty = item.qty
-                            item.charged_unit = item.unit
-                        items_updated += 1
-                    except Exception as e:
-                        print(f"⚠️  No se pudo asignar costo al item {item.id}: {e}")
-            
-            print(f"✅ Actualizado {items_updated} items con costo para producto #{product_id} (sin conversión, omitidos {items_skipped} items con costo ya asignado)")
-        
-        # Crear historial de precio
-        price_history = PriceHistory(
-            product_id=product_id,
-            purchase_price=cost_per_charged_unit,
-            notes=f"Compra registrada: {qty} {unit} por ${price_total} (precio en {product.unit}: ${cost_per_charged_unit:.2f})"
-        )
-        db.session.add(price_history)
-        
-        # Hacer flush para que los cambios de costos estén disponibles antes de verificar pedidos
-        db.session.flush()
-        
-        # Buscar pedidos emitidos con este producto y cambiar status a completed
-        emitted_orders = Order.query.filter_by(status="emitted").all()
-        orders_completed = []
+            expected_total = price_per_charged_unit * conversion_qty
+            # Permitir pequeña diferencia por redondeo (5%)
+            if abs(expected_total - price_total) / price_total > 0.05:
+                # Si hay gran diferencia, recalcular price_total basado en price_per_charged_unit
+                print(f"⚠️  Advertencia: price_per_charged_unit ({price_per_charged_unit}) * conversion_qty ({conversion_qty}) = {expected_total}, pero price_total = {price_total}")
+                print(f"   Usando price_per_charged_unit para calcular costo, ajustando price_total a {expected_total}")
+                price_total = expected_total
+                # Recalcular price_per_unit también
+                price_per_unit = price_total / qty
+        cost_per_charged_unit = price_per_charged_unit
+    elif conversion_qty and conversion_unit:
+        # Hay conversión: precio_total / cantidad en unidad de cobro
+        # Esto calcula el costo por unidad de cobro correctamente
+        cost_per_charged_unit = price_total / conversion_qty
+    else:
+        # Sin conversión: usar precio por unidad
+        # Si el precio por unidad no se proporcionó, calcularlo
+        if not price_per_unit or price_per_unit == 0:
+            price_per_unit = price_total / qty
+        cost_per_charged_unit = price_per_unit
+    
+    # Actualizar precio de compra del producto
+    product.purchase_price = cost_per_charged_unit
+    
+    # Si hay conversión, actualizar avg_units_per_kg del producto
+    if conversion_qty and conversion_unit:
+        if unit == "unit" and conversion_unit == "kg":
+            # X unidades = Y kg → avg_units_per_kg = X / Y
+            product.avg_units_per_kg = qty / conversion_qty
+        elif unit == "kg" and conversion_unit == "unit":
+            # X kg = Y unidades → avg_units_per_kg = Y / X
+            product.avg_units_per_kg = conversion_qty / qty
+    
+    # Actualizar OrderItems existentes: aplicar conversión y registrar costo
+    # IMPORTANTE: Solo se actualizan items que NO tienen costo aún o que pertenecen a pedidos no completados
+    # Esto preserva el costo original de pedidos ya completados
+    touched_order_ids, items_updated = apply_purchase_costs(
+        product, cost_per_charged_unit, qty, conversion_qty, conversion_unit
+    )
+    
+    if conversion_qty and conversion_unit:
+        print(f"✅ Actualizado {items_updated} items con conversión y costo para producto #{product_id}")
+    else:
+        print(f"✅ Actualizado {items_updated} items con costo para producto #{product_id} (sin conversión)")
+    
+    # Crear historial de precio
+    price_history = PriceHistory(
+        product_id=product_id,
+        purchase_price=cost_per_charged_unit,
+        notes=f"Compra registrada: {qty} {unit} por ${price_total} (precio en {product.unit}: ${cost_per_charged_unit:.2f})"
+    )
+    db.session.add(price_history)
+    
+    return purchase, touched_order_ids
+
+
+def _finish_purchases(product_ids, touched_order_ids):
+    """
+    Pasos comunes al final de registrar compras (antes del commit):
+    completa los pedidos emitidos que ya tienen todos sus costos, y actualiza
+    los totales guardados y el resumen KPI. Retorna los ids de pedidos completados.
+    """
+    # Hacer flush para que el precio de compra esté disponible antes de verificar pedidos
+    db.session.flush()
+    
+    # Pedidos emitidos con estos productos que ya tienen costo/precio en todos sus items → completados
+    completed_rows = complete_purchased_orders(product_ids)
+    
+    # Actualizar totales guardados de los pedidos con items modificados
+    touched_orders = Order.query.filter(Order.id.in_(touched_order_ids)).all() if touched_order_ids else []
+    refresh_order_totals(touched_orders)
+    
+    # Actualizar resumen KPI de las semanas con items modificados o pedidos completados
+    refresh_weeks_for_orders(touched_orders)
+    refresh_weeks_for_dates([created_at for _, created_at in completed_rows])
+    
+    orders_completed = [order_id for order_id, _ in completed_rows]
+    if orders_completed:
+        print(f"✅ Total de pedidos completados: {len(orders_completed)} - IDs: {orders_completed}")
+    return orders_completed
+
+
+@bp.route("", methods=["POST"])
+def create_purchase():
+    """
+    Registrar una compra de producto
+    - Registra la conversión cuando corresponda
+    - Registra el precio del producto (en unidad correspondiente o monto total pagado)
+    - Actualiza el costo en OrderItems relacionados
+    """
+    try:
+        data = request.json
         
-        print(f"🔍 Verificando {len(emitted_orders)} pedidos emitidos para producto #{product_id}")
+        try:
+            purchase, touched_order_ids = _register_purchase(data)
+        except PurchaseError as e:
+            db.session.rollback()
+            return jsonify({"error": e.message}), e.status
         
-        for order in emitted_orders:
-            # Verificar si tiene items con este producto
-            has_product = any(
-                item.product_id == product_id
-                for item in order.items
-            )
-            if has_product:
-                print(f"  📦 Pedido #{order.id} tiene items con producto #{product_id} ({len(order.items)} items total)")
-                # Verificar si todos los items del pedido tienen costo registrado
-                # Esto es más preciso que solo verificar purchase_price del producto
-                all_purchased = True
-                items_without_cost = []
-                items_with_cost = []
-                
-                for item in order.items:
-                    # Verificar que el item tenga costo asignado
-                    # No necesitamos refresh porque los items ya están en la sesión después del flush
-                    try:
-                        item_cost = getattr(item, 'cost', None)
-                        if item_cost is not None:
-                            items_with_cost.append({
-                                'item_id': item.id,
-                                'product_id': item.product_id,
-                                'cost': item_cost
-                            })
-                        else:
-                            # Si no tiene costo, verificar si el producto tiene purchase_price
-                            item_product = Product.query.get(item.product_id)
-                            if not item_product or not item_product.purchase_price:
-                                all_purchased = False
-                                items_without_cost.append({
-                                    'item_id': item.id,
-                                    'product_id': item.product_id,
-                                    'product_name': item_product.name if item_product else 'Desconocido',
-                                    'has_purchase_price': item_product.purchase_price if item_product else None
-                                })
-                    except Exception as e:
-                        # Si hay error accediendo a cost, verificar purchase_price como fallback
-                        print(f"⚠️  Error verificando costo del item {item.id}: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        item_product = Product.query.get(item.product_id)
-                        if not item_product or not item_product.purchase_price:
-                            all_purchased = False
-                            items_without_cost.append({
-                                'item_id': item.id,
-                                'product_id': item.product_id,
-                                'product_name': item_product.name if item_product else 'Desconocido',
-                                'error': str(e)
-                            })
-                
-                print(f"    Items con costo: {len(items_with_cost)}, Items sin costo: {len(items_without_cost)}")
-                
-                # Si todos tienen costo/precio, marcar el pedido como completado
-                if all_purchased:
-                    order.status = "completed"
-                    order.completed_at = datetime.utcnow()
-                    orders_completed.append(order.id)
-                    print(f"✅ Pedido #{order.id} marcado como completado")
-                else:
-                    print(f"⚠️  Pedido #{order.id} NO completado - Items sin costo: {items_without_cost}")
+        _finish_purchases([purchase.product_id], touched_order_ids)
         
         # Commit todos los cambios
         db.session.commit()
         
-        if orders_completed:
-            print(f"✅ Total de pedidos completados: {len(orders_completed)} - IDs: {orders_completed}")
-        
         return jsonify({
             "message": "Compra registrada exitosamente",
             "purchase": purchase.to_dict()
@@ -314,72 +218,245 @@ def create_purchase():
         }), 500
 
 
+@bp.route("/bulk", methods=["POST"])
+def create_purchases_bulk():
+    """
+    Registrar varias compras en una sola transacción (ej: todas las de una mañana de mercado)
+    Body: {"purchases": [{...mismo formato que POST /api/purchases...}], "atomic": true}
+    - atomic=true (por defecto): si una línea falla no se registra ninguna
+    - atomic=false: se registran las líneas válidas y se informan las que fallaron
+    Un error inesperado (de base de datos) revierte todo el lote.
+    La auto-completación de pedidos, los totales y el resumen KPI se actualizan una sola vez al final.
+    """
+    data = request.json or {}
+    lines = data.get("purchases")
+    atomic = data.get("atomic", True)
+    
+    if not isinstance(lines, list) or not lines:
+        return jsonify({"error": "purchases debe ser una lista con al menos una compra"}), 400
+    
+    try:
+        results = []
+        product_ids = set()
+        touched_order_ids = set()
+        
+        for index, line in enumerate(lines):
+            # Los errores de validación ocurren antes de escribir, así que la línea se puede omitir
+            try:
+                purchase, line_order_ids = _register_purchase(line)
+            except PurchaseError as e:
+                results.append({"index": index, "status": "error", "error": e.message})
+                continue
+            
+            product_ids.add(purchase.product_id)
+            touched_order_ids.update(line_order_ids)
+            db.session.flush()
+            results.append({"index": index, "status": "created", "purchase": purchase.to_dict()})
+        
+        failed = [result for result in results if result["status"] == "error"]
+        
+        if failed and atomic:
+            db.session.rollback()
+            for result in results:
+                if result["status"] == "created":
+                    result["status"] = "rolled_back"
+                    result.pop("purchase")
+            return jsonify({
+                "error": f"{len(failed)} compra(s) con errores, no se registró ninguna",
+                "results": results
+            }), 400
+        
+        orders_completed = _finish_purchases(product_ids, touched_order_ids)
+        db.session.commit()
+        
+        return jsonify({
+            "message": f"Se registraron {len(results) - len(failed)} compras",
+            "created": len(results) - len(failed),
+            "failed": len(failed),
+            "orders_completed": orders_completed,
+            "results": results
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"Error al registrar compras: {str(e)}"}), 500
+
+
+def encode_purchases_cursor(purchase):
+    """Cursor opaco con (created_at, id) de la última compra de la página"""
+    raw = f"{purchase.created_at.isoformat() if purchase.created_at else ''}|{purchase.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_purchases_cursor(cursor):
+    """Decodifica el cursor. Lanza ValueError si es inválido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at_str, purchase_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at_str), int(purchase_id)
+    except Exception:
+        raise ValueError("cursor inválido")
+
+
+def _load_purchase_customers(purchases):
+    """
+    Clientes asociados a cada compra: items de pedidos completados con el mismo producto
+    creados hasta 7 días antes o después de la compra.
+    Una sola consulta para todas las compras; retorna {purchase_id: [info por cliente]}.
+    """
+    dated = [purchase for purchase in purchases if purchase.created_at]
+    if not dated:
+        return {}
+    
+    window = timedelta(days=7)
+    rows = db.session.query(OrderItem, Order.created_at, Customer, Product.name).join(
+        Order, Order.id == OrderItem.order_id
+    ).join(
+        Customer, Customer.id == OrderItem.customer_id
+    ).outerjoin(
+        Product, Product.id == OrderItem.product_id
+    ).filter(
+        OrderItem.product_id.in_({purchase.product_id for purchase in dated}),
+        Order.status.in_(["completed", "finalized"]),
+        Order.created_at >= min(purchase.created_at for purchase in dated) - window,
+        Order.created_at <= max(purchase.created_at for purchase in dated) + window
+    ).order_by(OrderItem.id).all()
+    
+    rows_by_product = {}
+    for row in rows:
+        rows_by_product.setdefault(row[0].product_id, []).append(row)
+    
+    customers_by_purchase = {}
+    for purchase in dated:
+        date_start = purchase.created_at - window
+        date_end = purchase.created_at + window
+        
+        # Agrupar por cliente
+        customers_info = {}
+        for item, order_date, customer, product_name in rows_by_product.get(purchase.product_id, []):
+            if not (order_date and date_start <= order_date <= date_end):
+                continue
+            
+            if customer.id not in customers_info:
+                customers_info[customer.id] = {
+                    "customer": customer.to_dict(),
+                    "items": [],
+                    "total_qty": 0
+                }
+            
+            qty = item.charged_qty or item.qty
+            customers_info[customer.id]["items"].append({
+                "order_id": item.order_id,
+                "qty": qty,
+                "unit": item.charged_unit or item.unit,
+                "order_date": order_date.isoformat(),
+                "maturity_note": item.maturity_note or "para_4_5_dias",
+                "product_name": product_name
+            })
+            customers_info[customer.id]["total_qty"] += qty
+        
+        customers_by_purchase[purchase.id] = list(customers_info.values())
+    
+    return customers_by_purchase
+
+
 @bp.route("", methods=["GET"])
 def get_purchases():
     """
-    Obtener todas las compras
+    Obtener compras (más recientes primero)
     Si se pasa ?with_customers=true, incluye información de clientes asociados
+    
+    Filtros opcionales: product_id, date_from, date_to (YYYY-MM-DD)
+    Resumen: ?summary=true retorna solo nombre y unidad del producto (sin producto ni categoría anidados)
+    Paginación opcional por cursor: limit, cursor
+    - Sin limit ni cursor: retorna la lista completa (formato original)
+    - Con limit o cursor: retorna {"purchases": [...], "next_cursor": ..., "limit": ...}
     """
     include_customers = request.args.get("with_customers", "false").lower() == "true"
+    summary = request.args.get("summary", "false").lower() == "true"
+    product_id = request.args.get("product_id")
+    date_from = request.args.get("date_from")
+    date_to = request.args.get("date_to")
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    paginated = bool(cursor or limit)
+    
+    if summary:
+        query = Purchase.query.options(joinedload(Purchase.product))
+    else:
+        query = Purchase.query.options(joinedload(Purchase.product).joinedload(Product.category))
+    
+    try:
+        if product_id:
+            query = query.filter(Purchase.product_id == int(product_id))
+        if date_from:
+            start = datetime.combine(datetime.fromisoformat(date_from).date(), datetime.min.time())
+            query = query.filter(Purchase.created_at >= start)
+        if date_to:
+            end = datetime.combine(datetime.fromisoformat(date_to).date(), datetime.max.time())
+            query = query.filter(Purchase.created_at <= end)
+        
+        if paginated:
+            limit = min(int(limit), PURCHASES_MAX_LIMIT) if limit else PURCHASES_DEFAULT_LIMIT
+            if limit <= 0:
+                raise ValueError("limit debe ser mayor a 0")
+        
+        if cursor:
+            cursor_created_at, cursor_id = decode_purchases_cursor(cursor)
+            query = query.filter(or_(
+                Purchase.created_at < cursor_created_at,
+                and_(Purchase.created_at == cursor_created_at, Purchase.id < cursor_id)
+            ))
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros inválidos: {str(e)}"}), 400
     
-    purchases = Purchase.query.order_by(Purchase.created_at.desc()).all()
+    query = query.order_by(Purchase.created_at.desc(), Purchase.id.desc())
     
-    if not include_customers:
-        return jsonify([p.to_dict() for p in purchases])
+    next_cursor = None
+    if paginated:
+        # Pedir una extra para saber si hay más páginas
+        purchases = query.limit(limit + 1).all()
+        if len(purchases) > limit:
+            purchases = purchases[:limit]
+            next_cursor = encode_purchases_cursor(purchases[-1])
+    else:
+        purchases = query.all()
     
-    # Incluir información de clientes asociados
-    from ..models import OrderItem, Customer, Order
+    customers_by_purchase = _load_purchase_customers(purchases) if include_customers else {}
     
-    purchases_with_customers = []
+    result = []
     for purchase in purchases:
-        purchase_dict = purchase.to_dict()
-        
-        # Buscar pedidos que usaron este producto alrededor de la fecha de compra
-        # Buscar items de pedidos completados que usan este producto
-        # y que fueron creados cerca de la fecha de compra (dentro de 7 días antes o después)
-        purchase_date = purchase.created_at
-        if purchase_date:
-            from datetime import timedelta
-            date_start = purchase_date - timedelta(days=7)
-            date_end = purchase_date + timedelta(days=7)
-            
-            # Buscar items de pedidos completados en ese rango de fechas
-            related_items = OrderItem.query.join(Order).filter(
-                OrderItem.product_id == purchase.product_id,
-                Order.status.in_(["completed", "finalized"]),
-                Order.created_at >= date_start,
-                Order.created_at <= date_end
-            ).all()
-            
-            # Agrupar por cliente
-            customers_info = {}
-            for item in related_items:
-                customer = item.customer
-                if customer:
-                    customer_id = customer.id
-                    if customer_id not in customers_info:
-                        customers_info[customer_id] = {
-                            "customer": customer.to_dict(),
-                            "items": [],
-                            "total_qty": 0
-                        }
-                    
-                    qty = item.charged_qty or item.qty
-                    customers_info[customer_id]["items"].append({
-                        "order_id": item.order_id,
-                        "qty": qty,
-                        "unit": item.charged_unit or item.unit,
-                        "order_date": item.order.created_at.isoformat() if item.order.created_at else None,
-                        "maturity_note": item.maturity_note or "para_4_5_dias",
-                        "product_name": item.product.name if item.product else None
-                    })
-                    customers_info[customer_id]["total_qty"] += qty
-            
-            purchase_dict["customers"] = list(customers_info.values())
-        
-        purchases_with_customers.append(purchase_dict)
+        purchase_dict = purchase.to_dict(include_product=not summary)
+        if include_customers and purchase.created_at:
+            purchase_dict["customers"] = customers_by_purchase.get(purchase.id, [])
+        result.append(purchase_dict)
+    
+    if paginated:
+        return jsonify({
+            "purchases": result,
+            "next_cursor": next_cursor,
+            "limit": limit
+        })
     
-    return jsonify(purchases_with_customers)
+    return jsonify(result)
+
+
+@bp.route("/shopping-list", methods=["GET"])
+def get_shopping_list():
+    """
+    Lista de compras: demanda de los pedidos emitidos agregada por producto
+    Cantidades en la unidad del producto (convertidas con avg_units_per_kg), separadas por maturity_note
+    Si se pasa ?by_customer=true, incluye el detalle por cliente
+    """
+    try:
+        by_customer = request.args.get("by_customer", "false").lower() == "true"
+        return jsonify(build_shopping_list(by_customer=by_customer))
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": f"Error generando lista de compras: {str(e)}"}), 500
 
 
 @bp.route("/<int:purchase_id>", methods=["GET"])
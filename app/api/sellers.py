@@ -2,65 +2,50 @@
 API: Vendedores
 CRUD completo (similar a customers)
 """
+import base64
 from datetime import datetime, timedelta, date
 from flask import Blueprint, request, jsonify
 from ..db import db
 from ..models import Seller, Order, Expense, SellerPayment, SellerBonus, SellerConfig
-from ..utils.shipping import calculate_shipping
+from ..services.order_totals import (
+    calculate_order_totals, calculate_order_totals_for_ids, calculate_customer_subtotals
+)
+from ..services.seller_config import (
+    get_seller_config as get_cached_seller_config, get_commission_percent, invalidate_seller_config
+)
+from ..services.seller_costs import preview_seller_costs, insert_missing_seller_costs, seller_costs_by_order
+from ..services.seller_bonus import assign_bonuses
+from ..services.seller_stats import summarize_sellers
 
 bp = Blueprint("sellers", __name__, url_prefix="/api/sellers")
 
+# Paginación del detalle por cliente del resumen global
+GLOBAL_SUMMARY_DEFAULT_LIMIT = 50
+GLOBAL_SUMMARY_MAX_LIMIT = 200
 
-def get_seller_commission_percent():
-    """Obtiene el porcentaje de comisión configurado (por defecto 10%)"""
+# Semanas máximas por asignación de bonos (un año)
+BONUS_MAX_WEEKS = 52
+
+
+def encode_revenue_cursor(total_revenue, customer_id):
+    """Cursor opaco con (monto, id) del último cliente de la página"""
+    raw = f"{total_revenue}|{customer_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_revenue_cursor(cursor):
+    """Decodifica el cursor. Lanza ValueError si es inválido."""
     try:
-        config = SellerConfig.query.first()
-        if config:
-            return config.commission_percent
-        # Si no existe configuración, crear una por defecto
-        try:
-            default_config = SellerConfig(commission_percent=10.0)
-            db.session.add(default_config)
-            db.session.commit()
-            return 10.0
-        except Exception as e:
-            # Si falla al crear, retornar el valor por defecto sin crear
-            print(f"⚠️  Advertencia: No se pudo crear configuración de vendedores: {e}")
-            return 10.0
-    except Exception as e:
-        # Si la tabla no existe aún, retornar valor por defecto
-        print(f"⚠️  Advertencia: Tabla seller_config no disponible: {e}")
-        return 10.0
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        total_revenue, customer_id = raw.rsplit("|", 1)
+        return int(total_revenue), int(customer_id)
+    except Exception:
+        raise ValueError("cursor inválido")
 
 
-def calculate_order_total_for_seller(order):
-    """
-    Calcula el total de un pedido usando la misma lógica que nota de cobro:
-    - Usa charged_qty si existe
-    - Incluye shipping
-    """
-    order_subtotal = 0
-    
-    for item in order.items:
-        # Usar charged_qty siempre que exista
-        if item.charged_qty is not None:
-            qty_to_charge = item.charged_qty
-        else:
-            qty_to_charge = item.qty
-        
-        # Usar unit_price del item, o el sale_price del producto si no existe
-        unit_price = item.unit_price
-        if not unit_price and item.product:
-            unit_price = item.product.sale_price or 0
-        
-        item_revenue = round(qty_to_charge * (unit_price or 0))
-        order_subtotal += item_revenue
-    
-    # Calcular envío
-    shipping_amount = calculate_shipping(order.shipping_type or 'normal', order_subtotal)
-    order_total = order_subtotal + shipping_amount
-    
-    return order_total
+def get_seller_commission_percent():
+    """Obtiene el porcentaje de comisión configurado (por defecto 10%, sin escribir en la base)"""
+    return get_commission_percent()
 
 
 @bp.route("", methods=["GET"])
@@ -169,52 +154,11 @@ def delete_seller(id):
 def get_sellers_summary():
     """
     Obtiene resumen de vendedores ordenados por monto facturado (mejor a peor)
-    Muestra monto facturado y cantidad de pedidos completados
+    Muestra monto facturado, cantidad de pedidos completados, clientes y comisiones
     """
     try:
-        sellers = Seller.query.all()
-        sellers_data = []
-        
-        for seller in sellers:
-            # Obtener pedidos completados con este vendedor
-            completed_orders = Order.query.filter(
-                Order.seller_id == seller.id,
-                Order.status == 'completed'
-            ).all()
-            
-            # Calcular monto facturado y cantidad de pedidos
-            total_revenue = 0
-            orders_count = 0
-            
-            for order in completed_orders:
-                # Calcular subtotal usando charged_qty si existe
-                order_subtotal = 0
-                for item in order.items:
-                    if item.charged_qty is not None:
-                        qty_to_charge = item.charged_qty
-                    else:
-                        qty_to_charge = item.qty
-                    
-                    unit_price = item.unit_price
-                    if not unit_price and item.product:
-                        unit_price = item.product.sale_price or 0
-                    
-                    item_revenue = round(qty_to_charge * (unit_price or 0))
-                    order_subtotal += item_revenue
-                
-                # Calcular envío
-                shipping_amount = calculate_shipping(order.shipping_type or 'normal', order_subtotal)
-                order_total = order_subtotal + shipping_amount
-                
-                if order_total > 0:
-                    total_revenue += order_total
-                    orders_count += 1
-            
-            sellers_data.append({
-                'seller': seller.to_dict(),
-                'total_revenue': total_revenue,
-                'completed_orders_count': orders_count
-            })
+        # Una sola consulta agrupada por vendedor
+        sellers_data = summarize_sellers()
         
         # Ordenar por monto facturado (mayor a menor)
         sellers_data.sort(key=lambda x: x['total_revenue'], reverse=True)
@@ -232,31 +176,7 @@ def get_sellers_summary():
 @bp.route("/config", methods=["GET"])
 def get_seller_config():
     """Obtiene la configuración de vendedores (porcentaje de comisión)"""
-    try:
-        config = SellerConfig.query.first()
-        if not config:
-            # Crear configuración por defecto
-            try:
-                config = SellerConfig(commission_percent=10.0)
-                db.session.add(config)
-                db.session.commit()
-            except Exception as e:
-                # Si falla al crear, retornar valor por defecto
-                print(f"⚠️  Advertencia: No se pudo crear configuración: {e}")
-                return jsonify({
-                    "id": 1,
-                    "commission_percent": 10.0,
-                    "updated_at": None
-                })
-        return jsonify(config.to_dict())
-    except Exception as e:
-        # Si la tabla no existe, retornar valor por defecto
-        print(f"⚠️  Advertencia: Error obteniendo configuración: {e}")
-        return jsonify({
-            "id": 1,
-            "commission_percent": 10.0,
-            "updated_at": None
-        })
+    return jsonify(get_cached_seller_config())
 
 
 @bp.route("/config", methods=["PUT"])
@@ -283,6 +203,7 @@ def update_seller_config():
             config.commission_percent = commission_percent
         
         db.session.commit()
+        invalidate_seller_config()
         return jsonify(config.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -297,73 +218,39 @@ def create_seller_costs():
     Crea costos automáticamente para todos los pedidos completados con vendedor que no tienen costo asociado.
     Calcula el costo como porcentaje de la venta usando la misma lógica que nota de cobro.
     Solo debe haber un costo por pedido.
+    
+    Query params:
+    - dry_run: true para solo informar los costos que se crearían, sin guardar nada
     """
     try:
+        dry_run = request.args.get("dry_run") == "true"
+        
         # Obtener porcentaje de comisión configurado
         commission_percent = get_seller_commission_percent()
         
-        # Obtener pedidos completados con vendedor que no tienen costo de vendedor
-        completed_orders_with_seller = Order.query.filter(
-            Order.status == 'completed',
-            Order.seller_id.isnot(None)
-        ).all()
-        
-        created_costs = []
-        skipped_orders = []
+        # Pedidos completados con vendedor: costos faltantes y pedidos omitidos (una consulta)
+        pending_costs, skipped_orders = preview_seller_costs(commission_percent)
         
-        for order in completed_orders_with_seller:
-            # Verificar si ya tiene un costo de vendedor
-            existing_cost = Expense.query.filter_by(
-                order_id=order.id,
-                is_seller_cost=True
-            ).first()
-            
-            if existing_cost:
-                skipped_orders.append({
-                    'order_id': order.id,
-                    'reason': 'Ya tiene costo asociado'
-                })
-                continue
-            
-            # Calcular total del pedido usando la misma lógica que nota de cobro
-            order_total = calculate_order_total_for_seller(order)
-            
-            if order_total <= 0:
-                skipped_orders.append({
-                    'order_id': order.id,
-                    'reason': 'Pedido sin monto facturado'
-                })
-                continue
-            
-            # Calcular costo como porcentaje de la venta
-            cost_amount = round(order_total * (commission_percent / 100))
-            
-            # Crear el costo
-            cost = Expense(
-                order_id=order.id,
-                category='Comisión Vendedor',
-                amount=cost_amount,
-                is_seller_cost=True,
-                commission_percent=commission_percent,
-                description=f'Comisión del {commission_percent}% sobre venta de ${order_total} para el pedido #{order.id}'
-            )
-            
-            db.session.add(cost)
-            created_costs.append({
-                'order_id': order.id,
-                'seller_id': order.seller_id,
-                'order_total': order_total,
+        if dry_run:
+            return jsonify({
+                'dry_run': True,
+                'created': len(pending_costs),
+                'skipped': len(skipped_orders),
                 'commission_percent': commission_percent,
-                'amount': cost_amount
+                'created_costs': pending_costs,
+                'skipped_orders': skipped_orders
             })
         
+        # Crear todos los costos faltantes en un solo INSERT ... SELECT
+        created_count = insert_missing_seller_costs(commission_percent)
         db.session.commit()
         
         return jsonify({
-            'created': len(created_costs),
+            'dry_run': False,
+            'created': created_count,
             'skipped': len(skipped_orders),
             'commission_percent': commission_percent,
-            'created_costs': created_costs,
+            'created_costs': pending_costs,
             'skipped_orders': skipped_orders
         }), 201
     except Exception as e:
@@ -382,18 +269,21 @@ def get_seller_debt(id):
     try:
         seller = Seller.query.get_or_404(id)
         
-        # Obtener todos los costos de vendedor asociados a pedidos de este vendedor
-        seller_orders = Order.query.filter_by(seller_id=id, status='completed').all()
-        order_ids = [o.id for o in seller_orders]
-        
-        # Obtener costos de vendedor para estos pedidos
-        seller_costs = Expense.query.filter(
-            Expense.order_id.in_(order_ids),
+        # Costos de vendedor de los pedidos completados de este vendedor, con su pedido (una consulta)
+        seller_costs = db.session.query(
+            Expense,
+            Order.created_at,
+            (Order.subtotal + Order.shipping_amount).label('order_total')
+        ).join(
+            Order, Order.id == Expense.order_id
+        ).filter(
+            Order.seller_id == id,
+            Order.status == 'completed',
             Expense.is_seller_cost == True
-        ).all()
+        ).order_by(Expense.id).all()
         
         # Calcular total de costos (lo que se le debe)
-        total_costs = sum(cost.amount for cost in seller_costs)
+        total_costs = sum(cost.amount for cost, _, _ in seller_costs)
         
         # Obtener pagos totales del vendedor
         seller_payments = SellerPayment.query.filter_by(seller_id=id).all()
@@ -403,20 +293,15 @@ def get_seller_debt(id):
         pending_debt = total_costs - total_paid
         
         # Detalle de costos por pedido
-        costs_detail = []
-        for cost in seller_costs:
-            order = Order.query.get(cost.order_id)
-            if order:
-                order_total = calculate_order_total_for_seller(order)
-                costs_detail.append({
-                    'expense_id': cost.id,
-                    'order_id': order.id,
-                    'order_date': order.created_at.isoformat() if order.created_at else None,
-                    'order_total': order_total,
-                    'commission_percent': cost.commission_percent,
-                    'cost_amount': cost.amount,
-                    'description': cost.description
-                })
+        costs_detail = [{
+            'expense_id': cost.id,
+            'order_id': cost.order_id,
+            'order_date': order_date.isoformat() if order_date else None,
+            'order_total': order_total,
+            'commission_percent': cost.commission_percent,
+            'cost_amount': cost.amount,
+            'description': cost.description
+        } for cost, order_date, order_total in seller_costs]
         
         # Obtener pagos del vendedor
         payments_list = [p.to_dict() for p in seller_payments]
@@ -461,8 +346,6 @@ def get_seller_week_summary(id):
     Retorna: cantidad de pedidos, porcentaje de comisión alcanzado, utilidad total (costo del vendedor)
     """
     try:
-        from ..api.kpis import calculate_order_total
-        
         seller = Seller.query.get_or_404(id)
         week_start_str = request.args.get('week_start')
         
@@ -484,6 +367,8 @@ def get_seller_week_summary(id):
             Order.created_at >= week_start_dt,
             Order.created_at <= week_end_dt
         ).all()
+        orders_totals = calculate_order_totals_for_ids(order.id for order in week_orders)
+        seller_costs = seller_costs_by_order(Order.id.in_([order.id for order in week_orders])) if week_orders else {}
         
         # Calcular métricas
         orders_count = 0
@@ -493,18 +378,14 @@ def get_seller_week_summary(id):
         commission_percentages = []  # Cambiar a porcentajes de comisión
         
         for order in week_orders:
-            order_data = calculate_order_total(order)
-            order_total = order_data['order_total']
+            order_total = orders_totals[order.id]['order_total']
             
             if order_total > 0:
                 orders_count += 1
                 total_revenue += order_total
                 
-                # Obtener costo del vendedor para este pedido
-                seller_cost = Expense.query.filter_by(
-                    order_id=order.id,
-                    is_seller_cost=True
-                ).first()
+                # Costo del vendedor para este pedido
+                seller_cost = seller_costs.get(order.id)
                 
                 if seller_cost:
                     total_cost += seller_cost.amount
@@ -545,18 +426,40 @@ def get_seller_global_summary(id):
     Obtiene el resumen global de un vendedor (todo el periodo)
     Retorna: cantidad total de pedidos, porcentaje de utilidad promedio, utilidad total
     Incluye información por cliente con cuánto ha ganado cada uno
+    
+    Paginación opcional del detalle por cliente (orden por monto, mayor a menor): limit, cursor
+    - Sin limit ni cursor: incluye todos los clientes
+    - Con limit o cursor: agrega customers_count, next_cursor y limit a la respuesta
     """
+    cursor = request.args.get("cursor")
+    limit = request.args.get("limit")
+    paginated = bool(cursor or limit)
+    
+    try:
+        if paginated:
+            limit = min(int(limit), GLOBAL_SUMMARY_MAX_LIMIT) if limit else GLOBAL_SUMMARY_DEFAULT_LIMIT
+            if limit <= 0:
+                raise ValueError("limit debe ser mayor a 0")
+        cursor_values = decode_revenue_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": f"Parámetros inválidos: {str(e)}"}), 400
+    
     try:
-        from ..api.kpis import calculate_order_total
         from ..models import Customer
         
         seller = Seller.query.get_or_404(id)
         
-        # Obtener todos los pedidos completados del vendedor
-        all_orders = Order.query.filter(
-            Order.seller_id == id,
-            Order.status == 'completed'
-        ).all()
+        # Totales de todos los pedidos completados del vendedor
+        order_filters = (Order.seller_id == id, Order.status == 'completed')
+        orders_totals = calculate_order_totals(*order_filters)
+        
+        # Costo de vendedor de cada pedido (una consulta)
+        seller_costs = seller_costs_by_order(*order_filters)
+        
+        # Subtotal de cada cliente dentro de cada pedido
+        customer_subtotals_by_order = {}  # {order_id: [{'customer_id': ..., 'subtotal': ...}]}
+        for row in calculate_customer_subtotals(*order_filters):
+            customer_subtotals_by_order.setdefault(row['order_id'], []).append(row)
         
         # Calcular métricas globales
         orders_count = 0
@@ -565,21 +468,17 @@ def get_seller_global_summary(id):
         commission_percentages = []  # Porcentajes de comisión del vendedor
         
         # Agrupar por cliente
-        customers_data = {}  # {customer_id: {'customer': {...}, 'orders': [...], 'total_revenue': 0, 'orders_count': 0}}
+        customers_data = {}  # {customer_id: {'customer_id': ..., 'orders': [...], 'total_revenue': 0, 'orders_count': 0}}
         
-        for order in all_orders:
-            order_data = calculate_order_total(order)
+        for order_id, order_data in orders_totals.items():
             order_total = order_data['order_total']
             
             if order_total > 0:
                 orders_count += 1
                 total_revenue += order_total
                 
-                # Obtener costo del vendedor para este pedido
-                seller_cost = Expense.query.filter_by(
-                    order_id=order.id,
-                    is_seller_cost=True
-                ).first()
+                # Costo del vendedor para este pedido
+                seller_cost = seller_costs.get(order_id)
                 
                 if seller_cost:
                     total_utility += seller_cost.amount
@@ -587,74 +486,83 @@ def get_seller_global_summary(id):
                     if seller_cost.commission_percent is not None:
                         commission_percentages.append(seller_cost.commission_percent)
                 
-                # Agrupar por cliente
-                # Primero calcular subtotal por cliente en este pedido
-                customer_subtotals = {}  # {customer_id: subtotal}
-                order_subtotal = 0
+                # Distribuir revenue (subtotal + envío proporcional) por cliente
+                order_subtotal = order_data['order_subtotal']
+                shipping_amount = order_data['shipping_amount']
                 
-                for item in order.items:
-                    customer_id = item.customer_id
-                    if customer_id not in customers_data:
-                        customer = Customer.query.get(customer_id)
-                        if customer:
-                            customers_data[customer_id] = {
-                                'customer': customer.to_dict(),
-                                'orders': [],
-                                'total_revenue': 0,
-                                'orders_count': 0
-                            }
+                for row in customer_subtotals_by_order.get(order_id, []):
+                    customer_id = row['customer_id']
+                    customer_data = customers_data.setdefault(customer_id, {
+                        'customer_id': customer_id,
+                        'orders': [],
+                        'total_revenue': 0,
+                        'orders_count': 0
+                    })
                     
-                    # Calcular revenue de este item
-                    qty_to_charge = item.charged_qty if item.charged_qty is not None else item.qty
-                    unit_price = item.unit_price
-                    if not unit_price and item.product:
-                        unit_price = item.product.sale_price or 0
-                    item_revenue = round(qty_to_charge * (unit_price or 0))
+                    # Calcular proporción del envío
+                    customer_subtotal = row['subtotal']
+                    shipping_proportion = (customer_subtotal / order_subtotal) if order_subtotal > 0 else 0
+                    customer_order_total = customer_subtotal + (shipping_amount * shipping_proportion)
                     
-                    if customer_id not in customer_subtotals:
-                        customer_subtotals[customer_id] = 0
-                    customer_subtotals[customer_id] += item_revenue
-                    order_subtotal += item_revenue
-                
-                # Calcular envío proporcional
-                from ..utils.shipping import calculate_shipping
-                shipping_amount = calculate_shipping(order.shipping_type or 'normal', order_subtotal)
-                
-                # Distribuir revenue (subtotal + envío proporcional) por cliente
-                for customer_id, customer_subtotal in customer_subtotals.items():
-                    if customer_id in customers_data:
-                        # Calcular proporción del envío
-                        shipping_proportion = (customer_subtotal / order_subtotal) if order_subtotal > 0 else 0
-                        customer_order_total = customer_subtotal + (shipping_amount * shipping_proportion)
-                        
-                        # Agregar a total del cliente
-                        customers_data[customer_id]['total_revenue'] += round(customer_order_total)
-                        
-                        # Agregar pedido si no está ya en la lista
-                        if order.id not in [o['order_id'] for o in customers_data[customer_id]['orders']]:
-                            customers_data[customer_id]['orders'].append({
-                                'order_id': order.id,
-                                'order_date': order.created_at.isoformat() if order.created_at else None,
-                                'order_total': round(customer_order_total)
-                            })
-                            customers_data[customer_id]['orders_count'] += 1
+                    # Agregar a total del cliente
+                    customer_data['total_revenue'] += round(customer_order_total)
+                    customer_data['orders'].append({
+                        'order_id': order_id,
+                        'order_date': order_data['created_at'].isoformat() if order_data['created_at'] else None,
+                        'order_total': round(customer_order_total)
+                    })
+                    customer_data['orders_count'] += 1
         
         # Calcular porcentaje de comisión promedio (promedio de porcentajes de comisión de todos los pedidos)
         avg_utility_percent = sum(commission_percentages) / len(commission_percentages) if commission_percentages else 0
         
-        # Convertir customers_data a lista y ordenar por total_revenue
-        customers_list = list(customers_data.values())
-        customers_list.sort(key=lambda x: x['total_revenue'], reverse=True)
+        # Ordenar clientes por total_revenue (mayor a menor, desempate por id)
+        customers_list = sorted(customers_data.values(), key=lambda x: (-x['total_revenue'], x['customer_id']))
+        
+        next_cursor = None
+        if paginated:
+            if cursor_values:
+                cursor_revenue, cursor_id = cursor_values
+                customers_list = [
+                    c for c in customers_list
+                    if c['total_revenue'] < cursor_revenue
+                    or (c['total_revenue'] == cursor_revenue and c['customer_id'] > cursor_id)
+                ]
+            if len(customers_list) > limit:
+                customers_list = customers_list[:limit]
+                next_cursor = encode_revenue_cursor(customers_list[-1]['total_revenue'], customers_list[-1]['customer_id'])
+        
+        # Datos de los clientes de la página (una consulta)
+        customers_by_id = {
+            customer.id: customer
+            for customer in Customer.query.filter(
+                Customer.id.in_([c['customer_id'] for c in customers_list])
+            ).all()
+        } if customers_list else {}
         
-        return jsonify({
+        customers_result = []
+        for customer_data in customers_list:
+            customer = customers_by_id.get(customer_data.pop('customer_id'))
+            if customer:
+                customers_result.append({'customer': customer.to_dict(), **customer_data})
+        
+        result = {
             'seller_id': id,
             'seller_name': seller.name,
             'orders_count': orders_count,
             'total_revenue': round(total_revenue),
             'total_utility': round(total_utility),  # Lo que se le paga en total
             'avg_utility_percent': round(avg_utility_percent, 2),
-            'customers': customers_list
-        })
+            'customers': customers_result
+        }
+        if paginated:
+            result.update({
+                'customers_count': len(customers_data),
+                'next_cursor': next_cursor,
+                'limit': limit
+            })
+        
+        return jsonify(result)
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -738,34 +646,8 @@ def get_sellers_summary_week():
         current_week_end = datetime.combine(current_week_end, datetime.max.time())
         current_week_start = datetime.combine(current_week_start, datetime.min.time())
         
-        sellers = Seller.query.all()
-        sellers_data = []
-        
-        for seller in sellers:
-            # Obtener pedidos completados con este vendedor SOLO de esta semana
-            completed_orders = Order.query.filter(
-                Order.seller_id == seller.id,
-                Order.status == 'completed',
-                Order.created_at >= current_week_start,
-                Order.created_at <= current_week_end
-            ).all()
-            
-            # Calcular monto facturado y cantidad de pedidos
-            total_revenue = 0
-            orders_count = 0
-            
-            for order in completed_orders:
-                order_total = calculate_order_total_for_seller(order)
-                
-                if order_total > 0:
-                    total_revenue += order_total
-                    orders_count += 1
-            
-            sellers_data.append({
-                'seller': seller.to_dict(),
-                'total_revenue': total_revenue,
-                'completed_orders_count': orders_count
-            })
+        # Una sola consulta agrupada por vendedor, SOLO pedidos de esta semana
+        sellers_data = summarize_sellers(current_week_start, current_week_end)
         
         # Ordenar por monto facturado (mayor a menor)
         sellers_data.sort(key=lambda x: x['total_revenue'], reverse=True)
@@ -805,8 +687,12 @@ def get_week_start(dt=None):
 def assign_weekly_bonus():
     """
     Asigna bonos semanales a vendedores que alcanzaron la meta de pedidos.
-    Solo considera pedidos de la semana actual.
+    Por defecto solo considera pedidos de la semana actual (o de week_start).
     Si alcanzan la meta, actualiza el porcentaje de comisión para los pedidos de esa semana.
+    
+    Body opcional: weeks (cantidad de semanas hasta week_start inclusive, por defecto 1)
+    para asignar varias semanas en lote, ej: weeks=52 para el último año.
+    Volver a asignar una semana actualiza el bono existente del vendedor.
     """
     try:
         data = request.json
@@ -817,6 +703,13 @@ def assign_weekly_bonus():
         if orders_target is None or bonus_percent is None:
             return jsonify({"error": "orders_target y bonus_percent son requeridos"}), 400
         
+        try:
+            weeks = int(data.get('weeks') or 1)
+            if weeks <= 0 or weeks > BONUS_MAX_WEEKS:
+                raise ValueError(f"weeks debe estar entre 1 y {BONUS_MAX_WEEKS}")
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Parámetros inválidos: {str(e)}"}), 400
+        
         # Obtener semana actual si no se especifica
         # Siempre normalizar al lunes de la semana para evitar problemas
         if week_start_str:
@@ -824,113 +717,23 @@ def assign_weekly_bonus():
             week_start = get_week_start(week_start_date)  # get_week_start ya devuelve un date normalizado al lunes
         else:
             week_start = get_week_start()  # get_week_start ya devuelve un date
-        
-        week_end = week_start + timedelta(days=6)
-        week_start_dt = datetime.combine(week_start, datetime.min.time())
-        week_end_dt = datetime.combine(week_end, datetime.max.time())
+        first_week_start = week_start - timedelta(weeks=weeks - 1)
         
         # Obtener porcentaje de comisión base
         base_commission_percent = get_seller_commission_percent()
         final_commission_percent = base_commission_percent + bonus_percent
         
-        # Obtener resumen de vendedores de esta semana
-        sellers = Seller.query.all()
-        bonus_recipients = []
-        
-        for seller in sellers:
-            # Contar pedidos completados SOLO de esta semana
-            week_orders = Order.query.filter(
-                Order.seller_id == seller.id,
-                Order.status == 'completed',
-                Order.created_at >= week_start_dt,
-                Order.created_at <= week_end_dt
-            ).all()
-            
-            orders_count = len(week_orders)
-            
-            # Si alcanzó la meta
-            if orders_count >= orders_target:
-                # Calcular monto total facturado de la semana
-                week_revenue = sum(calculate_order_total_for_seller(o) for o in week_orders)
-                
-                # Calcular bono (diferencia entre comisión con bono y sin bono)
-                base_commission = round(week_revenue * (base_commission_percent / 100))
-                bonus_commission = round(week_revenue * (final_commission_percent / 100))
-                bonus_amount = bonus_commission - base_commission
-                
-                # Actualizar porcentaje de comisión en los costos de esta semana
-                updated_costs = []
-                for order in week_orders:
-                    cost = Expense.query.filter_by(
-                        order_id=order.id,
-                        is_seller_cost=True
-                    ).first()
-                    
-                    if cost:
-                        # Recalcular monto con nuevo porcentaje
-                        order_total = calculate_order_total_for_seller(order)
-                        old_amount = cost.amount
-                        new_amount = round(order_total * (final_commission_percent / 100))
-                        cost.amount = new_amount
-                        cost.commission_percent = final_commission_percent
-                        cost.description = f'Comisión del {final_commission_percent}% (base {base_commission_percent}% + bono {bonus_percent}%) sobre venta de ${order_total} para el pedido #{order.id}'
-                        updated_costs.append({
-                            'order_id': order.id,
-                            'old_amount': old_amount,
-                            'new_amount': new_amount
-                        })
-                    else:
-                        # Si no existe costo, crearlo con el porcentaje de bono
-                        order_total = calculate_order_total_for_seller(order)
-                        new_amount = round(order_total * (final_commission_percent / 100))
-                        new_cost = Expense(
-                            order_id=order.id,
-                            category='Comisión Vendedor',
-                            amount=new_amount,
-                            is_seller_cost=True,
-                            commission_percent=final_commission_percent,
-                            description=f'Comisión del {final_commission_percent}% (base {base_commission_percent}% + bono {bonus_percent}%) sobre venta de ${order_total} para el pedido #{order.id}'
-                        )
-                        db.session.add(new_cost)
-                        updated_costs.append({
-                            'order_id': order.id,
-                            'old_amount': 0,
-                            'new_amount': new_amount
-                        })
-                
-                # Crear registro de bono
-                bonus = SellerBonus(
-                    seller_id=seller.id,
-                    week_start=week_start,
-                    orders_target=orders_target,
-                    orders_achieved=orders_count,
-                    commission_percent=final_commission_percent,
-                    bonus_amount=bonus_amount,
-                    notes=f'Bono por alcanzar meta de {orders_target} pedidos en la semana'
-                )
-                db.session.add(bonus)
-                
-                bonus_recipients.append({
-                    'seller': seller.to_dict(),
-                    'orders_achieved': orders_count,
-                    'orders_target': orders_target,
-                    'week_revenue': week_revenue,
-                    'base_commission': base_commission,
-                    'bonus_amount': bonus_amount,
-                    'final_commission': bonus_commission,
-                    'commission_percent': final_commission_percent,
-                    'updated_costs': updated_costs,
-                    'orders': [{
-                        'order_id': o.id,
-                        'order_date': o.created_at.isoformat() if o.created_at else None,
-                        'order_total': calculate_order_total_for_seller(o)
-                    } for o in week_orders]
-                })
+        # Totales de todos los vendedores y semanas en una consulta agrupada
+        bonus_recipients = assign_bonuses(
+            first_week_start, week_start, orders_target, bonus_percent, base_commission_percent
+        )
         
         db.session.commit()
         
         return jsonify({
             'week_start': week_start.isoformat(),
+            'first_week_start': first_week_start.isoformat(),
+            'weeks': weeks,
             'orders_target': orders_target,
             'bonus_percent': bonus_percent,
             'base_commission_percent': base_commission_percent,
@@ -6,6 +6,8 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from ..db import db
 from ..models import WeeklyOffer, Product
+from ..services.catalog import invalidate_catalog
+from ..services.offer_prices import invalidate_offer_prices
 
 bp = Blueprint("weekly_offers", __name__)
 
@@ -51,6 +53,8 @@ def create_weekly_offer():
         
         db.session.add(offer)
         db.session.commit()
+        invalidate_offer_prices()
+        invalidate_catalog()
         
         return jsonify(offer.to_dict()), 201
     except Exception as e:
@@ -75,6 +79,8 @@ def update_weekly_offer(id):
         offer.active = data["active"]
     
     db.session.commit()
+    invalidate_offer_prices()
+    invalidate_catalog()
     
     return jsonify(offer.to_dict())
 
@@ -86,6 +92,8 @@ def delete_weekly_offer(id):
     
     db.session.delete(offer)
     db.session.commit()
+    invalidate_offer_prices()
+    invalidate_catalog()
     
     return jsonify({"message": "Oferta eliminada"})
 
@@ -112,6 +120,8 @@ def schedule_offers():
         created.append(offer)
     
     db.session.commit()
+    invalidate_offer_prices()
+    invalidate_catalog()
     
     return jsonify({
         "message": f"Se programaron {len(created)} ofertas",
@@ -1,16 +1,50 @@
 """
 Configuración de base de datos 2.
 """
+from pathlib import Path
 from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
+# Directorio con alembic.ini y migrations/
+BASE_DIR = Path(__file__).resolve().parent.parent
 
-def init_db(app):
-    """Inicializa la base de datos con la app Flask"""
-    db.init_app(app)
+
+def get_alembic_config():
+    """Configuración de Alembic del proyecto (independiente del directorio actual)"""
+    from alembic.config import Config
+    
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "migrations"))
+    return config
+
+
+def get_migration_status():
+    """
+    Revisión aplicada en la base y revisión más reciente de las migraciones.
+    Usar dentro de un app context. Retorna (actual, head).
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
     
-    with app.app_context():
-        db.create_all()
-        print("✅ Base de datos inicializada")
+    head = ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+    with db.engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+    return current, head
+
 
+def upgrade_database():
+    """
+    Aplica las migraciones pendientes (alembic upgrade head) sobre la base de la app.
+    Usar dentro de un app context. Retorna (revisión anterior, revisión actual).
+    """
+    from alembic import command
+    from alembic.runtime.migration import MigrationContext
+    
+    config = get_alembic_config()
+    with db.engine.begin() as connection:
+        previous = MigrationContext.configure(connection).get_current_revision()
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+        current = MigrationContext.configure(connection).get_current_revision()
+    return previous, current
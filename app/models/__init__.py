@@ -20,6 +20,9 @@ from .seller import Seller
 from .seller_payment import SellerPayment
 from .seller_bonus import SellerBonus
 from .seller_config import SellerConfig
+from .kpi_weekly_rollup import KpiWeeklyRollup
+from .order_customer_total import OrderCustomerTotal
+from .customer_balance import CustomerBalance
 
 __all__ = [
     "Category",
@@ -40,5 +43,8 @@ __all__ = [
     "SellerPayment",
     "SellerBonus",
     "SellerConfig",
+    "KpiWeeklyRollup",
+    "OrderCustomerTotal",
+    "CustomerBalance",
 ]
 
@@ -4,14 +4,31 @@ Sin cambios respecto a V1 - funciona perfecto
 """
 from datetime import datetime
 from ..db import db
+from ..utils.text_match import normalize_text, normalize_phone
 
 
 class Customer(db.Model):
     __tablename__ = "customers"
+    __table_args__ = (
+        # Búsqueda por prefijo (LIKE 'abc%') sobre el nombre normalizado
+        db.Index(
+            "ix_customers_name_normalized", "name_normalized",
+            postgresql_ops={"name_normalized": "varchar_pattern_ops"}
+        ),
+        # Búsqueda por prefijo sobre los dígitos del teléfono
+        db.Index(
+            "ix_customers_phone_digits", "phone_digits",
+            postgresql_ops={"phone_digits": "varchar_pattern_ops"}
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
+    # Nombre sin acentos, en minúsculas y con espacios simples (se actualiza al asignar name)
+    name_normalized = db.Column(db.String(120), nullable=True)
     phone = db.Column(db.String(40), nullable=True, unique=True)
+    # Solo los dígitos del teléfono (se actualiza al asignar phone)
+    phone_digits = db.Column(db.String(40), nullable=True)
     email = db.Column(db.String(120), nullable=True)
     address = db.Column(db.String(200), nullable=True)
     preferences = db.Column(db.Text, nullable=True)
@@ -19,6 +36,16 @@ class Customer(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    @db.validates("name")
+    def _set_name_normalized(self, key, name):
+        self.name_normalized = normalize_text(name)
+        return name
+
+    @db.validates("phone")
+    def _set_phone_digits(self, key, phone):
+        self.phone_digits = normalize_phone(phone) or None
+        return phone
+
     def to_dict(self):
         return {
             "id": self.id,
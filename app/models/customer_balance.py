@@ -0,0 +1,38 @@
+"""
+Modelo: Saldo de cliente
+Totales de deuda y pagos mantenidos en cada escritura, para leer la deuda
+pendiente de un cliente con una sola fila
+"""
+from datetime import datetime
+from ..db import db
+
+
+class CustomerBalance(db.Model):
+    __tablename__ = "customer_balances"
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customers.id"), nullable=False, unique=True, index=True)
+
+    # Pedidos emitidos/completados del cliente: subtotal de sus items + envío, por pedido
+    orders_total = db.Column(db.Integer, nullable=False, default=0)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Suma de pagos del cliente
+    payments_total = db.Column(db.Float, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def pending_debt(self):
+        return (self.orders_total or 0) - (self.payments_total or 0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "customer_id": self.customer_id,
+            "orders_total": self.orders_total,
+            "orders_count": self.orders_count,
+            "payments_total": self.payments_total,
+            "pending_debt": self.pending_debt,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
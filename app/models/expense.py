@@ -8,6 +8,10 @@ from ..db import db
 
 class Expense(db.Model):
     __tablename__ = "expenses"
+    __table_args__ = (
+        # Costos de vendedor por pedido
+        db.Index("ix_expenses_order_id_is_seller_cost", "order_id", "is_seller_cost"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False)
@@ -0,0 +1,56 @@
+"""
+Modelo: Resumen semanal de KPIs
+Totales precalculados por semana para que /api/kpis no recorra todo el historial
+"""
+from datetime import datetime
+from ..db import db
+
+
+class KpiWeeklyRollup(db.Model):
+    __tablename__ = "kpi_weekly_rollups"
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Semana (fecha de inicio - lunes)
+    week_start = db.Column(db.Date, nullable=False, unique=True, index=True)
+
+    # Pedidos emitidos/completados de la semana (incluye pedidos con monto 0)
+    orders_seen = db.Column(db.Integer, nullable=False, default=0)
+
+    # Pedidos con monto > 0 y su facturación
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    # Costo y utilidad de pedidos con costo registrado
+    cost_total = db.Column(db.Float, nullable=False, default=0)
+    utility_total = db.Column(db.Float, nullable=False, default=0)
+    utility_percent_sum = db.Column(db.Float, nullable=False, default=0)
+    utility_orders_count = db.Column(db.Integer, nullable=False, default=0)
+
+    # Facturación de pedidos con vendedor
+    seller_revenue = db.Column(db.Float, nullable=False, default=0)
+
+    # Pedidos completados por vendedor: {"seller_id": count}
+    completed_orders_by_seller = db.Column(db.JSON, nullable=True)
+
+    # Clientes creados en la semana (desde KPI_START_DATE)
+    new_customers = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "week_start": self.week_start.isoformat() if self.week_start else None,
+            "orders_seen": self.orders_seen,
+            "orders_count": self.orders_count,
+            "revenue": self.revenue,
+            "cost_total": self.cost_total,
+            "utility_total": self.utility_total,
+            "utility_percent_sum": self.utility_percent_sum,
+            "utility_orders_count": self.utility_orders_count,
+            "seller_revenue": self.seller_revenue,
+            "completed_orders_by_seller": self.completed_orders_by_seller or {},
+            "new_customers": self.new_customers,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
@@ -8,9 +8,17 @@ from ..db import db
 
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Pedidos que cuentan para KPIs y deudas, por fecha (índice parcial)
+        db.Index(
+            "ix_orders_open_created_at", "created_at",
+            postgresql_where=db.text("status IN ('emitted', 'completed')"),
+            sqlite_where=db.text("status IN ('emitted', 'completed')")
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    status = db.Column(db.String(20), nullable=False, default="draft")
+    status = db.Column(db.String(20), nullable=False, default="draft", index=True)
     # draft | emitted | completed | cancelled
     
     source = db.Column(db.String(20), nullable=False, default="manual")
@@ -20,13 +28,20 @@ class Order(db.Model):
     # fast (rápido, mismo día antes de 12:00, +10%) | normal (día siguiente, +0%) | cheap (económico, 1-3 días, -10%)
     
     # Vendedor asociado (opcional)
-    seller_id = db.Column(db.Integer, db.ForeignKey("sellers.id"), nullable=True)
+    seller_id = db.Column(db.Integer, db.ForeignKey("sellers.id"), nullable=True, index=True)
     
     notes = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     emitted_at = db.Column(db.DateTime, nullable=True)
     completed_at = db.Column(db.DateTime, nullable=True)
     
+    # Totales persistidos (se actualizan al escribir items, ver services/order_totals.py)
+    subtotal = db.Column(db.Integer, nullable=False, default=0)
+    shipping_amount = db.Column(db.Integer, nullable=False, default=0)
+    cost_total = db.Column(db.Float, nullable=False, default=0)
+    items_count = db.Column(db.Integer, nullable=False, default=0)
+    cost_items_count = db.Column(db.Integer, nullable=False, default=0)  # Items con costo registrado
+    
     # Relación
     seller = db.relationship("Seller", backref="orders")
 
@@ -42,5 +57,8 @@ class Order(db.Model):
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "emitted_at": self.emitted_at.isoformat() if self.emitted_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "subtotal": self.subtotal,
+            "shipping_amount": self.shipping_amount,
+            "items_count": self.items_count,
         }
 
@@ -0,0 +1,33 @@
+"""
+Modelo: Totales por cliente dentro de un pedido
+Subtotal persistido de los items de cada cliente en cada pedido (sin envío)
+"""
+from datetime import datetime
+from ..db import db
+
+
+class OrderCustomerTotal(db.Model):
+    __tablename__ = "order_customer_totals"
+    __table_args__ = (
+        db.UniqueConstraint("order_id", "customer_id", name="uq_order_customer_totals_order_customer"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey("orders.id"), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customers.id"), nullable=False, index=True)
+
+    # Suma de los items del cliente (cada item redondeado, sin envío)
+    subtotal = db.Column(db.Integer, nullable=False, default=0)
+    items_count = db.Column(db.Integer, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "order_id": self.order_id,
+            "customer_id": self.customer_id,
+            "subtotal": self.subtotal,
+            "items_count": self.items_count,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
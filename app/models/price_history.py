@@ -8,6 +8,10 @@ from ..db import db
 
 class PriceHistory(db.Model):
     __tablename__ = "price_history"
+    __table_args__ = (
+        # Último precio de compra de un producto
+        db.Index("ix_price_history_product_id_date", "product_id", "date"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey("products.id"), nullable=False)
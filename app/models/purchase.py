@@ -36,11 +36,10 @@ class Purchase(db.Model):
     # Relación
     product = db.relationship("Product", backref="purchases")
 
-    def to_dict(self):
-        return {
+    def to_dict(self, include_product=True):
+        data = {
             "id": self.id,
             "product_id": self.product_id,
-            "product": self.product.to_dict() if self.product else None,
             "qty": self.qty,
             "unit": self.unit,
             "price_total": self.price_total,
@@ -51,4 +50,13 @@ class Purchase(db.Model):
             "notes": self.notes,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+        
+        if include_product:
+            data["product"] = self.product.to_dict() if self.product else None
+        else:
+            # Resumen: solo nombre y unidad del producto (sin categoría)
+            data["product_name"] = self.product.name if self.product else None
+            data["product_unit"] = self.product.unit if self.product else None
+        
+        return data
 
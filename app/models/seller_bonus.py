@@ -8,6 +8,10 @@ from ..db import db
 
 class SellerBonus(db.Model):
     __tablename__ = "seller_bonuses"
+    __table_args__ = (
+        # Un bono por vendedor y semana (listado por semana y upsert)
+        db.Index("ix_seller_bonuses_week_start_seller_id", "week_start", "seller_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     seller_id = db.Column(db.Integer, db.ForeignKey("sellers.id"), nullable=False)
@@ -0,0 +1,90 @@
+"""
+Servicio: Catálogo compacto
+Arma el catálogo de productos activos para el frontend en un formato compacto:
+categorías listadas una vez, productos con category_id (sin la categoría
+embebida en cada fila) y el precio de la oferta vigente de cada producto.
+
+- El catálogo serializado se guarda por proceso junto a su ETag (hash del
+  contenido), así un If-None-Match que coincide se responde con 304 sin
+  consultar la base.
+- Versión del catálogo: contador por proceso que sube en cada escritura de
+  productos, categorías u ofertas (invalidate_catalog) y descarta el catálogo
+  guardado. El ETag sale del contenido y no del contador, así es el mismo en
+  todos los workers para el mismo catálogo.
+- Expiración corta, para que los cambios hechos en otro worker (y las ofertas
+  que empiezan o terminan) se vean sin reiniciar.
+"""
+import hashlib
+import time
+from threading import Lock
+from flask import current_app
+from ..models import Category, Product
+from .offer_prices import get_offer_prices
+
+# Segundos que un catálogo armado sigue siendo válido en el proceso
+CATALOG_CACHE_TTL = 60
+
+_catalog_version = 0
+_cached_catalog = None  # (versión, momento de armado, cuerpo JSON, ETag)
+_catalog_lock = Lock()
+
+
+def build_catalog():
+    """Catálogo compacto como dict: categorías, productos activos y precios de oferta vigentes"""
+    categories = Category.query.order_by(Category.order, Category.id).all()
+    products = Product.query.filter_by(active=True).order_by(Product.name).all()
+    offer_prices = get_offer_prices()
+
+    return {
+        "categories": [category.to_dict() for category in categories],
+        "products": [{
+            "id": product.id,
+            "name": product.name,
+            "category_id": product.category_id,
+            "photo_url": product.photo_url,
+            "sale_price": product.sale_price,
+            "offer_price": offer_prices.get(product.id),
+            "unit": product.unit,
+            "avg_units_per_kg": product.avg_units_per_kg,
+        } for product in products],
+    }
+
+
+def get_catalog_etag():
+    """ETag del catálogo guardado en el proceso (None si hay que volver a armarlo)"""
+    now = time.monotonic()
+    with _catalog_lock:
+        cached = _cached_catalog
+        version = _catalog_version
+    if cached and cached[0] == version and now - cached[1] < CATALOG_CACHE_TTL:
+        return cached[3]
+    return None
+
+
+def get_catalog():
+    """Catálogo serializado y su ETag: (cuerpo JSON, etag) desde el proceso, sino desde la base"""
+    global _cached_catalog
+
+    now = time.monotonic()
+    with _catalog_lock:
+        cached = _cached_catalog
+        version = _catalog_version
+    if cached and cached[0] == version and now - cached[1] < CATALOG_CACHE_TTL:
+        return cached[2], cached[3]
+
+    body = current_app.json.dumps(build_catalog())
+    etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+    with _catalog_lock:
+        # Si hubo una escritura mientras se armaba, no guardar un catálogo viejo
+        if _catalog_version == version:
+            _cached_catalog = (version, now, body, etag)
+    return body, etag
+
+
+def invalidate_catalog():
+    """Sube la versión del catálogo (llamar después de escribir productos, categorías u ofertas)"""
+    global _catalog_version, _cached_catalog
+
+    with _catalog_lock:
+        _catalog_version += 1
+        _cached_catalog = None
@@ -0,0 +1,170 @@
+"""
+Servicio: Saldos de clientes
+Mantiene la tabla customer_balances para que la deuda pendiente de un cliente
+sea una lectura de una fila, en vez de recorrer todos sus pedidos y pagos.
+
+Misma fórmula que /api/customers/<id>/debt:
+- Deuda: por cada pedido emitido/completado/finalizado, subtotal de los items
+  del cliente + envío calculado sobre ese subtotal
+- Pagado: suma de los pagos del cliente
+
+Se recalcula el saldo de los clientes afectados al cambiar items o totales de
+pedidos, al emitir/completar pedidos y al crear, editar o eliminar pagos.
+"""
+from sqlalchemy import func
+from ..db import db
+from ..models import Order, OrderItem, Payment, CustomerBalance
+from ..utils.shipping import calculate_shipping
+from .order_totals import calculate_customer_subtotals
+
+# Estados de pedido que cuentan como deuda
+DEBT_STATUSES = ('completed', 'emitted', 'finalized')
+
+
+def compute_customer_balances(customer_ids=None):
+    """
+    Cálculo directo de los saldos (todos los clientes o los indicados).
+    Retorna {customer_id: {'orders_total', 'orders_count', 'payments_total'}}.
+    """
+    order_filters = [Order.status.in_(DEBT_STATUSES)]
+    payment_query = db.session.query(
+        Payment.customer_id,
+        func.sum(func.coalesce(Payment.amount, 0))
+    )
+    if customer_ids is not None:
+        order_filters.append(OrderItem.customer_id.in_(customer_ids))
+        payment_query = payment_query.filter(Payment.customer_id.in_(customer_ids))
+
+    balances = {}
+
+    def balance_for(customer_id):
+        return balances.setdefault(customer_id, {'orders_total': 0, 'orders_count': 0, 'payments_total': 0.0})
+
+    for row in calculate_customer_subtotals(*order_filters):
+        balance = balance_for(row['customer_id'])
+        balance['orders_total'] += row['subtotal'] + calculate_shipping(row['shipping_type'], row['subtotal'])
+        balance['orders_count'] += 1
+
+    for customer_id, amount in payment_query.group_by(Payment.customer_id).all():
+        balance_for(customer_id)['payments_total'] = float(amount or 0)
+
+    return balances
+
+
+def refresh_customer_balances(customer_ids):
+    """Recalcula y guarda el saldo de los clientes dados (llamar antes del commit)"""
+    customer_ids = {customer_id for customer_id in customer_ids if customer_id}
+    if not customer_ids:
+        return
+
+    db.session.flush()
+    expected = compute_customer_balances(customer_ids)
+    existing = {
+        balance.customer_id: balance
+        for balance in CustomerBalance.query.filter(CustomerBalance.customer_id.in_(customer_ids)).all()
+    }
+
+    for customer_id in customer_ids:
+        values = expected.get(customer_id, {'orders_total': 0, 'orders_count': 0, 'payments_total': 0.0})
+        balance = existing.get(customer_id)
+        if not balance:
+            balance = CustomerBalance(customer_id=customer_id)
+            db.session.add(balance)
+        balance.orders_total = values['orders_total']
+        balance.orders_count = values['orders_count']
+        balance.payments_total = values['payments_total']
+
+
+def refresh_customer_balances_for_orders(orders):
+    """Recalcula el saldo de los clientes con items en los pedidos dados (llamar antes del commit)"""
+    order_ids = {order.id for order in orders if order}
+    if not order_ids:
+        return
+
+    db.session.flush()
+    customer_ids = db.session.query(OrderItem.customer_id).filter(
+        OrderItem.order_id.in_(order_ids)
+    ).distinct().all()
+    refresh_customer_balances(row[0] for row in customer_ids)
+
+
+def get_customer_balance(customer_id):
+    """
+    Saldo guardado del cliente como dict (ceros si no tiene movimientos).
+    Solo lectura: si la tabla todavía no se generó (ver ensure_customer_balances)
+    se calcula el saldo directo para este pedido sin guardarlo.
+    """
+    balance = CustomerBalance.query.filter_by(customer_id=customer_id).first()
+    if balance:
+        values = {
+            'orders_total': balance.orders_total,
+            'orders_count': balance.orders_count,
+            'payments_total': balance.payments_total
+        }
+    elif CustomerBalance.query.first() is None:
+        values = compute_customer_balances([customer_id]).get(customer_id)
+    else:
+        values = None
+
+    orders_total = values['orders_total'] if values else 0
+    payments_total = values['payments_total'] if values else 0
+    return {
+        'total_debt': orders_total,
+        'total_paid': payments_total,
+        'pending_debt': orders_total - payments_total,
+        'orders_count': values['orders_count'] if values else 0
+    }
+
+
+def rebuild_customer_balances():
+    """Regenera todos los saldos desde cero. Retorna la cantidad de clientes con saldo."""
+    balances = compute_customer_balances()
+
+    CustomerBalance.query.delete(synchronize_session=False)
+    db.session.add_all([
+        CustomerBalance(
+            customer_id=customer_id,
+            orders_total=values['orders_total'],
+            orders_count=values['orders_count'],
+            payments_total=values['payments_total']
+        )
+        for customer_id, values in balances.items()
+    ])
+    db.session.commit()
+    return len(balances)
+
+
+def ensure_customer_balances():
+    """
+    Genera los saldos la primera vez (tabla vacía con pedidos o pagos existentes).
+    Se corre en el deploy (scripts/upgrade_db.py), nunca desde un GET.
+    """
+    if CustomerBalance.query.first() is None and (OrderItem.query.first() or Payment.query.first()):
+        print("🔄 Saldos de clientes vacíos, reconstruyendo...")
+        count = rebuild_customer_balances()
+        print(f"✅ Saldos de clientes generados ({count} clientes)")
+
+
+def verify_customer_balances(tolerance=0.5):
+    """
+    Compara los saldos guardados contra el cálculo directo.
+    Retorna la lista de diferencias encontradas (vacía si todo cuadra).
+    """
+    expected = compute_customer_balances()
+    stored = {balance.customer_id: balance for balance in CustomerBalance.query.all()}
+
+    mismatches = []
+    for customer_id in sorted(set(expected) | set(stored)):
+        values = expected.get(customer_id, {'orders_total': 0, 'orders_count': 0, 'payments_total': 0.0})
+        balance = stored.get(customer_id)
+        for field in ('orders_total', 'orders_count', 'payments_total'):
+            stored_value = getattr(balance, field) if balance else 0
+            if abs((stored_value or 0) - values[field]) > tolerance:
+                mismatches.append({
+                    'customer_id': customer_id,
+                    'field': field,
+                    'stored': stored_value,
+                    'expected': values[field]
+                })
+
+    return mismatches
@@ -0,0 +1,127 @@
+"""
+Servicio: Variantes de imágenes
+Genera al subir una foto versiones reducidas (thumb, medium, full) en WebP y JPEG,
+guardadas junto al original, para que el catálogo no descargue la foto completa
+(hasta 16 MB) en cada tarjeta.
+
+- Nombre de cada variante: el del original + "__<variante>.<formato>"
+  (ej: products/17/abc_foto.png -> products/17/abc_foto.png__thumb.webp),
+  así se ubica desde la URL del original sin consultar la base.
+- Las variantes mantienen la proporción y nunca agrandan la imagen.
+- Si el archivo no es una imagen que Pillow pueda leer o reducir, no se generan variantes
+  y se sigue sirviendo el original.
+"""
+from io import BytesIO
+from PIL import Image, ImageOps
+
+# Lado mayor (px) de cada variante
+VARIANT_SIZES = {
+    "thumb": 200,
+    "medium": 600,
+    "full": 1600,
+}
+
+# Formato -> (extensión, content-type, opciones de Pillow)
+VARIANT_FORMATS = {
+    "webp": ("webp", "image/webp", {"format": "WEBP", "quality": 80, "method": 4}),
+    "jpeg": ("jpg", "image/jpeg", {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def variant_path(original_path, variant, image_format):
+    """Path de una variante a partir del path (o nombre de archivo) del original"""
+    extension = VARIANT_FORMATS[image_format][0]
+    return f"{original_path}__{variant}.{extension}"
+
+
+def variant_content_type(image_format):
+    return VARIANT_FORMATS[image_format][1]
+
+
+def all_variant_paths(original_path):
+    """Paths de todas las variantes de un original (para eliminarlas junto a él)"""
+    return [
+        variant_path(original_path, variant, image_format)
+        for variant in VARIANT_SIZES
+        for image_format in VARIANT_FORMATS
+    ]
+
+
+def _flatten(image, image_format):
+    """Modo de color compatible con el formato (JPEG no tiene transparencia: fondo blanco)"""
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if has_alpha:
+        image = image.convert("RGBA")
+        if image_format == "jpeg":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            return background
+        return image
+    return image.convert("RGB") if image.mode != "RGB" else image
+
+
+def _to_8bit(image):
+    """Modo de 8 bits por canal que Pillow puede reducir (ej: PNG de 16 bits en escala de grises)"""
+    if image.mode in ("RGB", "RGBA", "L", "LA", "P"):
+        return image
+    if image.mode == "I" or image.mode.startswith("I;16"):
+        # Escalar 0-65535 a 0-255 (convertir directo a RGB satura todo a blanco)
+        return image.convert("I").point(lambda value: value / 256).convert("L")
+    return image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+
+def build_variants(content):
+    """
+    Genera todas las variantes de una imagen.
+    Retorna {(variante, formato): bytes}, o {} si el contenido no es una imagen
+    que se pueda leer o reducir (ante cualquier error de Pillow).
+    """
+    try:
+        image = Image.open(BytesIO(content))
+        # JPEG: decodificar directamente a una escala cercana a la variante más grande
+        largest = max(VARIANT_SIZES.values())
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+        image = _to_8bit(image)
+
+        variants = {}
+        # De la variante más grande a la más chica, reduciendo desde la anterior
+        source = image
+        for variant, max_side in sorted(VARIANT_SIZES.items(), key=lambda item: item[1], reverse=True):
+            resized = source.copy()
+            resized.thumbnail((max_side, max_side), Image.LANCZOS)
+            for image_format, (_, _, save_options) in VARIANT_FORMATS.items():
+                output = BytesIO()
+                _flatten(resized, image_format).save(output, **save_options)
+                variants[(variant, image_format)] = output.getvalue()
+            source = resized
+    except Exception as e:
+        print(f"⚠️  Advertencia: No se pudieron generar variantes de la imagen: {e}")
+        return {}
+
+    return variants
+
+
+def select_variant(args, accept_mimetypes):
+    """
+    Variante pedida por query params: ?size=thumb|medium|full y opcional ?format=webp|jpeg
+    (sin format se usa WebP si el header Accept lo incluye, sino JPEG).
+    Retorna (variante, formato, formato_negociado) o None si no se pidió variante.
+    Lanza ValueError si los parámetros son inválidos.
+    """
+    variant = args.get("size")
+    if not variant:
+        return None
+    if variant not in VARIANT_SIZES:
+        raise ValueError(f"size debe ser uno de: {', '.join(VARIANT_SIZES)}")
+
+    image_format = args.get("format")
+    if image_format:
+        if image_format not in VARIANT_FORMATS:
+            raise ValueError(f"format debe ser uno de: {', '.join(VARIANT_FORMATS)}")
+        return variant, image_format, False
+
+    # Solo si lo declara explícitamente (image/* o */* no garantizan soporte de WebP)
+    image_format = "webp" if "image/webp" in accept_mimetypes.values() else "jpeg"
+    return variant, image_format, True
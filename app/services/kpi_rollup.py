@@ -0,0 +1,212 @@
+"""
+Servicio: Resumen semanal de KPIs
+Mantiene la tabla kpi_weekly_rollups al día para que /api/kpis lea pocas filas
+en vez de recalcular todo el historial de pedidos en cada visita al dashboard.
+
+Cada escritura que afecta un pedido emitido/completado (emitir, completar, editar,
+cambiar items, registrar compras) recalcula solo la semana de ese pedido.
+"""
+from datetime import datetime, timedelta
+from ..db import db
+from ..models import Order, Customer, KpiWeeklyRollup
+from .order_totals import calculate_order_totals
+
+# Campos numéricos del resumen que se suman entre semanas
+SUM_FIELDS = (
+    'orders_seen',
+    'orders_count',
+    'revenue',
+    'cost_total',
+    'utility_total',
+    'utility_percent_sum',
+    'utility_orders_count',
+    'seller_revenue',
+    'new_customers',
+)
+
+
+def _week_bounds(week_start):
+    """Rango [inicio, fin] de la semana, sin incluir nada anterior a KPI_START_DATE"""
+    from ..api.kpis import KPI_START_DATE
+
+    week_start_dt = datetime.combine(week_start, datetime.min.time())
+    week_end_dt = datetime.combine(week_start + timedelta(days=6), datetime.max.time())
+    return max(week_start_dt, KPI_START_DATE), week_end_dt
+
+
+def compute_week_totals(week_start):
+    """
+    Calcula los totales de una semana directamente desde pedidos y clientes
+    (mismo cálculo que usaba get_kpis sobre todo el historial)
+    """
+    from ..api.kpis import accumulate_kpis_for_orders
+
+    start_dt, end_dt = _week_bounds(week_start)
+
+    orders_totals = calculate_order_totals(
+        Order.status.in_(['completed', 'emitted']),
+        Order.created_at >= start_dt,
+        Order.created_at <= end_dt
+    )
+
+    totals = accumulate_kpis_for_orders(orders_totals.values())
+    totals['orders_seen'] = len(orders_totals)
+    totals['completed_orders_by_seller'] = {
+        str(seller_id): count for seller_id, count in totals['completed_orders_by_seller'].items()
+    }
+    totals['new_customers'] = Customer.query.filter(
+        Customer.created_at >= start_dt,
+        Customer.created_at <= end_dt
+    ).count()
+
+    return totals
+
+
+def refresh_week(week_start):
+    """Recalcula y guarda el resumen de una semana. Elimina la fila si la semana quedó vacía."""
+    totals = compute_week_totals(week_start)
+    rollup = KpiWeeklyRollup.query.filter_by(week_start=week_start).first()
+
+    if totals['orders_seen'] == 0 and totals['new_customers'] == 0:
+        if rollup:
+            db.session.delete(rollup)
+        return None
+
+    if not rollup:
+        rollup = KpiWeeklyRollup(week_start=week_start)
+        db.session.add(rollup)
+
+    for field in SUM_FIELDS:
+        setattr(rollup, field, totals[field])
+    rollup.completed_orders_by_seller = totals['completed_orders_by_seller']
+    rollup.updated_at = datetime.utcnow()
+
+    return rollup
+
+
+def refresh_weeks_for_dates(dates):
+    """
+    Recalcula las semanas que contienen las fechas dadas.
+    No hace fallar la escritura que lo invoca: si algo falla, el resumen se
+    repara con scripts/rebuild_kpi_rollup.py
+    """
+    from ..api.kpis import get_week_start
+
+    week_starts = {get_week_start(d) for d in dates if d}
+
+    for week_start in sorted(week_starts):
+        try:
+            with db.session.begin_nested():
+                refresh_week(week_start)
+        except Exception as e:
+            print(f"⚠️  Advertencia: No se pudo actualizar resumen KPI de semana {week_start}: {e}")
+
+
+def refresh_weeks_for_orders(orders):
+    """Recalcula las semanas de los pedidos dados (llamar antes del commit)"""
+    db.session.flush()
+    refresh_weeks_for_dates([order.created_at for order in orders if order])
+
+
+def rebuild_rollups():
+    """Regenera el resumen completo desde cero. Retorna la cantidad de semanas generadas."""
+    from ..api.kpis import KPI_START_DATE, get_week_start
+
+    order_dates = db.session.query(Order.created_at).filter(
+        Order.status.in_(['completed', 'emitted']),
+        Order.created_at >= KPI_START_DATE
+    ).all()
+    customer_dates = db.session.query(Customer.created_at).filter(
+        Customer.created_at >= KPI_START_DATE
+    ).all()
+
+    week_starts = {get_week_start(row[0]) for row in order_dates + customer_dates if row[0]}
+
+    KpiWeeklyRollup.query.delete()
+    for week_start in sorted(week_starts):
+        refresh_week(week_start)
+    db.session.commit()
+
+    return len(week_starts)
+
+
+def ensure_rollups():
+    """
+    Genera el resumen la primera vez (tabla vacía con pedidos o clientes existentes).
+    Se corre en el deploy (scripts/upgrade_db.py), nunca desde un GET: los endpoints
+    de KPIs solo leen la tabla.
+    """
+    from ..api.kpis import KPI_START_DATE
+
+    if KpiWeeklyRollup.query.first() is not None:
+        return
+
+    has_data = Order.query.filter(
+        Order.status.in_(['completed', 'emitted']),
+        Order.created_at >= KPI_START_DATE
+    ).first() or Customer.query.filter(Customer.created_at >= KPI_START_DATE).first()
+    if not has_data:
+        return
+
+    print("🔄 Resumen semanal de KPIs vacío, reconstruyendo...")
+    weeks = rebuild_rollups()
+    print(f"✅ Resumen semanal de KPIs generado ({weeks} semanas)")
+
+
+def sum_rollups(rollups):
+    """Suma varias filas del resumen en un solo diccionario de totales"""
+    totals = {field: 0 for field in SUM_FIELDS}
+    totals['completed_orders_by_seller'] = {}
+
+    for rollup in rollups:
+        for field in SUM_FIELDS:
+            totals[field] += getattr(rollup, field) or 0
+        for seller_id, count in (rollup.completed_orders_by_seller or {}).items():
+            totals['completed_orders_by_seller'][seller_id] = totals['completed_orders_by_seller'].get(seller_id, 0) + count
+
+    return totals
+
+
+def verify_rollups(tolerance=0.5):
+    """
+    Compara cada semana guardada contra el cálculo directo desde pedidos.
+    Retorna la lista de diferencias encontradas (vacía si todo cuadra).
+    """
+    from ..api.kpis import KPI_START_DATE, get_week_start
+
+    stored = {r.week_start: r for r in KpiWeeklyRollup.query.all()}
+
+    order_dates = db.session.query(Order.created_at).filter(
+        Order.status.in_(['completed', 'emitted']),
+        Order.created_at >= KPI_START_DATE
+    ).all()
+    customer_dates = db.session.query(Customer.created_at).filter(
+        Customer.created_at >= KPI_START_DATE
+    ).all()
+    expected_weeks = {get_week_start(row[0]) for row in order_dates + customer_dates if row[0]}
+
+    mismatches = []
+    for week_start in sorted(expected_weeks | set(stored.keys())):
+        expected = compute_week_totals(week_start)
+        rollup = stored.get(week_start)
+
+        for field in SUM_FIELDS:
+            stored_value = getattr(rollup, field) if rollup else 0
+            if abs((stored_value or 0) - expected[field]) > tolerance:
+                mismatches.append({
+                    'week_start': week_start.isoformat(),
+                    'field': field,
+                    'stored': stored_value,
+                    'expected': expected[field]
+                })
+
+        stored_sellers = (rollup.completed_orders_by_seller if rollup else None) or {}
+        if stored_sellers != expected['completed_orders_by_seller']:
+            mismatches.append({
+                'week_start': week_start.isoformat(),
+                'field': 'completed_orders_by_seller',
+                'stored': stored_sellers,
+                'expected': expected['completed_orders_by_seller']
+            })
+
+    return mismatches
@@ -0,0 +1,108 @@
+"""
+Servicio: Precios de ofertas semanales
+Resuelve el precio especial vigente de cada producto sin consultar WeeklyOffer
+por cada item del pedido.
+
+- Las ofertas que tocan un día (UTC) se cargan con una sola consulta y se
+  indexan por producto; la vigencia exacta se evalúa en Python.
+- Caché por request (flask.g) y por proceso (con expiración corta, para que
+  los cambios hechos en otro worker se vean sin reiniciar).
+- Las escrituras en api/weekly_offers.py invalidan la caché del proceso.
+"""
+import time
+from datetime import datetime, timedelta
+from threading import Lock
+from flask import g, has_app_context
+from ..db import db
+from ..models import WeeklyOffer
+
+# Segundos que una ventana cargada sigue siendo válida en el proceso
+OFFER_CACHE_TTL = 60
+# Máximo de días guardados en la caché del proceso
+OFFER_CACHE_MAX_WINDOWS = 32
+
+_windows = {}
+_windows_lock = Lock()
+
+
+def _load_window(day):
+    """
+    Ofertas activas que se solapan con el día dado, indexadas por producto.
+    Retorna {product_id: [(start_date, end_date, special_price), ...]} en orden de id.
+    """
+    day_start = datetime.combine(day, datetime.min.time())
+    day_end = day_start + timedelta(days=1)
+
+    rows = db.session.query(
+        WeeklyOffer.product_id,
+        WeeklyOffer.start_date,
+        WeeklyOffer.end_date,
+        WeeklyOffer.special_price
+    ).filter(
+        WeeklyOffer.active == True,
+        WeeklyOffer.start_date < day_end,
+        WeeklyOffer.end_date >= day_start
+    ).order_by(WeeklyOffer.id).all()
+
+    offers_by_product = {}
+    for product_id, start_date, end_date, special_price in rows:
+        offers_by_product.setdefault(product_id, []).append((start_date, end_date, special_price))
+    return offers_by_product
+
+
+def _get_window(day):
+    """Ventana del día desde la caché del request, luego la del proceso, sino desde la base"""
+    request_cache = None
+    if has_app_context():
+        request_cache = g.setdefault("_offer_windows", {})
+        if day in request_cache:
+            return request_cache[day]
+
+    now = time.monotonic()
+    with _windows_lock:
+        cached = _windows.get(day)
+    if cached and now - cached[0] < OFFER_CACHE_TTL:
+        window = cached[1]
+    else:
+        window = _load_window(day)
+        with _windows_lock:
+            if len(_windows) >= OFFER_CACHE_MAX_WINDOWS:
+                _windows.clear()
+            _windows[day] = (now, window)
+
+    if request_cache is not None:
+        request_cache[day] = window
+    return window
+
+
+def get_offer_prices(at=None):
+    """
+    Precios especiales vigentes en el instante dado (por defecto ahora).
+    Retorna {product_id: special_price}; si hay más de una oferta vigente
+    para un producto se usa la primera creada.
+    """
+    at = at or datetime.utcnow()
+    prices = {}
+    for product_id, offers in _get_window(at.date()).items():
+        for start_date, end_date, special_price in offers:
+            if start_date <= at <= end_date:
+                prices[product_id] = special_price
+                break
+    return prices
+
+
+def resolve_offer_price(product_id, at=None):
+    """Precio especial vigente de un producto en el instante dado (o None)"""
+    at = at or datetime.utcnow()
+    for start_date, end_date, special_price in _get_window(at.date()).get(product_id, ()):
+        if start_date <= at <= end_date:
+            return special_price
+    return None
+
+
+def invalidate_offer_prices():
+    """Descarta las ventanas cacheadas (llamar después de crear, editar o eliminar ofertas)"""
+    with _windows_lock:
+        _windows.clear()
+    if has_app_context():
+        g.pop("_offer_windows", None)
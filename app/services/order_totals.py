@@ -0,0 +1,302 @@
+"""
+Servicio: Totales de pedidos
+Calcula subtotal, costo, envío y utilidad de los pedidos con una consulta agrupada
+en SQL, en vez de recorrer order.items y cargar cada producto en Python.
+
+Misma lógica que la nota de cobro:
+- Cantidad cobrada: charged_qty si existe, sino qty
+- Precio: unit_price del item (ya incluye ofertas), sino sale_price del producto
+- Cada item se redondea por separado y el envío se calcula sobre el subtotal
+"""
+from sqlalchemy import func, case, cast, BigInteger
+from ..db import db
+from ..models import Order, OrderItem, Product, OrderCustomerTotal
+from ..utils.shipping import calculate_shipping
+
+
+def charged_qty_expr():
+    """Cantidad a cobrar: COALESCE(charged_qty, qty)"""
+    return func.coalesce(OrderItem.charged_qty, OrderItem.qty, 0)
+
+
+def unit_price_expr():
+    """Precio unitario: COALESCE(NULLIF(unit_price, 0), products.sale_price)"""
+    return func.coalesce(func.nullif(OrderItem.unit_price, 0), Product.sale_price, 0)
+
+
+def round_half_even_expr(value):
+    """
+    Redondeo al peso en SQL.
+    El empate (x.5) se redondea al par, igual que round() de Python, para que
+    SQLite (redondea hacia arriba) y PostgreSQL den los mismos montos.
+    """
+    rounded = func.round(value)
+    return cast(case(
+        ((rounded - value == 0.5) & (cast(rounded, BigInteger) % 2 == 1), rounded - 1),
+        else_=rounded
+    ), BigInteger)
+
+
+def item_total_expr():
+    """Total redondeado de un item"""
+    return round_half_even_expr(charged_qty_expr() * unit_price_expr())
+
+
+def build_order_totals(order_subtotal, shipping_type, order_cost=0, items_with_cost=0):
+    """Arma el detalle de totales de un pedido a partir de su subtotal y costo"""
+    shipping_amount = calculate_shipping(shipping_type or 'normal', order_subtotal)
+    order_total = order_subtotal + shipping_amount
+    has_cost_data = items_with_cost > 0
+
+    return {
+        'order_total': order_total,
+        'order_subtotal': order_subtotal,
+        'shipping_amount': shipping_amount,
+        'order_cost': order_cost,
+        'has_cost_data': has_cost_data,
+        'utility_amount': (order_total - order_cost) if has_cost_data and order_cost >= 0 else None,
+        'utility_percent': ((order_total - order_cost) / order_total * 100) if has_cost_data and order_cost >= 0 and order_total > 0 else None
+    }
+
+
+def calculate_order_totals(*filters):
+    """
+    Calcula los totales de todos los pedidos que cumplen los filtros (sobre Order/OrderItem).
+    Retorna {order_id: totales} ordenado por id, incluyendo pedidos sin items.
+    """
+    qty_to_charge = charged_qty_expr()
+
+    rows = db.session.query(
+        Order.id,
+        Order.status,
+        Order.seller_id,
+        Order.shipping_type,
+        Order.created_at,
+        func.sum(item_total_expr()).label('subtotal'),
+        func.sum(case((OrderItem.cost.isnot(None), qty_to_charge * OrderItem.cost), else_=0)).label('cost'),
+        func.count(OrderItem.cost).label('items_with_cost'),
+        func.count(OrderItem.id).label('items_count')
+    ).outerjoin(
+        OrderItem, OrderItem.order_id == Order.id
+    ).outerjoin(
+        Product, Product.id == OrderItem.product_id
+    ).filter(
+        *filters
+    ).group_by(
+        Order.id, Order.status, Order.seller_id, Order.shipping_type, Order.created_at
+    ).order_by(Order.id).all()
+
+    totals = {}
+    for row in rows:
+        order_totals = build_order_totals(
+            int(row.subtotal or 0),
+            row.shipping_type,
+            row.cost or 0,
+            row.items_with_cost
+        )
+        order_totals.update({
+            'order_id': row.id,
+            'status': row.status,
+            'seller_id': row.seller_id,
+            'shipping_type': row.shipping_type,
+            'created_at': row.created_at,
+            'items_count': row.items_count,
+            'items_with_cost': row.items_with_cost
+        })
+        totals[row.id] = order_totals
+
+    return totals
+
+
+def calculate_order_totals_for_ids(order_ids):
+    """Totales de una lista de pedidos por id"""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    return calculate_order_totals(Order.id.in_(order_ids))
+
+
+def calculate_customer_subtotals(*filters):
+    """
+    Subtotal por pedido y cliente (sin envío), en el orden en que aparece
+    cada cliente dentro del pedido.
+    Retorna una lista de dicts con los datos del pedido, customer_id y subtotal.
+    """
+    first_item_id = func.min(OrderItem.id)
+
+    rows = db.session.query(
+        Order.id,
+        Order.status,
+        Order.shipping_type,
+        Order.created_at,
+        OrderItem.customer_id,
+        func.sum(item_total_expr()).label('subtotal'),
+        func.count(OrderItem.id).label('items_count')
+    ).join(
+        OrderItem, OrderItem.order_id == Order.id
+    ).outerjoin(
+        Product, Product.id == OrderItem.product_id
+    ).filter(
+        *filters
+    ).group_by(
+        Order.id, Order.status, Order.shipping_type, Order.created_at, OrderItem.customer_id
+    ).order_by(Order.id, first_item_id).all()
+
+    return [{
+        'order_id': row.id,
+        'status': row.status,
+        'shipping_type': row.shipping_type,
+        'created_at': row.created_at,
+        'customer_id': row.customer_id,
+        'subtotal': int(row.subtotal or 0),
+        'items_count': row.items_count
+    } for row in rows]
+
+
+def get_order_item_lines(*filters):
+    """
+    Líneas de items con su precio y total calculados en SQL (sin cargar objetos ORM).
+    Retorna una lista ordenada por pedido e item.
+    """
+    rows = db.session.query(
+        OrderItem.id,
+        OrderItem.order_id,
+        OrderItem.customer_id,
+        OrderItem.qty,
+        OrderItem.unit,
+        OrderItem.charged_qty,
+        OrderItem.charged_unit,
+        Product.name.label('product_name'),
+        unit_price_expr().label('unit_price'),
+        item_total_expr().label('total')
+    ).join(
+        Order, Order.id == OrderItem.order_id
+    ).outerjoin(
+        Product, Product.id == OrderItem.product_id
+    ).filter(
+        *filters
+    ).order_by(OrderItem.order_id, OrderItem.id).all()
+
+    return [{
+        'item_id': row.id,
+        'order_id': row.order_id,
+        'customer_id': row.customer_id,
+        'product_name': row.product_name or "Producto desconocido",
+        'qty': float(row.qty) if row.qty is not None else 0,
+        'unit': row.unit or "kg",
+        'charged_qty': float(row.charged_qty) if row.charged_qty is not None else None,
+        'charged_unit': row.charged_unit,
+        'unit_price': float(row.unit_price or 0),
+        'total': int(row.total or 0)
+    } for row in rows]
+
+
+def store_order_totals(order_ids):
+    """
+    Recalcula y guarda los totales persistidos de los pedidos dados
+    (columnas de Order y filas de order_customer_totals). Llamar antes del commit.
+    """
+    order_ids = {order_id for order_id in order_ids if order_id}
+    if not order_ids:
+        return
+
+    db.session.flush()
+    totals = calculate_order_totals_for_ids(order_ids)
+    customer_rows = calculate_customer_subtotals(Order.id.in_(order_ids))
+
+    for order in Order.query.filter(Order.id.in_(order_ids)).all():
+        order_totals = totals.get(order.id)
+        if not order_totals:
+            continue
+        order.subtotal = order_totals['order_subtotal']
+        order.shipping_amount = order_totals['shipping_amount']
+        order.cost_total = order_totals['order_cost']
+        order.items_count = order_totals['items_count']
+        order.cost_items_count = order_totals['items_with_cost']
+
+    # Clientes que estaban o quedan en estos pedidos (para actualizar su saldo)
+    previous_customer_ids = db.session.query(OrderCustomerTotal.customer_id).filter(
+        OrderCustomerTotal.order_id.in_(order_ids)
+    ).distinct().all()
+    customer_ids = {row[0] for row in previous_customer_ids} | {row['customer_id'] for row in customer_rows}
+
+    OrderCustomerTotal.query.filter(
+        OrderCustomerTotal.order_id.in_(order_ids)
+    ).delete(synchronize_session=False)
+    db.session.add_all([
+        OrderCustomerTotal(
+            order_id=row['order_id'],
+            customer_id=row['customer_id'],
+            subtotal=row['subtotal'],
+            items_count=row['items_count']
+        )
+        for row in customer_rows
+    ])
+
+    # Import diferido: customer_ledger usa las consultas de este módulo
+    from .customer_ledger import refresh_customer_balances
+    refresh_customer_balances(customer_ids)
+
+
+def refresh_order_totals(orders):
+    """Recalcula los totales persistidos de los pedidos dados (llamar antes del commit)"""
+    store_order_totals(order.id for order in orders if order)
+
+
+def find_order_totals_drift(order_ids=None):
+    """
+    Compara los totales guardados contra el cálculo directo.
+    Retorna la lista de ids de pedidos con diferencias.
+    """
+    filters = (Order.id.in_(order_ids),) if order_ids is not None else ()
+    totals = calculate_order_totals(*filters)
+
+    stored_customers = {}
+    customer_query = OrderCustomerTotal.query
+    if order_ids is not None:
+        customer_query = customer_query.filter(OrderCustomerTotal.order_id.in_(order_ids))
+    for row in customer_query.all():
+        stored_customers[(row.order_id, row.customer_id)] = (row.subtotal, row.items_count)
+
+    expected_customers = {
+        (row['order_id'], row['customer_id']): (row['subtotal'], row['items_count'])
+        for row in calculate_customer_subtotals(*filters)
+    }
+
+    drifted = set()
+    stored_orders = db.session.query(
+        Order.id, Order.subtotal, Order.shipping_amount, Order.cost_total,
+        Order.items_count, Order.cost_items_count
+    ).filter(*filters).all()
+    for row in stored_orders:
+        expected = totals.get(row.id)
+        if not expected:
+            continue
+        if (
+            row.subtotal != expected['order_subtotal']
+            or row.shipping_amount != expected['shipping_amount']
+            or abs((row.cost_total or 0) - expected['order_cost']) > 0.5
+            or row.items_count != expected['items_count']
+            or row.cost_items_count != expected['items_with_cost']
+        ):
+            drifted.add(row.id)
+
+    for key in set(stored_customers) | set(expected_customers):
+        if stored_customers.get(key) != expected_customers.get(key):
+            drifted.add(key[0])
+
+    return sorted(drifted)
+
+
+def reconcile_order_totals(check_only=False):
+    """
+    Repara los totales guardados que no coinciden con el cálculo directo.
+    Retorna la lista de ids de pedidos que tenían diferencias.
+    """
+    drifted = find_order_totals_drift()
+    if drifted and not check_only:
+        # Por bloques para no armar un IN gigante
+        for start in range(0, len(drifted), 500):
+            store_order_totals(drifted[start:start + 500])
+        db.session.commit()
+    return drifted
@@ -0,0 +1,162 @@
+"""
+Servicio: Índice de nombres de productos
+Índice en memoria (por proceso) sobre los nombres normalizados de productos activos,
+para que /api/orders/parse y /api/products/suggest no calculen la distancia de
+Levenshtein contra todo el catálogo en cada línea.
+
+- Hash de nombre normalizado -> match exacto en O(1)
+- Mapa de tokens -> candidatos por coincidencia de palabras
+- Trigramas de caracteres -> candidatos por substring y cota de distancia
+
+Los candidatos se puntúan con la misma lógica de utils.text_match.similarity_score,
+así que las sugerencias son las mismas que recorriendo todos los productos.
+"""
+from collections import Counter
+from threading import Lock
+from sqlalchemy import func, case
+from ..db import db
+from ..models import Product
+from ..utils.text_match import normalize_text, token_set, similarity_score_normalized, max_distance_for_score
+
+_index = None
+_index_signature = None
+_index_lock = Lock()
+
+
+def _trigrams(text):
+    """Trigramas de caracteres (con repetición) de un texto normalizado"""
+    return Counter(text[i:i + 3] for i in range(len(text) - 2))
+
+
+class ProductNameIndex:
+    """Índice de nombres de productos activos (en el orden de la consulta original)"""
+
+    def __init__(self, products):
+        self.entries = []
+        self.exact = {}               # nombre normalizado -> posición del primer producto
+        self.token_postings = {}      # token -> {posiciones}
+        self.trigram_postings = {}    # trigrama -> {posición: repeticiones}
+
+        for position, product in enumerate(products):
+            normalized = normalize_text(product.name)
+            tokens = token_set(normalized)
+            self.entries.append({
+                "id": product.id,
+                "name": product.name,
+                "category_id": product.category_id,
+                "sale_price": product.sale_price,
+                "unit": product.unit,
+                "normalized": normalized,
+                "tokens": tokens,
+            })
+
+            if normalized and normalized not in self.exact:
+                self.exact[normalized] = position
+            for token in tokens:
+                self.token_postings.setdefault(token, set()).add(position)
+            for gram, count in _trigrams(normalized).items():
+                self.trigram_postings.setdefault(gram, {})[position] = count
+
+    def find_exact(self, query):
+        """Producto cuyo nombre normalizado es igual a la búsqueda (o None)"""
+        position = self.exact.get(normalize_text(query))
+        return self.entries[position] if position is not None else None
+
+    def _candidates(self, qa, qs, min_score):
+        """Posiciones que podrían alcanzar min_score (el resto queda descartado con certeza)"""
+        candidates = set()
+
+        # Coincidencia de tokens (85/75) requiere al menos un token en común
+        for token in qs:
+            candidates.update(self.token_postings.get(token, ()))
+
+        # Trigramas en común (con repetición) por producto
+        query_grams = _trigrams(qa)
+        total_query_grams = sum(query_grams.values())
+        common = Counter()
+        for gram, query_count in query_grams.items():
+            for position, count in self.trigram_postings.get(gram, {}).items():
+                common[position] += min(query_count, count)
+
+        for position, entry in enumerate(self.entries):
+            if position in candidates:
+                continue
+            ta = entry["normalized"]
+            if not ta:
+                continue
+
+            # Substring (90/80): con 3+ caracteres, el producto tiene todos los trigramas de la búsqueda
+            if len(qa) < 3 or common[position] == total_query_grams:
+                if qa in ta:
+                    candidates.add(position)
+                    continue
+
+            # Cotas de Levenshtein: diferencia de largo y q-gramas (Ukkonen):
+            # si dist <= k, comparten al menos max_len - 2 - 3k trigramas
+            max_distance = max_distance_for_score(qa, ta, min_score)
+            if abs(len(qa) - len(ta)) > max_distance:
+                continue
+            if common[position] < max(len(qa), len(ta)) - 2 - 3 * max_distance:
+                continue
+            candidates.add(position)
+
+        return candidates
+
+    def search(self, query, min_score):
+        """
+        Productos con score >= min_score, ordenados por score (empates en el orden del catálogo).
+        Retorna dicts con id, name, score, category_id, sale_price y unit.
+        """
+        qa = normalize_text(query)
+        if not qa:
+            return []
+        qs = token_set(qa)
+
+        suggestions = []
+        for position in sorted(self._candidates(qa, qs, min_score)):
+            entry = self.entries[position]
+            score = similarity_score_normalized(qa, entry["normalized"], qs, entry["tokens"], min_score)
+            if score >= min_score:
+                suggestions.append({
+                    "id": entry["id"],
+                    "name": entry["name"],
+                    "score": score,
+                    "category_id": entry["category_id"],
+                    "sale_price": entry["sale_price"],
+                    "unit": entry["unit"]
+                })
+
+        suggestions.sort(key=lambda x: x["score"], reverse=True)
+        return suggestions
+
+
+def _catalog_signature():
+    """Firma barata del catálogo: cambia al crear, editar o desactivar productos (en cualquier proceso)"""
+    return tuple(db.session.query(
+        func.count(Product.id),
+        func.max(Product.id),
+        func.max(Product.updated_at),
+        func.sum(case((Product.active == True, 1), else_=0))
+    ).one())
+
+
+def get_product_index():
+    """Retorna el índice de productos activos, reconstruyéndolo si el catálogo cambió"""
+    global _index, _index_signature
+
+    signature = _catalog_signature()
+    with _index_lock:
+        if _index is None or _index_signature != signature:
+            products = Product.query.filter_by(active=True).all()
+            _index = ProductNameIndex(products)
+            _index_signature = signature
+        return _index
+
+
+def invalidate_product_index():
+    """Descarta el índice (llamar al crear, editar o eliminar productos)"""
+    global _index, _index_signature
+
+    with _index_lock:
+        _index = None
+        _index_signature = None
@@ -0,0 +1,138 @@
+"""
+Servicio: Propagación de costos de compras
+Aplica el costo y la conversión de una compra a los items de pedidos del producto
+con UPDATE filtrados en SQL, en vez de cargar todo el historial de items y
+revisar el estado de cada pedido en Python.
+
+Reglas (las mismas que usaba create_purchase):
+- Costo: solo items sin costo o de pedidos no completados
+- Con conversión: se asigna charged_qty a los items sin cantidad cobrada o con
+  una conversión incorrecta (charged_unit == unit distinta a la del producto)
+- Sin conversión: a los items que pueden recibir costo y no tienen charged_qty se les
+  asigna la cantidad pedida en su propia unidad
+- Los pedidos emitidos con el producto quedan completados cuando todos sus items
+  tienen costo o su producto tiene precio de compra
+"""
+from datetime import datetime
+from sqlalchemy import update, exists, and_, or_
+from ..db import db
+from ..models import Order, OrderItem, Product
+
+
+def _update_items(filters, values):
+    """Ejecuta un UPDATE sobre order_items y retorna los order_id de las filas modificadas"""
+    result = db.session.execute(
+        update(OrderItem).where(*filters).values(**values).returning(OrderItem.order_id),
+        execution_options={"synchronize_session": "fetch"}
+    )
+    return [row.order_id for row in result]
+
+
+def _cost_eligible_filter():
+    """Items que pueden recibir costo: sin costo o de pedidos no completados"""
+    completed_order = exists().where(Order.id == OrderItem.order_id, Order.status == 'completed')
+    return or_(OrderItem.cost.is_(None), ~completed_order)
+
+
+def _conversion_targets(product, purchase_qty, conversion_qty):
+    """
+    Cálculo de charged_qty por unidad del item (en la unidad del producto).
+    Retorna [(unidad del item, expresión)] para las unidades que se pueden convertir.
+    """
+    whens = [(product.unit, OrderItem.qty)]
+    avg_units_per_kg = product.avg_units_per_kg
+
+    if product.unit == "kg":
+        # Item en unidades, se cobra en kg
+        if avg_units_per_kg and avg_units_per_kg > 0:
+            whens.append(("unit", OrderItem.qty / avg_units_per_kg))
+        elif conversion_qty and conversion_qty > 0:
+            # Si no hay avg_units_per_kg, usar la conversión proporcionada
+            whens.append(("unit", OrderItem.qty / (purchase_qty / conversion_qty) if purchase_qty > 0 else OrderItem.qty))
+    elif product.unit == "unit":
+        # Item en kg, se cobra en unidades
+        if avg_units_per_kg and avg_units_per_kg > 0:
+            whens.append(("kg", OrderItem.qty * avg_units_per_kg))
+        elif conversion_qty and conversion_qty > 0:
+            whens.append(("kg", OrderItem.qty * (conversion_qty / purchase_qty) if purchase_qty > 0 else OrderItem.qty))
+
+    return whens
+
+
+def apply_purchase_costs(product, cost_per_charged_unit, purchase_qty, conversion_qty=None, conversion_unit=None):
+    """
+    Propaga el costo de una compra a los items del producto.
+    Llamar después de actualizar avg_units_per_kg del producto y antes del commit.
+    Retorna (ids de pedidos con items modificados, cantidad de items con costo actualizado).
+    """
+    touched_order_ids = set()
+    base_filter = OrderItem.product_id == product.id
+
+    if conversion_qty and conversion_unit:
+        # Conversión: cada unidad convertible con su propio UPDATE (cantidad calculada en SQL)
+        for item_unit, charged_qty in _conversion_targets(product, purchase_qty, conversion_qty):
+            has_incorrect_conversion = and_(
+                OrderItem.charged_unit != "",
+                OrderItem.charged_unit == OrderItem.unit,
+                OrderItem.unit != product.unit
+            )
+            touched_order_ids.update(_update_items(
+                (base_filter, OrderItem.unit == item_unit,
+                 or_(OrderItem.charged_qty.is_(None), has_incorrect_conversion)),
+                {"charged_qty": charged_qty, "charged_unit": product.unit}
+            ))
+    else:
+        # Sin conversión: charged_qty = qty en los items que van a recibir costo
+        # (antes de actualizar el costo, porque el filtro depende de él)
+        touched_order_ids.update(_update_items(
+            (base_filter, _cost_eligible_filter(), OrderItem.charged_qty.is_(None)),
+            {"charged_qty": OrderItem.qty, "charged_unit": OrderItem.unit}
+        ))
+
+    # Solo se escriben los items cuyo costo efectivamente cambia
+    cost_order_ids = _update_items(
+        (base_filter, _cost_eligible_filter(),
+         or_(OrderItem.cost.is_(None), OrderItem.cost != cost_per_charged_unit)),
+        {"cost": cost_per_charged_unit}
+    )
+    touched_order_ids.update(cost_order_ids)
+
+    return touched_order_ids, len(cost_order_ids)
+
+
+def complete_purchased_orders(product_ids):
+    """
+    Marca como completados, con un solo UPDATE, los pedidos emitidos que tienen alguno
+    de los productos y ya no tienen items pendientes (sin costo y sin precio de compra del producto).
+    Llamar después de propagar los costos. Retorna [(order_id, created_at)] de los pedidos completados.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+
+    has_product = exists().where(
+        OrderItem.order_id == Order.id,
+        OrderItem.product_id.in_(product_ids)
+    )
+    pending_item = exists().where(
+        OrderItem.order_id == Order.id,
+        OrderItem.cost.is_(None),
+        ~exists().where(
+            Product.id == OrderItem.product_id,
+            Product.purchase_price.isnot(None),
+            Product.purchase_price != 0
+        )
+    )
+
+    result = db.session.execute(
+        update(Order).where(
+            Order.status == "emitted",
+            has_product,
+            ~pending_item
+        ).values(
+            status="completed",
+            completed_at=datetime.utcnow()
+        ).returning(Order.id, Order.created_at),
+        execution_options={"synchronize_session": "fetch"}
+    )
+    return [(row.id, row.created_at) for row in result]
@@ -0,0 +1,111 @@
+"""
+Servicio: Tasas de retorno de clientes y vendedores
+Agrupa los pedidos por semana una sola vez y calcula la serie completa de
+retornos, en vez de reagrupar todo el historial para cada semana consultada.
+
+FÓRMULA (igual para clientes y vendedores):
+- Referencia: quienes pidieron hace 1 o 2 semanas (semana N-1 o N-2)
+- Retornaron: los de referencia que volvieron a pedir en esta semana (N) o la anterior (N-1)
+- Porcentaje = (Retornaron / Referencia) * 100
+- Las primeras dos semanas con pedidos no tienen valor (None)
+"""
+from datetime import datetime, timedelta
+from ..db import db
+from ..models import Order, OrderItem
+
+
+def load_week_activity():
+    """
+    Obtiene los clientes y vendedores que pidieron en cada semana
+    (pedidos emitidos/completados desde KPI_START_DATE).
+    Retorna (semanas ordenadas, clientes por semana, vendedores por semana).
+    """
+    from ..api.kpis import KPI_START_DATE, get_week_start
+
+    order_filters = (
+        Order.status.in_(['completed', 'emitted']),
+        Order.created_at >= KPI_START_DATE
+    )
+
+    customers_by_week = {}
+    sellers_by_week = {}
+
+    # Una fila por pedido: define qué semanas existen y los vendedores
+    order_rows = db.session.query(Order.created_at, Order.seller_id).filter(*order_filters).all()
+    for created_at, seller_id in order_rows:
+        if not created_at:
+            continue
+        week_start = get_week_start(created_at)
+        customers_by_week.setdefault(week_start, set())
+        sellers = sellers_by_week.setdefault(week_start, set())
+        if seller_id:
+            sellers.add(seller_id)
+
+    # Una fila por item: clientes de cada pedido
+    item_rows = db.session.query(Order.created_at, OrderItem.customer_id).join(
+        OrderItem, OrderItem.order_id == Order.id
+    ).filter(*order_filters).all()
+    for created_at, customer_id in item_rows:
+        if not created_at or not customer_id:
+            continue
+        customers_by_week[get_week_start(created_at)].add(customer_id)
+
+    return sorted(customers_by_week.keys()), customers_by_week, sellers_by_week
+
+
+def _rate_series(weeks, ids_by_week):
+    """Calcula el porcentaje de retorno de cada semana a partir de los IDs por semana"""
+    empty = set()
+    rates = {}
+
+    for index, week_start in enumerate(weeks):
+        # Las primeras dos semanas se ignoran
+        if index < 2:
+            rates[week_start] = None
+            continue
+
+        week_minus_1 = ids_by_week.get(week_start - timedelta(days=7), empty)
+        week_minus_2 = ids_by_week.get(week_start - timedelta(days=14), empty)
+
+        reference = week_minus_1 | week_minus_2
+        if not reference:
+            rates[week_start] = 0.0
+            continue
+
+        returned = (ids_by_week.get(week_start, empty) | week_minus_1) & reference
+        rates[week_start] = (len(returned) / len(reference)) * 100
+
+    return rates
+
+
+def calculate_return_rates():
+    """
+    Calcula las tasas de retorno de todas las semanas en una pasada.
+    Retorna {'weeks': [...], 'customer_return_rate': {semana: %}, 'seller_return_rate': {semana: %}}
+    donde el porcentaje es None para las dos primeras semanas.
+    """
+    weeks, customers_by_week, sellers_by_week = load_week_activity()
+
+    return {
+        'weeks': weeks,
+        'customer_return_rate': _rate_series(weeks, customers_by_week),
+        'seller_return_rate': _rate_series(weeks, sellers_by_week)
+    }
+
+
+def average_return_rate(weeks, rates):
+    """
+    Promedio histórico: semanas que empiezan desde KPI_START_DATE, a partir de la
+    tercera, sin contar las que no tienen valor.
+    """
+    from ..api.kpis import KPI_START_DATE
+
+    eligible_weeks = [
+        week_start for week_start in weeks
+        if datetime.combine(week_start, datetime.min.time()) >= KPI_START_DATE
+    ]
+    values = [rates[week_start] for week_start in eligible_weeks[2:] if rates.get(week_start) is not None]
+
+    if not values:
+        return 0.0, values
+    return sum(values) / len(values), values
@@ -0,0 +1,204 @@
+"""
+Servicio: Bonos semanales de vendedores
+Calcula los pedidos, el monto facturado y las comisiones de todos los vendedores
+para un rango de semanas con una sola consulta agrupada por vendedor y día
+(los días se juntan por semana, lunes a domingo), y asigna los bonos en lote.
+
+Mismas reglas que /api/sellers/bonus/assign:
+- Pedidos completados con vendedor de la semana; total = subtotal + envío guardados
+- Si el vendedor alcanza la meta de pedidos de la semana, sus costos de vendedor
+  de esa semana pasan al porcentaje base + bono (se crean los que falten)
+- Bono: comisión con bono - comisión base sobre el monto facturado de la semana
+
+Los bonos se guardan con upsert (ON CONFLICT) sobre el índice único por
+(semana, vendedor): volver a asignar una semana actualiza su bono en vez de duplicarlo.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from ..db import db
+from ..models import Seller, Order, Expense, SellerBonus
+from .seller_costs import SELLER_COST_CATEGORY, seller_costs_by_order
+
+
+def week_start_of(day):
+    """Lunes de la semana de una fecha"""
+    return day - timedelta(days=day.weekday())
+
+
+def _as_date(value):
+    """date(created_at) llega como texto en SQLite y como date en Postgres"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _range_filters(first_week, last_week):
+    """Pedidos completados con vendedor entre el lunes de first_week y el domingo de last_week"""
+    start_dt = datetime.combine(first_week, datetime.min.time())
+    end_dt = datetime.combine(last_week + timedelta(days=6), datetime.max.time())
+    return [
+        Order.status == 'completed',
+        Order.seller_id.isnot(None),
+        Order.created_at >= start_dt,
+        Order.created_at <= end_dt
+    ]
+
+
+def compute_seller_weeks(first_week, last_week):
+    """
+    Pedidos, monto facturado y comisiones por vendedor y semana, en una consulta.
+    Retorna {(seller_id, week_start): {'orders_count', 'revenue', 'commission'}}.
+    """
+    # Comisión de cada pedido (suma de sus costos de vendedor)
+    commissions = db.session.query(
+        Expense.order_id,
+        func.sum(Expense.amount).label('amount')
+    ).filter(
+        Expense.is_seller_cost == True
+    ).group_by(Expense.order_id).subquery()
+
+    order_day = func.date(Order.created_at)
+    rows = db.session.query(
+        Order.seller_id,
+        order_day.label('day'),
+        func.count(Order.id).label('orders_count'),
+        func.sum(Order.subtotal + Order.shipping_amount).label('revenue'),
+        func.sum(func.coalesce(commissions.c.amount, 0)).label('commission')
+    ).outerjoin(
+        commissions, commissions.c.order_id == Order.id
+    ).filter(
+        *_range_filters(first_week, last_week)
+    ).group_by(Order.seller_id, order_day).all()
+
+    weeks = {}
+    for row in rows:
+        key = (row.seller_id, week_start_of(_as_date(row.day)))
+        week = weeks.setdefault(key, {'orders_count': 0, 'revenue': 0, 'commission': 0})
+        week['orders_count'] += row.orders_count
+        week['revenue'] += int(row.revenue or 0)
+        week['commission'] += int(row.commission or 0)
+
+    return weeks
+
+
+def assign_bonuses(first_week, last_week, orders_target, bonus_percent, base_commission_percent):
+    """
+    Asigna los bonos de todas las semanas entre first_week y last_week (lunes, inclusive).
+    Actualiza o crea los costos de vendedor de las semanas con bono y hace upsert de
+    SellerBonus (llamar antes del commit). Retorna la lista de bonos asignados.
+    """
+    final_commission_percent = base_commission_percent + bonus_percent
+    weeks = compute_seller_weeks(first_week, last_week)
+    achieved = {key: week for key, week in weeks.items() if week['orders_count'] >= orders_target}
+    if not achieved:
+        return []
+
+    seller_ids = {seller_id for seller_id, _ in achieved}
+    order_filters = _range_filters(first_week, last_week) + [Order.seller_id.in_(seller_ids)]
+
+    # Pedidos de las semanas con bono y sus costos de vendedor (dos consultas)
+    orders_by_week = {}
+    for row in db.session.query(
+        Order.id,
+        Order.seller_id,
+        Order.created_at,
+        (Order.subtotal + Order.shipping_amount).label('order_total')
+    ).filter(*order_filters).order_by(Order.id).all():
+        key = (row.seller_id, week_start_of(row.created_at.date()))
+        if key in achieved:
+            orders_by_week.setdefault(key, []).append(row)
+    seller_costs = seller_costs_by_order(*order_filters)
+
+    sellers = {seller.id: seller for seller in Seller.query.filter(Seller.id.in_(seller_ids)).all()}
+
+    recipients = []
+    new_rows = []
+    bonus_rows = []
+    for (seller_id, week_start), week in sorted(achieved.items(), key=lambda item: (item[0][1], item[0][0])):
+        week_revenue = week['revenue']
+        base_commission = round(week_revenue * (base_commission_percent / 100))
+        bonus_commission = round(week_revenue * (final_commission_percent / 100))
+        bonus_amount = bonus_commission - base_commission
+
+        # Costos de la semana con el porcentaje con bono
+        updated_costs = []
+        week_orders = orders_by_week.get((seller_id, week_start), [])
+        for order in week_orders:
+            new_amount = round(order.order_total * (final_commission_percent / 100))
+            description = f'Comisión del {final_commission_percent}% (base {base_commission_percent}% + bono {bonus_percent}%) sobre venta de ${order.order_total} para el pedido #{order.id}'
+            cost = seller_costs.get(order.id)
+            if cost:
+                old_amount = cost.amount
+                cost.amount = new_amount
+                cost.commission_percent = final_commission_percent
+                cost.description = description
+            else:
+                old_amount = 0
+                new_rows.append(Expense(
+                    order_id=order.id,
+                    category=SELLER_COST_CATEGORY,
+                    amount=new_amount,
+                    is_seller_cost=True,
+                    commission_percent=final_commission_percent,
+                    description=description
+                ))
+            updated_costs.append({
+                'order_id': order.id,
+                'old_amount': old_amount,
+                'new_amount': new_amount
+            })
+
+        bonus_rows.append({
+            'seller_id': seller_id,
+            'week_start': week_start,
+            'orders_target': orders_target,
+            'orders_achieved': week['orders_count'],
+            'commission_percent': final_commission_percent,
+            'bonus_amount': bonus_amount,
+            'notes': f'Bono por alcanzar meta de {orders_target} pedidos en la semana'
+        })
+
+        seller = sellers.get(seller_id)
+        recipients.append({
+            'seller': seller.to_dict() if seller else None,
+            'week_start': week_start.isoformat(),
+            'orders_achieved': week['orders_count'],
+            'orders_target': orders_target,
+            'week_revenue': week_revenue,
+            'base_commission': base_commission,
+            'bonus_amount': bonus_amount,
+            'final_commission': bonus_commission,
+            'commission_percent': final_commission_percent,
+            'updated_costs': updated_costs,
+            'orders': [{
+                'order_id': order.id,
+                'order_date': order.created_at.isoformat() if order.created_at else None,
+                'order_total': order.order_total
+            } for order in week_orders]
+        })
+
+    db.session.add_all(new_rows)
+    _upsert_bonuses(bonus_rows)
+    return recipients
+
+
+def _upsert_bonuses(rows):
+    """
+    INSERT ... ON CONFLICT sobre el índice único (semana, vendedor): una sola
+    sentencia, sin duplicados aunque dos asignaciones corran a la vez.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    statement = insert(SellerBonus).values(rows)
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[SellerBonus.week_start, SellerBonus.seller_id],
+        set_={
+            field: statement.excluded[field]
+            for field in ('orders_target', 'orders_achieved', 'commission_percent', 'bonus_amount', 'notes')
+        }
+    ))
@@ -0,0 +1,71 @@
+"""
+Servicio: Configuración de vendedores
+Lee la configuración de vendedores (porcentaje de comisión) sin consultar
+seller_config cada vez que se calcula una comisión.
+
+- Caché por proceso con expiración corta, para que los cambios hechos en otro
+  worker se vean sin reiniciar.
+- Solo lectura: si no hay configuración guardada se usa el porcentaje por
+  defecto, sin crear la fila (se crea al guardar la configuración).
+- PUT /api/sellers/config invalida la caché del proceso.
+"""
+import time
+from threading import Lock
+from ..models import SellerConfig
+
+# Porcentaje de comisión cuando no hay configuración guardada
+DEFAULT_COMMISSION_PERCENT = 10.0
+# Segundos que la configuración cargada sigue siendo válida en el proceso
+CONFIG_CACHE_TTL = 60
+
+_cached_config = None  # (momento de carga, dict de la configuración)
+_config_lock = Lock()
+
+
+def _default_config():
+    # Mismo valor que retornaba /api/sellers/config sin configuración guardada
+    return {
+        "id": 1,
+        "commission_percent": DEFAULT_COMMISSION_PERCENT,
+        "updated_at": None
+    }
+
+
+def _load_config():
+    """Configuración guardada como dict (o la configuración por defecto)"""
+    try:
+        config = SellerConfig.query.first()
+    except Exception as e:
+        # Si la tabla no existe aún, usar valores por defecto
+        print(f"⚠️  Advertencia: Tabla seller_config no disponible: {e}")
+        return _default_config()
+    return config.to_dict() if config else _default_config()
+
+
+def get_seller_config():
+    """Configuración de vendedores desde la caché del proceso, sino desde la base"""
+    global _cached_config
+
+    now = time.monotonic()
+    with _config_lock:
+        cached = _cached_config
+    if cached and now - cached[0] < CONFIG_CACHE_TTL:
+        return dict(cached[1])
+
+    config = _load_config()
+    with _config_lock:
+        _cached_config = (now, config)
+    return dict(config)
+
+
+def get_commission_percent():
+    """Porcentaje de comisión configurado (por defecto 10%)"""
+    return get_seller_config()["commission_percent"]
+
+
+def invalidate_seller_config():
+    """Descarta la configuración cacheada (llamar después de guardar la configuración)"""
+    global _cached_config
+
+    with _config_lock:
+        _cached_config = None
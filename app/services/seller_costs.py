@@ -0,0 +1,125 @@
+"""
+Servicio: Costos de vendedor
+Genera las comisiones de vendedor (Expense con is_seller_cost) de los pedidos
+completados con vendedor que aún no tienen una, con un solo INSERT ... SELECT
+que excluye (anti-join) los pedidos que ya tienen costo.
+
+Mismas reglas que antes:
+- Total del pedido: subtotal + envío guardados (ver services/order_totals.py)
+- Pedidos sin monto facturado (total <= 0) no generan costo
+- Costo: total * porcentaje de comisión / 100, redondeado al peso (empate al par,
+  como round() de Python)
+- Solo un costo de vendedor por pedido
+"""
+from datetime import datetime
+from sqlalchemy import select, insert, exists, literal, cast, true, String, DateTime
+from ..db import db
+from ..models import Order, Expense
+from .order_totals import round_half_even_expr
+
+SELLER_COST_CATEGORY = 'Comisión Vendedor'
+
+
+def _order_total_expr():
+    return Order.subtotal + Order.shipping_amount
+
+
+def _commission_amount_expr(commission_percent):
+    """Monto de la comisión redondeado al peso (en SQL, igual para la vista previa y el insert)"""
+    return round_half_even_expr(_order_total_expr() * commission_percent / 100.0)
+
+
+def _has_seller_cost_expr():
+    return exists().where(
+        Expense.order_id == Order.id,
+        Expense.is_seller_cost == True
+    )
+
+
+def _completed_orders_filters():
+    return [Order.status == 'completed', Order.seller_id.isnot(None)]
+
+
+def preview_seller_costs(commission_percent):
+    """
+    Revisa los pedidos completados con vendedor en una consulta.
+    Retorna (costos a crear, pedidos omitidos con su motivo).
+    """
+    rows = db.session.query(
+        Order.id,
+        Order.seller_id,
+        _order_total_expr().label('order_total'),
+        _commission_amount_expr(commission_percent).label('amount'),
+        _has_seller_cost_expr().label('has_cost')
+    ).filter(*_completed_orders_filters()).order_by(Order.id).all()
+
+    pending_costs = []
+    skipped_orders = []
+    for row in rows:
+        if row.has_cost:
+            skipped_orders.append({'order_id': row.id, 'reason': 'Ya tiene costo asociado'})
+        elif row.order_total <= 0:
+            skipped_orders.append({'order_id': row.id, 'reason': 'Pedido sin monto facturado'})
+        else:
+            pending_costs.append({
+                'order_id': row.id,
+                'seller_id': row.seller_id,
+                'order_total': row.order_total,
+                'commission_percent': commission_percent,
+                'amount': row.amount
+            })
+
+    return pending_costs, skipped_orders
+
+
+def insert_missing_seller_costs(commission_percent):
+    """
+    Crea en un solo statement los costos de vendedor faltantes (llamar antes del commit).
+    Retorna la cantidad de costos creados.
+    """
+    description = (
+        literal(f'Comisión del {commission_percent}% sobre venta de $', String)
+        + cast(_order_total_expr(), String)
+        + literal(' para el pedido #', String)
+        + cast(Order.id, String)
+    )
+
+    missing_costs = select(
+        Order.id,
+        literal(SELLER_COST_CATEGORY, String),
+        _commission_amount_expr(commission_percent),
+        true(),
+        literal(commission_percent),
+        description,
+        literal(datetime.utcnow(), DateTime)
+    ).where(
+        *_completed_orders_filters(),
+        _order_total_expr() > 0,
+        ~_has_seller_cost_expr()
+    )
+
+    result = db.session.execute(
+        insert(Expense).from_select(
+            ['order_id', 'category', 'amount', 'is_seller_cost', 'commission_percent', 'description', 'created_at'],
+            missing_costs
+        )
+    )
+    return result.rowcount
+
+
+def seller_costs_by_order(*order_filters):
+    """
+    Costos de vendedor de los pedidos que cumplen los filtros (sobre Order), en una consulta.
+    Retorna {order_id: Expense} con el primer costo de cada pedido.
+    """
+    costs = Expense.query.join(
+        Order, Order.id == Expense.order_id
+    ).filter(
+        Expense.is_seller_cost == True,
+        *order_filters
+    ).order_by(Expense.id).all()
+
+    costs_by_order = {}
+    for cost in costs:
+        costs_by_order.setdefault(cost.order_id, cost)
+    return costs_by_order
@@ -0,0 +1,80 @@
+"""
+Servicio: Estadísticas de vendedores
+Resume los pedidos completados de todos los vendedores con una sola consulta
+agrupada por seller_id, usando los totales guardados de cada pedido
+(subtotal + envío, ver services/order_totals.py), en vez de consultar y
+recorrer los pedidos de cada vendedor por separado.
+
+Mismas reglas que los resúmenes originales:
+- Solo pedidos completados con vendedor
+- Monto facturado y cantidad de pedidos: solo pedidos con total > 0
+- Comisiones: costos de vendedor (Expense con is_seller_cost) de esos pedidos
+"""
+from sqlalchemy import func, select
+from ..db import db
+from ..models import Seller, Order, OrderCustomerTotal, Expense
+
+
+def _completed_orders_filters(start=None, end=None):
+    """Filtros de pedidos completados con vendedor (opcionalmente en un rango de fechas)"""
+    filters = [Order.status == 'completed', Order.seller_id.isnot(None)]
+    if start is not None:
+        filters.append(Order.created_at >= start)
+    if end is not None:
+        filters.append(Order.created_at <= end)
+    return filters
+
+
+def summarize_sellers(start=None, end=None):
+    """
+    Resumen de todos los vendedores (incluye los que no tienen pedidos).
+    Retorna una lista en orden de id con seller, total_revenue, completed_orders_count,
+    customers_count y commissions_total.
+    """
+    order_total = Order.subtotal + Order.shipping_amount
+    billed_filters = _completed_orders_filters(start, end) + [order_total > 0]
+
+    orders_agg = select(
+        Order.seller_id,
+        func.count(Order.id).label('orders_count'),
+        func.sum(order_total).label('revenue')
+    ).where(*billed_filters).group_by(Order.seller_id).subquery()
+
+    customers_agg = select(
+        Order.seller_id,
+        func.count(func.distinct(OrderCustomerTotal.customer_id)).label('customers_count')
+    ).join(
+        OrderCustomerTotal, OrderCustomerTotal.order_id == Order.id
+    ).where(*billed_filters).group_by(Order.seller_id).subquery()
+
+    commissions_agg = select(
+        Order.seller_id,
+        func.sum(Expense.amount).label('commissions')
+    ).join(
+        Expense, Expense.order_id == Order.id
+    ).where(
+        *_completed_orders_filters(start, end),
+        Expense.is_seller_cost == True
+    ).group_by(Order.seller_id).subquery()
+
+    rows = db.session.query(
+        Seller,
+        orders_agg.c.orders_count,
+        orders_agg.c.revenue,
+        customers_agg.c.customers_count,
+        commissions_agg.c.commissions
+    ).outerjoin(
+        orders_agg, orders_agg.c.seller_id == Seller.id
+    ).outerjoin(
+        customers_agg, customers_agg.c.seller_id == Seller.id
+    ).outerjoin(
+        commissions_agg, commissions_agg.c.seller_id == Seller.id
+    ).order_by(Seller.id).all()
+
+    return [{
+        'seller': seller.to_dict(),
+        'total_revenue': int(revenue or 0),
+        'completed_orders_count': orders_count or 0,
+        'customers_count': customers_count or 0,
+        'commissions_total': int(commissions or 0)
+    } for seller, orders_count, revenue, customers_count, commissions in rows]
@@ -0,0 +1,127 @@
+"""
+Servicio: Lista de compras
+Agrega la demanda abierta (items de pedidos emitidos) por producto con una sola
+consulta agrupada, convirtiendo las cantidades a la unidad del producto en SQL.
+
+Conversión (con Product.avg_units_per_kg):
+- Item en la unidad del producto: se usa qty
+- Item en unidades, producto en kg: qty / avg_units_per_kg
+- Item en kg, producto en unidades: qty * avg_units_per_kg
+- Sin avg_units_per_kg: la cantidad queda en la unidad del item (se informa aparte)
+"""
+from sqlalchemy import func, case, and_
+from ..db import db
+from ..models import Order, OrderItem, Product, Customer
+
+DEFAULT_MATURITY_NOTE = "para_4_5_dias"
+
+
+def _converted_qty_expr():
+    """(cantidad en la unidad del producto, unidad resultante) para cada item"""
+    avg_units_per_kg = Product.avg_units_per_kg
+    units_to_kg = and_(OrderItem.unit == "unit", Product.unit == "kg", avg_units_per_kg > 0)
+    kg_to_units = and_(OrderItem.unit == "kg", Product.unit == "unit", avg_units_per_kg > 0)
+
+    qty = case(
+        (OrderItem.unit == Product.unit, OrderItem.qty),
+        (units_to_kg, OrderItem.qty / avg_units_per_kg),
+        (kg_to_units, OrderItem.qty * avg_units_per_kg),
+        else_=OrderItem.qty
+    )
+    unit = case(
+        (OrderItem.unit == Product.unit, Product.unit),
+        (units_to_kg, Product.unit),
+        (kg_to_units, Product.unit),
+        else_=OrderItem.unit
+    )
+    return qty, unit
+
+
+def build_shopping_list(by_customer=False):
+    """
+    Demanda de los pedidos emitidos por producto, separada por maturity_note.
+    Con by_customer=True incluye el detalle por cliente (misma consulta, agrupada también por cliente).
+    Retorna una lista de productos ordenada por nombre.
+    """
+    qty, unit = _converted_qty_expr()
+    maturity_note = func.coalesce(OrderItem.maturity_note, DEFAULT_MATURITY_NOTE)
+
+    columns = [
+        Product.id,
+        Product.name,
+        Product.category_id,
+        Product.unit.label("product_unit"),
+        maturity_note.label("maturity_note"),
+        unit.label("unit"),
+        func.sum(qty).label("qty"),
+        func.count(OrderItem.id).label("items_count")
+    ]
+    group_by = [Product.id, Product.name, Product.category_id, Product.unit, maturity_note, unit]
+    if by_customer:
+        columns += [Customer.id.label("customer_id"), Customer.name.label("customer_name")]
+        group_by += [Customer.id, Customer.name]
+
+    query = db.session.query(*columns).select_from(OrderItem).join(
+        Order, Order.id == OrderItem.order_id
+    ).join(
+        Product, Product.id == OrderItem.product_id
+    )
+    if by_customer:
+        query = query.join(Customer, Customer.id == OrderItem.customer_id)
+
+    rows = query.filter(
+        Order.status == "emitted"
+    ).group_by(*group_by).order_by(Product.name, Product.id).all()
+
+    products = {}
+    for row in rows:
+        product = products.get(row.id)
+        if not product:
+            product = products[row.id] = {
+                "product_id": row.id,
+                "product_name": row.name,
+                "category_id": row.category_id,
+                "unit": row.product_unit,
+                "total_qty": 0,
+                "by_maturity": {},
+                "unconverted": {},
+                "items_count": 0
+            }
+            if by_customer:
+                product["customers"] = {}
+
+        row_qty = float(row.qty or 0)
+        product["items_count"] += row.items_count
+
+        if row.unit == row.product_unit:
+            product["total_qty"] += row_qty
+            product["by_maturity"][row.maturity_note] = product["by_maturity"].get(row.maturity_note, 0) + row_qty
+        else:
+            # Sin conversión posible (falta avg_units_per_kg): se informa en la unidad del item
+            product["unconverted"][row.unit] = product["unconverted"].get(row.unit, 0) + row_qty
+
+        if by_customer:
+            customer = product["customers"].setdefault(row.customer_id, {
+                "customer_id": row.customer_id,
+                "customer_name": row.customer_name,
+                "lines": []
+            })
+            customer["lines"].append({
+                "maturity_note": row.maturity_note,
+                "qty": round(row_qty, 3),
+                "unit": row.unit
+            })
+
+    result = []
+    for product in products.values():
+        product["total_qty"] = round(product["total_qty"], 3)
+        product["by_maturity"] = {note: round(value, 3) for note, value in product["by_maturity"].items()}
+        product["unconverted"] = [
+            {"unit": item_unit, "qty": round(value, 3)}
+            for item_unit, value in product["unconverted"].items()
+        ]
+        if by_customer:
+            product["customers"] = sorted(product["customers"].values(), key=lambda c: (c["customer_name"] or ""))
+        result.append(product)
+
+    return result
@@ -131,6 +131,39 @@ def upload_file(file, folder="general"):
         return None
 
 
+def upload_contents(contents):
+    """
+    Sube varios contenidos en memoria a Cloud Storage en paths fijos, con un solo cliente
+    (ej: variantes de una imagen junto al original)
+    
+    Args:
+        contents: {blob_path: (bytes, content_type)}
+        
+    Returns:
+        int: Cantidad de archivos subidos
+    """
+    client = get_storage_client()
+    
+    if not client:
+        return 0
+    
+    bucket_name = os.getenv("GCS_BUCKET_NAME")
+    
+    if not bucket_name:
+        return 0
+    
+    bucket = client.bucket(bucket_name)
+    uploaded = 0
+    for blob_path, (content, content_type) in contents.items():
+        try:
+            bucket.blob(blob_path).upload_from_string(content, content_type=content_type)
+            uploaded += 1
+        except Exception as e:
+            print(f"❌ Error al subir archivo {blob_path}: {e}")
+    
+    return uploaded
+
+
 def get_file_content(gcs_path):
     """
     Obtiene el contenido de un archivo de Cloud Storage
@@ -221,3 +254,35 @@ def delete_file(file_url):
         print(f"❌ Error al eliminar archivo: {e}")
         return False
 
+
+def delete_files(blob_paths):
+    """
+    Elimina varios archivos de Cloud Storage con un solo cliente (los que no existen se ignoran)
+    
+    Args:
+        blob_paths: Paths de los archivos en el bucket
+        
+    Returns:
+        int: Cantidad de archivos eliminados
+    """
+    client = get_storage_client()
+    
+    if not client:
+        return 0
+    
+    bucket_name = os.getenv("GCS_BUCKET_NAME")
+    
+    if not bucket_name:
+        return 0
+    
+    bucket = client.bucket(bucket_name)
+    deleted = 0
+    for blob_path in blob_paths:
+        try:
+            bucket.blob(blob_path).delete()
+            deleted += 1
+        except Exception:
+            # La variante puede no existir (fotos subidas antes de generar variantes)
+            pass
+    
+    return deleted
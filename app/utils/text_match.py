@@ -14,14 +14,27 @@ def normalize_text(s: str) -> str:
     return ' '.join(s.split())
 
 
-def levenshtein(a: str, b: str) -> int:
-    """Calcula distancia de Levenshtein entre dos strings"""
+def normalize_phone(s: str) -> str:
+    """Normaliza teléfono: solo dígitos (sin +, espacios ni guiones)"""
+    if not s:
+        return ""
+    return ''.join(ch for ch in s if ch.isdigit())
+
+
+def levenshtein(a: str, b: str, max_distance: int = None) -> int:
+    """
+    Calcula distancia de Levenshtein entre dos strings.
+    Si se pasa max_distance, corta apenas la distancia supera ese valor
+    y retorna max_distance + 1.
+    """
     if a == b:
         return 0
     if not a:
         return len(b)
     if not b:
         return len(a)
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
     prev = list(range(len(b) + 1))
     for i, ca in enumerate(a, start=1):
         curr = [i]
@@ -32,10 +45,40 @@ def levenshtein(a: str, b: str) -> int:
                 prev[j] + 1,          # deletion
                 prev[j - 1] + cost,   # substitution
             ))
+        if max_distance is not None and min(curr) > max_distance:
+            return max_distance + 1
         prev = curr
     return prev[-1]
 
 
+def singularize_token(tok: str) -> str:
+    """Quita plurales simples de un token (tomates -> tomat, paltas -> palta)"""
+    if not tok or len(tok) < 3:
+        return tok
+    exceptions = {"hass"}
+    if tok in exceptions:
+        return tok
+    if tok.endswith("es") and len(tok) > 4:
+        return tok[:-2]
+    if tok.endswith("s") and len(tok) > 3:
+        return tok[:-1]
+    return tok
+
+
+def token_set(normalized: str) -> set:
+    """Tokens singularizados de un texto ya normalizado"""
+    return {singularize_token(t) for t in normalized.split()}
+
+
+def max_distance_for_score(qa: str, ta: str, min_score: int) -> int:
+    """
+    Distancia de Levenshtein sobre la cual el score por distancia queda bajo min_score
+    (con un margen de 1 para no descartar casos límite por redondeo)
+    """
+    max_len = max(len(qa), len(ta)) or 1
+    return int(max_len * (100 - min_score) / 100) + 1
+
+
 def similarity_score(query: str, target: str) -> int:
     """
     Calcula score de similaridad entre query y target (0-100)
@@ -45,8 +88,15 @@ def similarity_score(query: str, target: str) -> int:
     75+ = tokens parcialmente coinciden
     <75 = match por levenshtein
     """
-    qa = normalize_text(query)
-    ta = normalize_text(target)
+    return similarity_score_normalized(normalize_text(query), normalize_text(target))
+
+
+def similarity_score_normalized(qa: str, ta: str, qs: set = None, ts: set = None, min_score: int = None) -> int:
+    """
+    Igual que similarity_score, pero con textos ya normalizados (y opcionalmente sus tokens).
+    Si se pasa min_score, la distancia de Levenshtein se corta apenas queda claro que
+    el score no alcanza el mínimo: los scores bajo min_score pueden no ser exactos.
+    """
     if not qa or not ta:
         return 0
     if qa == ta:
@@ -55,22 +105,8 @@ def similarity_score(query: str, target: str) -> int:
         return 90 if len(qa) >= 3 else 80
     
     # Token-based overlap con manejo de plurales
-    def singularize_token(tok: str) -> str:
-        if not tok or len(tok) < 3:
-            return tok
-        exceptions = {"hass"}
-        if tok in exceptions:
-            return tok
-        if tok.endswith("es") and len(tok) > 4:
-            return tok[:-2]
-        if tok.endswith("s") and len(tok) > 3:
-            return tok[:-1]
-        return tok
-
-    q_tokens = [singularize_token(t) for t in qa.split()]
-    t_tokens = [singularize_token(t) for t in ta.split()]
-    qs = set(q_tokens)
-    ts = set(t_tokens)
+    qs = token_set(qa) if qs is None else qs
+    ts = token_set(ta) if ts is None else ts
     if qs and ts:
         inter = len(qs & ts)
         union = len(qs | ts) or 1
@@ -82,8 +118,8 @@ def similarity_score(query: str, target: str) -> int:
             return 75
     
     # Fallback: distancia de Levenshtein
-    dist = levenshtein(qa, ta)
+    max_distance = max_distance_for_score(qa, ta, min_score) if min_score is not None else None
+    dist = levenshtein(qa, ta, max_distance)
     max_len = max(len(qa), len(ta)) or 1
     sim = int(100 * (1 - dist / max_len))
     return sim
-
@@ -0,0 +1,75 @@
+"""
+Entorno de Alembic
+Usa la configuración y los modelos de la app (db.metadata), así que la base
+es la misma que usa la aplicación (DATABASE_URL o la SQLite local).
+
+Si se llama desde upgrade_database() se reutiliza la conexión recibida en
+config.attributes["connection"]; desde la línea de comandos se arma una app mínima.
+"""
+from logging.config import fileConfig
+from alembic import context
+
+config = context.config
+
+if config.config_file_name is not None and not config.attributes.get("connection"):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+
+def _target_metadata():
+    """Metadata de todos los modelos registrados"""
+    from app.db import db
+    import app.models  # noqa: F401  (registra los modelos en db.metadata)
+    return db.metadata
+
+
+def run_migrations_offline():
+    """Genera el SQL sin conectarse a la base (alembic upgrade --sql)"""
+    from app.config import get_config
+
+    context.configure(
+        url=get_config().SQLALCHEMY_DATABASE_URI,
+        target_metadata=_target_metadata(),
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run_with_connection(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=_target_metadata(),
+        # SQLite no soporta la mayoría de ALTER TABLE: usar el modo batch
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Aplica las migraciones sobre la base de la app"""
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run_with_connection(connection)
+        return
+
+    from flask import Flask
+    from app.config import get_config
+    from app.db import db
+
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    db.init_app(app)
+
+    with app.app_context():
+        with db.engine.connect() as connection:
+            _run_with_connection(connection)
+            connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
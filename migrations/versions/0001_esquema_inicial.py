@@ -0,0 +1,385 @@
+"""esquema inicial
+
+Tablas de todos los modelos. Sobre una base creada antes de las migraciones
+(con db.create_all) solo crea lo que falta y agrega las columnas nuevas.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 03:54:37.343034
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing_tables = set(sa.inspect(bind).get_table_names())
+
+    # Bases creadas antes de las migraciones (db.create_all al arrancar) ya tienen
+    # parte de las tablas: solo se crean las que faltan
+    if 'categories' not in existing_tables:
+        op.create_table('categories',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=50), nullable=False),
+            sa.Column('emoji', sa.String(length=10), nullable=True),
+            sa.Column('order', sa.Integer(), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+
+    if 'content_templates' not in existing_tables:
+        op.create_table('content_templates',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('type', sa.String(length=20), nullable=False),
+            sa.Column('structure', sa.JSON(), nullable=False),
+            sa.Column('ai_prompt', sa.Text(), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'customers' not in existing_tables:
+        op.create_table('customers',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('phone', sa.String(length=40), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=True),
+            sa.Column('address', sa.String(length=200), nullable=True),
+            sa.Column('preferences', sa.Text(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('phone')
+        )
+
+    if 'kivi_tips' not in existing_tables:
+        op.create_table('kivi_tips',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=False),
+            sa.Column('message', sa.Text(), nullable=False),
+            sa.Column('emoji', sa.String(length=10), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'kpi_weekly_rollups' not in existing_tables:
+        op.create_table('kpi_weekly_rollups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('week_start', sa.Date(), nullable=False),
+            sa.Column('orders_seen', sa.Integer(), nullable=False),
+            sa.Column('orders_count', sa.Integer(), nullable=False),
+            sa.Column('revenue', sa.Float(), nullable=False),
+            sa.Column('cost_total', sa.Float(), nullable=False),
+            sa.Column('utility_total', sa.Float(), nullable=False),
+            sa.Column('utility_percent_sum', sa.Float(), nullable=False),
+            sa.Column('utility_orders_count', sa.Integer(), nullable=False),
+            sa.Column('seller_revenue', sa.Float(), nullable=False),
+            sa.Column('completed_orders_by_seller', sa.JSON(), nullable=True),
+            sa.Column('new_customers', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_kpi_weekly_rollups_week_start'), 'kpi_weekly_rollups', ['week_start'], unique=True)
+
+    if 'seller_config' not in existing_tables:
+        op.create_table('seller_config',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('commission_percent', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'sellers' not in existing_tables:
+        op.create_table('sellers',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('phone', sa.String(length=40), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=True),
+            sa.Column('address', sa.String(length=200), nullable=True),
+            sa.Column('preferences', sa.Text(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('phone')
+        )
+
+    if 'weekly_costs' not in existing_tables:
+        op.create_table('weekly_costs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('week_start', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_weekly_costs_category'), 'weekly_costs', ['category'], unique=False)
+        op.create_index(op.f('ix_weekly_costs_week_start'), 'weekly_costs', ['week_start'], unique=False)
+
+    if 'customer_balances' not in existing_tables:
+        op.create_table('customer_balances',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('customer_id', sa.Integer(), nullable=False),
+            sa.Column('orders_total', sa.Integer(), nullable=False),
+            sa.Column('orders_count', sa.Integer(), nullable=False),
+            sa.Column('payments_total', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_customer_balances_customer_id'), 'customer_balances', ['customer_id'], unique=True)
+
+    if 'orders' not in existing_tables:
+        op.create_table('orders',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('source', sa.String(length=20), nullable=False),
+            sa.Column('shipping_type', sa.String(length=20), nullable=False),
+            sa.Column('seller_id', sa.Integer(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('emitted_at', sa.DateTime(), nullable=True),
+            sa.Column('completed_at', sa.DateTime(), nullable=True),
+            sa.Column('subtotal', sa.Integer(), nullable=False),
+            sa.Column('shipping_amount', sa.Integer(), nullable=False),
+            sa.Column('cost_total', sa.Float(), nullable=False),
+            sa.Column('items_count', sa.Integer(), nullable=False),
+            sa.Column('cost_items_count', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['seller_id'], ['sellers.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'payments' not in existing_tables:
+        op.create_table('payments',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('customer_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('method', sa.String(length=32), nullable=True),
+            sa.Column('reference', sa.String(length=120), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('date', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'products' not in existing_tables:
+        op.create_table('products',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('category_id', sa.Integer(), nullable=False),
+            sa.Column('photo_url', sa.Text(), nullable=True),
+            sa.Column('purchase_price', sa.Float(), nullable=True),
+            sa.Column('sale_price', sa.Float(), nullable=True),
+            sa.Column('unit', sa.String(length=16), nullable=False),
+            sa.Column('avg_units_per_kg', sa.Float(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name')
+        )
+
+    if 'seller_bonuses' not in existing_tables:
+        op.create_table('seller_bonuses',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('seller_id', sa.Integer(), nullable=False),
+            sa.Column('week_start', sa.Date(), nullable=False),
+            sa.Column('orders_target', sa.Integer(), nullable=False),
+            sa.Column('orders_achieved', sa.Integer(), nullable=False),
+            sa.Column('commission_percent', sa.Float(), nullable=False),
+            sa.Column('bonus_amount', sa.Integer(), nullable=False),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['seller_id'], ['sellers.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'seller_payments' not in existing_tables:
+        op.create_table('seller_payments',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('seller_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('method', sa.String(length=32), nullable=True),
+            sa.Column('reference', sa.String(length=120), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('date', sa.DateTime(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['seller_id'], ['sellers.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'expenses' not in existing_tables:
+        op.create_table('expenses',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('order_id', sa.Integer(), nullable=False),
+            sa.Column('category', sa.String(length=50), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('is_seller_cost', sa.Boolean(), nullable=False),
+            sa.Column('commission_percent', sa.Float(), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'order_customer_totals' not in existing_tables:
+        op.create_table('order_customer_totals',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('order_id', sa.Integer(), nullable=False),
+            sa.Column('customer_id', sa.Integer(), nullable=False),
+            sa.Column('subtotal', sa.Integer(), nullable=False),
+            sa.Column('items_count', sa.Integer(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+            sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('order_id', 'customer_id', name='uq_order_customer_totals_order_customer')
+        )
+        op.create_index(op.f('ix_order_customer_totals_customer_id'), 'order_customer_totals', ['customer_id'], unique=False)
+        op.create_index(op.f('ix_order_customer_totals_order_id'), 'order_customer_totals', ['order_id'], unique=False)
+
+    if 'order_items' not in existing_tables:
+        op.create_table('order_items',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('order_id', sa.Integer(), nullable=False),
+            sa.Column('customer_id', sa.Integer(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('qty', sa.Float(), nullable=False),
+            sa.Column('unit', sa.String(length=16), nullable=False),
+            sa.Column('unit_price', sa.Float(), nullable=True),
+            sa.Column('charged_qty', sa.Float(), nullable=True),
+            sa.Column('charged_unit', sa.String(length=16), nullable=True),
+            sa.Column('cost', sa.Float(), nullable=True),
+            sa.Column('paid', sa.Boolean(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('maturity_note', sa.String(length=20), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+            sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'price_history' not in existing_tables:
+        op.create_table('price_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('purchase_price', sa.Float(), nullable=False),
+            sa.Column('date', sa.DateTime(), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'purchases' not in existing_tables:
+        op.create_table('purchases',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('qty', sa.Float(), nullable=False),
+            sa.Column('unit', sa.String(length=16), nullable=False),
+            sa.Column('price_total', sa.Float(), nullable=False),
+            sa.Column('price_per_unit', sa.Float(), nullable=False),
+            sa.Column('price_per_charged_unit', sa.Float(), nullable=True),
+            sa.Column('conversion_qty', sa.Float(), nullable=True),
+            sa.Column('conversion_unit', sa.String(length=16), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'weekly_offers' not in existing_tables:
+        op.create_table('weekly_offers',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('product_id', sa.Integer(), nullable=False),
+            sa.Column('special_price', sa.Integer(), nullable=False),
+            sa.Column('start_date', sa.DateTime(), nullable=False),
+            sa.Column('end_date', sa.DateTime(), nullable=False),
+            sa.Column('active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'payment_allocations' not in existing_tables:
+        op.create_table('payment_allocations',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('payment_id', sa.Integer(), nullable=False),
+            sa.Column('order_item_id', sa.Integer(), nullable=False),
+            sa.Column('amount', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['order_item_id'], ['order_items.id'], ),
+            sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    # Columnas que antes se agregaban con ALTER TABLE al arrancar o en get_customer_debt
+    _add_missing_columns(bind, 'order_items', [
+        sa.Column('cost', sa.Float(), nullable=True),
+        sa.Column('maturity_note', sa.String(length=20), nullable=True, server_default='para_4_5_dias'),
+    ])
+    _add_missing_columns(bind, 'orders', [
+        sa.Column('subtotal', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('shipping_amount', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cost_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('items_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cost_items_count', sa.Integer(), nullable=False, server_default='0'),
+    ])
+
+
+def _add_missing_columns(bind, table_name, columns):
+    """Agrega a una tabla existente las columnas que todavía no tiene"""
+    existing_columns = {column['name'] for column in sa.inspect(bind).get_columns(table_name)}
+    for column in columns:
+        if column.name not in existing_columns:
+            op.add_column(table_name, column)
+
+
+def downgrade():
+    op.drop_table('payment_allocations')
+    op.drop_table('weekly_offers')
+    op.drop_table('purchases')
+    op.drop_table('price_history')
+    op.drop_table('order_items')
+    op.drop_index(op.f('ix_order_customer_totals_order_id'), table_name='order_customer_totals')
+    op.drop_index(op.f('ix_order_customer_totals_customer_id'), table_name='order_customer_totals')
+    op.drop_table('order_customer_totals')
+    op.drop_table('expenses')
+    op.drop_table('seller_payments')
+    op.drop_table('seller_bonuses')
+    op.drop_table('products')
+    op.drop_table('payments')
+    op.drop_table('orders')
+    op.drop_index(op.f('ix_customer_balances_customer_id'), table_name='customer_balances')
+    op.drop_table('customer_balances')
+    op.drop_index(op.f('ix_weekly_costs_week_start'), table_name='weekly_costs')
+    op.drop_index(op.f('ix_weekly_costs_category'), table_name='weekly_costs')
+    op.drop_table('weekly_costs')
+    op.drop_table('sellers')
+    op.drop_table('seller_config')
+    op.drop_index(op.f('ix_kpi_weekly_rollups_week_start'), table_name='kpi_weekly_rollups')
+    op.drop_table('kpi_weekly_rollups')
+    op.drop_table('kivi_tips')
+    op.drop_table('customers')
+    op.drop_table('content_templates')
+    op.drop_table('categories')
@@ -0,0 +1,55 @@
+"""indices de pedidos y pagos
+
+Índices sobre las claves foráneas y filtros que usan las consultas de deudas,
+KPIs, vendedores y compras (antes recorrían las tablas completas).
+ix_orders_open_created_at es parcial: solo pedidos emitidos o completados.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 03:56:59.638320
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+OPEN_ORDERS = sa.text("status IN ('emitted', 'completed')")
+
+
+def upgrade():
+    op.create_index(op.f('ix_order_items_order_id'), 'order_items', ['order_id'], unique=False)
+    op.create_index(op.f('ix_order_items_customer_id'), 'order_items', ['customer_id'], unique=False)
+    op.create_index(op.f('ix_order_items_product_id'), 'order_items', ['product_id'], unique=False)
+
+    op.create_index(op.f('ix_orders_status'), 'orders', ['status'], unique=False)
+    op.create_index(op.f('ix_orders_created_at'), 'orders', ['created_at'], unique=False)
+    op.create_index(op.f('ix_orders_seller_id'), 'orders', ['seller_id'], unique=False)
+    op.create_index(
+        'ix_orders_open_created_at', 'orders', ['created_at'], unique=False,
+        postgresql_where=OPEN_ORDERS, sqlite_where=OPEN_ORDERS
+    )
+
+    op.create_index(op.f('ix_payments_customer_id'), 'payments', ['customer_id'], unique=False)
+    op.create_index('ix_expenses_order_id_is_seller_cost', 'expenses', ['order_id', 'is_seller_cost'], unique=False)
+    op.create_index('ix_price_history_product_id_date', 'price_history', ['product_id', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_price_history_product_id_date', table_name='price_history')
+    op.drop_index('ix_expenses_order_id_is_seller_cost', table_name='expenses')
+    op.drop_index(op.f('ix_payments_customer_id'), table_name='payments')
+
+    op.drop_index('ix_orders_open_created_at', table_name='orders')
+    op.drop_index(op.f('ix_orders_seller_id'), table_name='orders')
+    op.drop_index(op.f('ix_orders_created_at'), table_name='orders')
+    op.drop_index(op.f('ix_orders_status'), table_name='orders')
+
+    op.drop_index(op.f('ix_order_items_product_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_customer_id'), table_name='order_items')
+    op.drop_index(op.f('ix_order_items_order_id'), table_name='order_items')
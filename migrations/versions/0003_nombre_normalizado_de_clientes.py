@@ -0,0 +1,53 @@
+"""nombre normalizado de clientes
+
+Columna customers.name_normalized (normalize_text del nombre) con índice para
+búsqueda por prefijo y resolución de clientes por nombre al crear pedidos.
+Completa la columna de los clientes existentes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 03:58:38.634885
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.text_match import normalize_text
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customers', sa.Column('name_normalized', sa.String(length=120), nullable=True))
+
+    bind = op.get_bind()
+    customers = sa.table(
+        'customers',
+        sa.column('id', sa.Integer),
+        sa.column('name', sa.String),
+        sa.column('name_normalized', sa.String)
+    )
+    rows = bind.execute(sa.select(customers.c.id, customers.c.name)).fetchall()
+    if rows:
+        bind.execute(
+            customers.update().where(customers.c.id == sa.bindparam('customer_id')).values(
+                name_normalized=sa.bindparam('normalized')
+            ),
+            [{'customer_id': row.id, 'normalized': normalize_text(row.name)} for row in rows]
+        )
+
+    op.create_index(
+        'ix_customers_name_normalized', 'customers', ['name_normalized'], unique=False,
+        postgresql_ops={'name_normalized': 'varchar_pattern_ops'}
+    )
+
+
+def downgrade():
+    op.drop_index('ix_customers_name_normalized', table_name='customers')
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_column('name_normalized')
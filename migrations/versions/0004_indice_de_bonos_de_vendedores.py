@@ -0,0 +1,27 @@
+"""indice de bonos de vendedores
+
+Índice de seller_bonuses por semana y vendedor, para el listado por semana y
+el upsert en lote de bonos semanales.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 04:07:09.633977
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_seller_bonuses_week_start_seller_id', 'seller_bonuses', ['week_start', 'seller_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_seller_bonuses_week_start_seller_id', table_name='seller_bonuses')
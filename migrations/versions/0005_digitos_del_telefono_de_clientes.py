@@ -0,0 +1,55 @@
+"""digitos del telefono de clientes
+
+Columna customers.phone_digits (solo los dígitos del teléfono) con índice para
+búsqueda por prefijo, así "+56 9 1234" se encuentra buscando "569" o "+569".
+Completa la columna de los clientes existentes.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 04:27:03.402749
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils.text_match import normalize_phone
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('customers', sa.Column('phone_digits', sa.String(length=40), nullable=True))
+
+    bind = op.get_bind()
+    customers = sa.table(
+        'customers',
+        sa.column('id', sa.Integer),
+        sa.column('phone', sa.String),
+        sa.column('phone_digits', sa.String)
+    )
+    rows = bind.execute(
+        sa.select(customers.c.id, customers.c.phone).where(customers.c.phone.isnot(None))
+    ).fetchall()
+    if rows:
+        bind.execute(
+            customers.update().where(customers.c.id == sa.bindparam('customer_id')).values(
+                phone_digits=sa.bindparam('digits')
+            ),
+            [{'customer_id': row.id, 'digits': normalize_phone(row.phone) or None} for row in rows]
+        )
+
+    op.create_index(
+        'ix_customers_phone_digits', 'customers', ['phone_digits'], unique=False,
+        postgresql_ops={'phone_digits': 'varchar_pattern_ops'}
+    )
+
+
+def downgrade():
+    op.drop_index('ix_customers_phone_digits', table_name='customers')
+    with op.batch_alter_table('customers', schema=None) as batch_op:
+        batch_op.drop_column('phone_digits')
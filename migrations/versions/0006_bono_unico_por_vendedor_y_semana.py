@@ -0,0 +1,35 @@
+"""bono unico por vendedor y semana
+
+El índice de seller_bonuses por (semana, vendedor) pasa a ser único, para que el
+upsert de bonos (ON CONFLICT) no pueda crear dos bonos del mismo vendedor y semana.
+Antes elimina los duplicados existentes y deja el bono más reciente de cada uno.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 04:28:41.422120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(sa.text(
+        "DELETE FROM seller_bonuses WHERE id NOT IN ("
+        "SELECT MAX(id) FROM seller_bonuses GROUP BY seller_id, week_start)"
+    ))
+
+    op.drop_index('ix_seller_bonuses_week_start_seller_id', table_name='seller_bonuses')
+    op.create_index('ix_seller_bonuses_week_start_seller_id', 'seller_bonuses', ['week_start', 'seller_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_seller_bonuses_week_start_seller_id', table_name='seller_bonuses')
+    op.create_index('ix_seller_bonuses_week_start_seller_id', 'seller_bonuses', ['week_start', 'seller_id'], unique=False)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Script: Asignar bonos semanales de vendedores
+Asigna en lote los bonos de las últimas semanas (por defecto 52, hasta la semana
+actual inclusive) a los vendedores que alcanzaron la meta de pedidos. Mismo
+cálculo que POST /api/sellers/bonus/assign; los bonos existentes se actualizan.
+
+Uso:
+    python scripts/assign_seller_bonuses.py <meta_pedidos> <bono_porcentaje> [semanas]
+    python scripts/assign_seller_bonuses.py 20 2 52 --check  # solo muestra los bonos, sin guardar
+"""
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db
+from flask import Flask
+from app.config import get_config
+
+DEFAULT_WEEKS = 52
+
+
+def run(orders_target, bonus_percent, weeks=DEFAULT_WEEKS, check_only=False):
+    """Asigna (o solo calcula) los bonos de las últimas semanas"""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    db.init_app(app)
+
+    with app.app_context():
+        from app.api.sellers import get_seller_commission_percent
+        from app.services.seller_bonus import assign_bonuses, week_start_of
+
+        try:
+            last_week = week_start_of(datetime.utcnow().date())
+            first_week = last_week - timedelta(weeks=weeks - 1)
+            base_commission_percent = get_seller_commission_percent()
+
+            recipients = assign_bonuses(first_week, last_week, orders_target, bonus_percent, base_commission_percent)
+            for recipient in recipients:
+                seller_name = recipient['seller']['name'] if recipient['seller'] else '?'
+                print(f"   - {recipient['week_start']} {seller_name}: {recipient['orders_achieved']} pedidos, bono ${recipient['bonus_amount']}")
+
+            if check_only:
+                db.session.rollback()
+                print(f"✅ {len(recipients)} bono(s) entre {first_week} y {last_week} (sin guardar)")
+                return True
+
+            db.session.commit()
+            print(f"✅ {len(recipients)} bono(s) asignados entre {first_week} y {last_week}")
+            return True
+        except Exception as e:
+            print(f"❌ Error asignando bonos: {e}")
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--check"]
+    if len(args) < 2:
+        print("Uso: python scripts/assign_seller_bonuses.py <meta_pedidos> <bono_porcentaje> [semanas] [--check]")
+        sys.exit(1)
+
+    check_only = "--check" in sys.argv
+    weeks = int(args[2]) if len(args) > 2 else DEFAULT_WEEKS
+    print("🔄 Calculando bonos semanales..." if check_only else "🔄 Asignando bonos semanales...")
+    success = run(int(args[0]), float(args[1]), weeks=weeks, check_only=check_only)
+    sys.exit(0 if success else 1)
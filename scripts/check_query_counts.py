@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Script: Verificar cantidad de consultas
+Crea una base SQLite temporal con las migraciones aplicadas, carga datos de prueba
+en dos tamaños y cuenta las consultas SQL de los endpoints de vendedores.
+La cantidad de consultas de cada endpoint no debe crecer con la cantidad de
+pedidos, costos y clientes (sin consultas N+1).
+
+Uso:
+    python scripts/check_query_counts.py            # verifica (exit 1 si alguna cantidad crece)
+    python scripts/check_query_counts.py --verbose  # además muestra las consultas de cada endpoint
+"""
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db, upgrade_database
+from flask import Flask
+from app.config import get_config
+from sqlalchemy import event
+
+# Endpoints a revisar (vendedor 1)
+ENDPOINTS = [
+    "/api/sellers/summary",
+    "/api/sellers/summary/week",
+    "/api/sellers/1/debt",
+    "/api/sellers/1/week-summary",
+    "/api/sellers/1/global-summary",
+    "/api/sellers/1/global-summary?limit=5",
+]
+
+
+def _seed(orders_count, first_customer):
+    """Agrega pedidos completados del vendedor 1 (3 clientes nuevos por pedido), sus costos y un pago"""
+    from app.models import Category, Product, Seller, Customer, Order, OrderItem, SellerPayment
+    from app.services.order_totals import store_order_totals
+    from app.services.seller_costs import insert_missing_seller_costs
+
+    if not Seller.query.first():
+        category = Category(name="Verduras")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add_all([
+            Product(name=f"Producto {i}", category_id=category.id, sale_price=1000 + i * 100, unit="kg")
+            for i in range(5)
+        ])
+        db.session.add_all([Seller(name="Vendedor 1"), Seller(name="Vendedor 2")])
+        db.session.flush()
+
+    products = Product.query.order_by(Product.id).all()
+    now = datetime.utcnow()
+    order_ids = []
+    customer_number = first_customer
+    for i in range(orders_count):
+        order = Order(status="completed", seller_id=1, created_at=now - timedelta(days=i % 10))
+        db.session.add(order)
+        customers = [Customer(name=f"Cliente {customer_number + j}") for j in range(3)]
+        customer_number += 3
+        db.session.add_all(customers)
+        db.session.flush()
+        for j, customer in enumerate(customers):
+            db.session.add(OrderItem(
+                order_id=order.id,
+                customer_id=customer.id,
+                product_id=products[(i + j) % len(products)].id,
+                qty=1 + j
+            ))
+        order_ids.append(order.id)
+
+    store_order_totals(order_ids)
+    insert_missing_seller_costs(10.0)
+    db.session.add(SellerPayment(seller_id=1, amount=1000))
+    db.session.commit()
+    return customer_number
+
+
+def _count_statements(client, url):
+    """Ejecuta el endpoint y retorna (status, consultas enviadas a la base)"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return response.status_code, statements
+
+
+def run(verbose=False):
+    """Compara la cantidad de consultas con pocos y muchos datos. Retorna True si no crece."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config.from_object(get_config())
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{Path(tmp_dir) / 'counts.db'}"
+        db.init_app(app)
+
+        from app.api.sellers import bp as sellers_bp
+        app.register_blueprint(sellers_bp)
+        client = app.test_client()
+
+        with app.app_context():
+            try:
+                upgrade_database()
+
+                counts = {}
+                next_customer = 1
+                for size, orders_count in (("pocos", 5), ("muchos", 40)):
+                    next_customer = _seed(orders_count, next_customer)
+                    db.session.remove()
+                    for url in ENDPOINTS:
+                        status, statements = _count_statements(client, url)
+                        if status != 200:
+                            print(f"❌ {url}: status {status}")
+                            return False
+                        counts.setdefault(url, []).append(len(statements))
+                        if verbose:
+                            print(f"   {url} ({size} datos): {len(statements)} consultas")
+                            for statement in statements:
+                                print(f"     {' '.join(statement.split())[:160]}")
+
+                failures = 0
+                for url, (small, large) in counts.items():
+                    if large > small:
+                        failures += 1
+                        print(f"❌ {url}: {small} consultas con pocos datos, {large} con muchos")
+                    else:
+                        print(f"✅ {url}: {small} consultas")
+
+                db.session.remove()
+                db.engine.dispose()
+
+                if failures:
+                    print(f"❌ {failures} endpoint(s) con consultas que crecen con los datos")
+                    return False
+
+                print("✅ La cantidad de consultas no crece con los datos")
+                return True
+            except Exception as e:
+                print(f"❌ Error verificando cantidad de consultas: {e}")
+                import traceback
+                traceback.print_exc()
+                return False
+
+
+if __name__ == "__main__":
+    print("🔄 Verificando cantidad de consultas (SQLite)...")
+    success = run(verbose="--verbose" in sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Script: Verificar planes de consultas
+Crea una base SQLite temporal con las migraciones aplicadas, ejecuta las consultas
+principales (deudas, KPIs, vendedores, compras, clientes) y revisa con EXPLAIN QUERY PLAN
+que ninguna recorra completa una tabla del grafo de pedidos en vez de usar un índice.
+
+Uso:
+    python scripts/check_query_plans.py            # verifica (exit 1 si alguna consulta no usa índices)
+    python scripts/check_query_plans.py --verbose  # además muestra el plan de cada consulta
+"""
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db, upgrade_database
+from flask import Flask
+from app.config import get_config
+from sqlalchemy import event
+
+# "SCAN tabla" sin "USING ... INDEX" = recorrido completo de la tabla
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def _query_checks():
+    """Consultas a revisar: (nombre, función que las ejecuta, tablas que no se pueden recorrer completas)"""
+    from app.models import Order, OrderItem, Expense, PriceHistory, Customer
+    from app.services.customer_ledger import compute_customer_balances
+    from app.services.order_totals import calculate_order_totals, get_order_item_lines
+    from app.services.seller_stats import summarize_sellers
+    from app.services.shopping_list import build_shopping_list
+
+    week_start = datetime(2025, 1, 6)
+    week_end = week_start + timedelta(days=7)
+
+    return [
+        ("Deuda de un cliente",
+         lambda: compute_customer_balances([1]),
+         {"order_items", "payments"}),
+        ("Totales de pedidos de una semana (KPIs)",
+         lambda: calculate_order_totals(
+             Order.status.in_(['completed', 'emitted']),
+             Order.created_at >= week_start,
+             Order.created_at <= week_end
+         ),
+         {"orders", "order_items"}),
+        ("Items de un pedido",
+         lambda: get_order_item_lines(OrderItem.order_id == 1),
+         {"order_items"}),
+        ("Pedidos completados de un vendedor",
+         lambda: Order.query.filter(Order.seller_id == 1, Order.status == 'completed').all(),
+         {"orders"}),
+        ("Costos de vendedor de pedidos",
+         lambda: Expense.query.filter(Expense.order_id.in_([1, 2]), Expense.is_seller_cost == True).all(),
+         {"expenses"}),
+        ("Precio de compra vigente de un producto",
+         lambda: PriceHistory.query.filter(
+             PriceHistory.product_id == 1,
+             PriceHistory.date <= week_end
+         ).order_by(PriceHistory.date.desc()).first(),
+         {"price_history"}),
+        ("Items de un producto (compras)",
+         lambda: OrderItem.query.filter(OrderItem.product_id == 1, OrderItem.cost.is_(None)).all(),
+         {"order_items"}),
+        ("Clientes por nombre normalizado (creación de pedidos)",
+         lambda: Customer.query.filter(Customer.name_normalized.in_(["jose perez", "maria"])).all(),
+         {"customers"}),
+        ("Resumen semanal de vendedores",
+         lambda: summarize_sellers(week_start, week_end),
+         {"orders", "order_customer_totals", "expenses"}),
+        ("Lista de compras (pedidos emitidos)",
+         lambda: build_shopping_list(),
+         {"orders"}),
+    ]
+
+
+def _capture_statements(fn):
+    """Ejecuta fn y retorna las consultas SELECT que envió a la base [(sql, parámetros)]"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def run(verbose=False):
+    """Revisa el plan de cada consulta principal. Retorna True si todas usan índices."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = Flask(__name__)
+        app.config.from_object(get_config())
+        app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{Path(tmp_dir) / 'plans.db'}"
+        db.init_app(app)
+
+        with app.app_context():
+            try:
+                upgrade_database()
+
+                failures = 0
+                for name, fn, tables in _query_checks():
+                    full_scans = set()
+                    plan_lines = []
+                    with db.engine.connect() as connection:
+                        for statement, parameters in _capture_statements(fn):
+                            plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+                            for row in plan:
+                                detail = row[-1]
+                                plan_lines.append(detail)
+                                match = FULL_SCAN.match(detail)
+                                if match and match.group(1) in tables:
+                                    full_scans.add(match.group(1))
+
+                    if full_scans:
+                        failures += 1
+                        print(f"❌ {name}: recorre completa(s) {', '.join(sorted(full_scans))}")
+                    else:
+                        print(f"✅ {name}")
+                    if verbose or full_scans:
+                        for detail in plan_lines:
+                            print(f"     {detail}")
+
+                db.session.remove()
+                db.engine.dispose()
+
+                if failures:
+                    print(f"❌ {failures} consulta(s) sin índice")
+                    return False
+
+                print("✅ Todas las consultas principales usan índices")
+                return True
+            except Exception as e:
+                print(f"❌ Error verificando planes de consultas: {e}")
+                import traceback
+                traceback.print_exc()
+                return False
+
+
+if __name__ == "__main__":
+    print("🔄 Verificando planes de consultas (SQLite)...")
+    success = run(verbose="--verbose" in sys.argv)
+    sys.exit(0 if success else 1)
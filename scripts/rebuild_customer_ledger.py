@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script: Reconstruir saldos de clientes
+Regenera la tabla customer_balances desde cero a partir de pedidos y pagos.
+
+Uso:
+    python scripts/rebuild_customer_ledger.py          # reconstruye y verifica
+    python scripts/rebuild_customer_ledger.py --check  # solo compara contra el cálculo directo
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db, get_migration_status
+from flask import Flask
+from app.config import get_config
+
+
+def run(check_only=False):
+    """Reconstruye (opcional) y verifica los saldos de clientes"""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    db.init_app(app)
+
+    with app.app_context():
+        from app.services.customer_ledger import rebuild_customer_balances, verify_customer_balances
+
+        try:
+            # El esquema lo crean solo las migraciones (scripts/upgrade_db.py)
+            current, head = get_migration_status()
+            if current != head:
+                print(f"❌ Migraciones pendientes: base en {current or 'sin versión'}, última revisión {head}")
+                print("   Ejecutar primero: python scripts/upgrade_db.py")
+                return False
+
+            if not check_only:
+                customers = rebuild_customer_balances()
+                print(f"✅ Saldos de clientes reconstruidos ({customers} clientes)")
+
+            mismatches = verify_customer_balances()
+            if mismatches:
+                print(f"❌ {len(mismatches)} diferencia(s) entre los saldos y el cálculo directo:")
+                for m in mismatches:
+                    print(f"   - Cliente {m['customer_id']} / {m['field']}: guardado={m['stored']} esperado={m['expected']}")
+                return False
+
+            print("✅ Los saldos de clientes coinciden con el cálculo directo")
+            return True
+        except Exception as e:
+            print(f"❌ Error reconstruyendo saldos de clientes: {e}")
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    check_only = "--check" in sys.argv
+    print("🔄 Verificando saldos de clientes..." if check_only else "🔄 Reconstruyendo saldos de clientes...")
+    success = run(check_only=check_only)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script: Reconstruir resumen semanal de KPIs
+Regenera la tabla kpi_weekly_rollups desde cero a partir de pedidos y clientes.
+
+Uso:
+    python scripts/rebuild_kpi_rollup.py          # reconstruye y verifica
+    python scripts/rebuild_kpi_rollup.py --check  # solo compara contra el cálculo directo
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db, get_migration_status
+from flask import Flask
+from app.config import get_config
+
+
+def run(check_only=False):
+    """Reconstruye (opcional) y verifica el resumen semanal"""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    db.init_app(app)
+
+    with app.app_context():
+        from app.services.kpi_rollup import rebuild_rollups, verify_rollups
+
+        try:
+            # El esquema lo crean solo las migraciones (scripts/upgrade_db.py)
+            current, head = get_migration_status()
+            if current != head:
+                print(f"❌ Migraciones pendientes: base en {current or 'sin versión'}, última revisión {head}")
+                print("   Ejecutar primero: python scripts/upgrade_db.py")
+                return False
+
+            if not check_only:
+                weeks = rebuild_rollups()
+                print(f"✅ Resumen semanal reconstruido ({weeks} semanas)")
+
+            mismatches = verify_rollups()
+            if mismatches:
+                print(f"❌ {len(mismatches)} diferencia(s) entre el resumen y el cálculo directo:")
+                for m in mismatches:
+                    print(f"   - Semana {m['week_start']} / {m['field']}: guardado={m['stored']} esperado={m['expected']}")
+                return False
+
+            print("✅ El resumen semanal coincide con el cálculo directo")
+            return True
+        except Exception as e:
+            print(f"❌ Error reconstruyendo resumen semanal: {e}")
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    check_only = "--check" in sys.argv
+    print("🔄 Verificando resumen semanal de KPIs..." if check_only else "🔄 Reconstruyendo resumen semanal de KPIs...")
+    success = run(check_only=check_only)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script: Reconciliar totales guardados de pedidos
+Compara subtotal, envío, costo y cantidad de items guardados en cada pedido (y los
+subtotales por cliente) contra el cálculo directo desde sus items, y repara las diferencias.
+Pensado para correr periódicamente (cron / Cloud Scheduler).
+
+Uso:
+    python scripts/reconcile_order_totals.py          # repara diferencias
+    python scripts/reconcile_order_totals.py --check  # solo reporta diferencias
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db
+from flask import Flask
+from app.config import get_config
+
+
+def run(check_only=False):
+    """Busca (y opcionalmente repara) pedidos con totales desactualizados"""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    db.init_app(app)
+
+    with app.app_context():
+        from app.services.order_totals import reconcile_order_totals
+
+        try:
+            drifted = reconcile_order_totals(check_only=check_only)
+
+            if not drifted:
+                print("✅ Los totales guardados coinciden con los items de cada pedido")
+                return True
+
+            preview = ", ".join(f"#{order_id}" for order_id in drifted[:20])
+            if len(drifted) > 20:
+                preview += ", ..."
+
+            if check_only:
+                print(f"❌ {len(drifted)} pedido(s) con totales desactualizados: {preview}")
+                return False
+
+            print(f"✅ Totales reparados en {len(drifted)} pedido(s): {preview}")
+            return True
+        except Exception as e:
+            print(f"❌ Error reconciliando totales: {e}")
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    check_only = "--check" in sys.argv
+    print("🔄 Verificando totales de pedidos..." if check_only else "🔄 Reconciliando totales de pedidos...")
+    success = run(check_only=check_only)
+    sys.exit(0 if success else 1)
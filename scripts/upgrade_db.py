@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Script: Aplicar migraciones de base de datos
+Ejecuta las migraciones de Alembic pendientes (migrations/versions). Se corre una
+vez por deploy, antes de iniciar gunicorn; la app ya no modifica el esquema al arrancar.
+
+Sobre una base creada antes de las migraciones, la primera ejecución crea las
+tablas y columnas que falten y completa los totales guardados de los pedidos.
+También genera el resumen semanal de KPIs y los saldos de clientes si están
+vacíos y hay datos, así los endpoints de lectura no escriben.
+
+Uso:
+    python scripts/upgrade_db.py          # aplica las migraciones pendientes
+    python scripts/upgrade_db.py --check  # solo informa si hay migraciones pendientes
+"""
+import sys
+from pathlib import Path
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db import db, get_migration_status, upgrade_database
+from flask import Flask
+from app.config import get_config
+
+
+def run(check_only=False):
+    """Aplica (opcional) las migraciones y verifica que la base quede en la última revisión"""
+    app = Flask(__name__)
+    app.config.from_object(get_config())
+    db.init_app(app)
+
+    with app.app_context():
+        try:
+            if not check_only:
+                previous, current = upgrade_database()
+                if previous == current:
+                    print(f"✅ La base ya estaba en la última revisión ({current})")
+                else:
+                    print(f"✅ Migraciones aplicadas: {previous or 'sin versión'} -> {current}")
+
+                if previous is None:
+                    # Primera migración: completar los totales guardados de pedidos existentes
+                    from app.services.order_totals import reconcile_order_totals
+                    fixed = reconcile_order_totals()
+                    if fixed:
+                        print(f"✅ Totales de {len(fixed)} pedido(s) completados")
+
+                # Tablas derivadas: se generan acá y no en el primer GET
+                from app.services.kpi_rollup import ensure_rollups
+                from app.services.customer_ledger import ensure_customer_balances
+                ensure_rollups()
+                ensure_customer_balances()
+
+            current, head = get_migration_status()
+            if current != head:
+                print(f"❌ Migraciones pendientes: base en {current or 'sin versión'}, última revisión {head}")
+                return False
+
+            print(f"✅ Base de datos al día (revisión {head})")
+            return True
+        except Exception as e:
+            print(f"❌ Error aplicando migraciones: {e}")
+            import traceback
+            traceback.print_exc()
+            db.session.rollback()
+            return False
+
+
+if __name__ == "__main__":
+    check_only = "--check" in sys.argv
+    print("🔄 Verificando migraciones..." if check_only else "🔄 Aplicando migraciones...")
+    success = run(check_only=check_only)
+    sys.exit(0 if success else 1)
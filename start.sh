@@ -19,6 +19,12 @@ if [ ! -f "wsgi.py" ]; then
     exit 1
 fi
 
+# Aplicar migraciones pendientes (una vez, antes de levantar los workers)
+if ! python scripts/upgrade_db.py; then
+    echo "❌ ERROR: no se pudieron aplicar las migraciones"
+    exit 1
+fi
+
 # Iniciar gunicorn
 exec gunicorn --bind "0.0.0.0:${PORT}" --workers 2 --threads 4 --timeout 0 wsgi:app
 
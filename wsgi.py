@@ -6,7 +6,7 @@ import os
 from flask import Flask
 from flask_cors import CORS
 from app.config import get_config
-from app.db import db, init_db
+from app.db import db, upgrade_database
 
 
 def create_app():
@@ -49,40 +49,24 @@ def create_app():
         # Crear carpeta instance si no existe
         os.makedirs(os.path.join(os.path.dirname(__file__), 'instance'), exist_ok=True)
         
-        # Importar modelos ANTES de crear tablas (para que SQLAlchemy los registre)
+        # Importar modelos (para que SQLAlchemy los registre)
         from app.models import (
             Category, Product, Customer, Order, OrderItem,
             Expense, Payment, PaymentAllocation, WeeklyOffer,
             PriceHistory, ContentTemplate, KiviTip, WeeklyCost, Seller,
-            SellerPayment, SellerBonus, SellerConfig
+            SellerPayment, SellerBonus, SellerConfig, KpiWeeklyRollup,
+            OrderCustomerTotal, CustomerBalance
         )
         
-        # Crear tablas (después de importar todos los modelos)
-        db.create_all()
-        
-        # Migración automática: agregar columna maturity_note a order_items si no existe
-        try:
-            from sqlalchemy import inspect, text
-            inspector = inspect(db.engine)
-            columns = [col['name'] for col in inspector.get_columns('order_items')]
-            if 'maturity_note' not in columns:
-                print("🔄 Agregando columna maturity_note a order_items...")
-                if db.engine.dialect.name == 'postgresql':
-                    db.session.execute(text("ALTER TABLE order_items ADD COLUMN maturity_note VARCHAR(20) DEFAULT 'para_4_5_dias'"))
-                elif db.engine.dialect.name == 'sqlite':
-                    # SQLite no soporta ALTER TABLE ADD COLUMN fácilmente, pero db.create_all() debería manejarlo
-                    pass
-                else:
-                    db.session.execute(text("ALTER TABLE order_items ADD COLUMN maturity_note VARCHAR(20) DEFAULT 'para_4_5_dias'"))
-                db.session.commit()
-                print("✅ Columna maturity_note agregada exitosamente")
-        except Exception as e:
-            print(f"⚠️  Error verificando/agregando columna maturity_note: {e}")
-            db.session.rollback()
-        
-        # Inicializar datos de prueba si es desarrollo
+        # Desarrollo: aplicar migraciones pendientes e inicializar datos de prueba
+        # (en producción las migraciones se aplican con scripts/upgrade_db.py antes de arrancar)
         if app.config["FLASK_ENV"] == "development":
+            upgrade_database()
             init_dev_data()
+            from app.services.kpi_rollup import ensure_rollups
+            from app.services.customer_ledger import ensure_customer_balances
+            ensure_rollups()
+            ensure_customer_balances()
         
         # Registrar blueprints de APIs
         from app.api import (
@@ -119,9 +103,29 @@ def create_app():
     
     @app.route("/uploads/<path:filename>")
     def serve_upload(filename):
+        from flask import request
+        from werkzeug.security import safe_join
+        from app.services.image_variants import select_variant, variant_path
+        
         # Obtener la ruta base del proyecto (donde está wsgi.py)
         base_dir = os.path.dirname(os.path.abspath(__file__))
         uploads_dir = os.path.join(base_dir, 'uploads')
+        
+        # Variante reducida (?size=thumb|medium|full), igual que /api/images
+        try:
+            selected = select_variant(request.args, request.accept_mimetypes)
+        except ValueError as e:
+            return {"error": f"Parámetros inválidos: {str(e)}"}, 400
+        if selected:
+            variant, image_format, negotiated = selected
+            variant_filename = variant_path(filename, variant, image_format)
+            variant_file = safe_join(uploads_dir, variant_filename)
+            if variant_file and os.path.isfile(variant_file):
+                response = send_from_directory(uploads_dir, variant_filename)
+                if negotiated:
+                    response.headers['Vary'] = 'Accept'
+                return response
+        
         return send_from_directory(uploads_dir, filename)
     
     return app